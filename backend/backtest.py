@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+V6++ 策略回测引擎 - 向量化信号 + 固定数量持仓记账
+规则与 main.py analyze_market 一致:
+- 牛市: 价格 > SMA200 或 斜率 > 0 -> 持多；转熊平多
+- 做空: 非牛市 且 乖离率 < -10% 且 斜率 < -0.5% -> 开空；乖离率 > -5% 或 转牛 平空
+- 止盈: 持仓盈利 >= 100% 平仓，之后本段行情不再开同向仓位（等待信号重置）
+信号在日线收盘时产生并按收盘价 ± 滑点成交（加密货币 24/7 交易，次日开盘价即当日收盘价）
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import rolling_mean
+
+# Binance 现货手续费 (单边) 与滑点
+FEE_RATE = 0.001
+SLIPPAGE = 0.0005
+
+# 日线年化因子 (加密货币全年交易)
+BARS_PER_YEAR = 365
+
+# V6++ 参数 (与 main.py / indicators.py 中的常量一致)
+DEFAULT_PARAMS = {
+    "sma_window": 200,      # SMA200 窗口
+    "slope_lookback": 5,    # 斜率回看K线数
+    "short_dev": -10.0,     # 做空: 乖离率 < short_dev (%)
+    "short_slope": -0.5,    # 做空: 斜率 < short_slope (%)
+    "cover_dev": -5.0,      # 平空: 乖离率 > cover_dev (%)
+    "take_profit": 1.0,     # 止盈: 盈利 >= 100%
+}
+
+
+def compute_features(close, sma_window=200, slope_lookback=5):
+    """
+    SMA / 斜率 / 乖离率数组（与 calculate_daily_indicators 公式一致，预热期为 NaN 而非 0）
+    只依赖 sma_window 和 slope_lookback，参数扫描时可按这两个参数缓存复用
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    sma = rolling_mean(close, sma_window)
+    base = np.full(len(close), np.nan)
+    if slope_lookback < len(close):
+        base[slope_lookback:] = sma[:-slope_lookback]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            "sma": sma,
+            "slope": (sma - base) / base * 100,
+            "dev": (close - sma) / sma * 100,
+        }
+
+
+def _hold(enter, exit_):
+    """
+    迟滞状态: 最近一次事件是 enter 则持有（同一根K线上 exit 优先）
+    """
+    idx = np.arange(len(enter))
+    last_enter = np.maximum.accumulate(np.where(enter & ~exit_, idx, -1))
+    last_exit = np.maximum.accumulate(np.where(exit_, idx, -1))
+    return last_enter > last_exit
+
+
+def _segment_start_index(state):
+    """每根K线所在持有段的起始下标（不在段内时无意义）"""
+    idx = np.arange(len(state))
+    prev = np.r_[False, state[:-1]]
+    return np.maximum.accumulate(np.where(state & ~prev, idx, 0))
+
+
+def _apply_take_profit(state, close, side, take_profit):
+    """
+    止盈截断: 段内首次达到止盈的K线收盘平仓，该段剩余部分空仓
+    """
+    if take_profit is None or not state.any():
+        return state
+    start = _segment_start_index(state)
+    ratio = close / close[start]
+    hit = state & ((ratio >= 1 + take_profit) if side > 0 else (ratio <= 1 - take_profit))
+    count = np.cumsum(hit)
+    before_start = count[start] - hit[start]
+    # 持仓到首次止盈的那根K线为止（当根收盘平仓，之后空仓）
+    hits_before = count - hit - before_start
+    return state & (hits_before == 0) & ~hit
+
+
+def generate_positions(close, features, params=None):
+    """
+    V6++ 信号 -> 收盘后持仓数组 (+1 多 / -1 空 / 0 空仓)
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    close = np.asarray(close, dtype=np.float64)
+    sma, slope, dev = features["sma"], features["slope"], features["dev"]
+    ready = ~np.isnan(sma) & ~np.isnan(slope)
+
+    with np.errstate(invalid='ignore'):
+        is_bull = ready & ((close > sma) | (slope > 0))
+        can_short = ready & ~is_bull & (dev < p["short_dev"]) & (slope < p["short_slope"])
+        cover = ~ready | is_bull | (dev > p["cover_dev"])
+
+    long_state = _apply_take_profit(is_bull, close, 1, p["take_profit"])
+    short_state = _apply_take_profit(_hold(can_short, cover), close, -1, p["take_profit"])
+    return long_state.astype(np.int8) - short_state.astype(np.int8)
+
+
+def simulate(close, positions, fee=FEE_RATE, slippage=SLIPPAGE, initial=1.0):
+    """
+    固定数量持仓记账（空头不按日再平衡）
+    返回 (equity 数组, 每笔交易收益数组)，最后一笔未平仓交易按收盘价计入
+    """
+    close = np.asarray(close, dtype=np.float64)
+    pos = np.asarray(positions, dtype=np.float64)
+    prev = np.r_[0.0, pos[:-1]]
+
+    starts = (pos != 0) & (pos != prev)
+    ends = (prev != 0) & (pos != prev)
+    start = np.maximum.accumulate(np.where(starts, np.arange(len(pos)), 0))
+    entry = close[start] * (1 + pos[start] * slippage)
+
+    # 持仓中的浮动盈亏（已扣开仓手续费）
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mark = np.where(pos != 0, (1 - fee) * (1 + pos * (close / entry - 1)), 1.0)
+        prev_entry = np.r_[1.0, entry[:-1]]
+        exit_fill = close * (1 - prev * slippage)
+        realized = np.where(ends, (1 - fee) ** 2 * (1 + prev * (exit_fill / prev_entry - 1)), 1.0)
+    # 空头亏损超过 100% 视为爆仓
+    mark = np.maximum(mark, 0.0)
+    realized = np.maximum(realized, 0.0)
+
+    equity = initial * np.cumprod(realized) * mark
+    trades = realized[ends] - 1
+    if len(pos) and pos[-1] != 0:
+        trades = np.r_[trades, mark[-1] - 1]
+    return equity, trades
+
+
+def compute_stats(equity, trades, positions, close, bars_per_year=BARS_PER_YEAR):
+    """收益 / 年化 / 最大回撤 / 夏普 / 交易统计"""
+    n = len(equity)
+    if n < 2:
+        return {"total_return": 0.0, "cagr": 0.0, "max_drawdown": 0.0, "sharpe": 0.0,
+                "trades": 0, "win_rate": 0.0, "exposure": 0.0, "buy_and_hold": 0.0}
+    returns = np.diff(equity) / np.where(equity[:-1] > 0, equity[:-1], np.nan)
+    returns = np.nan_to_num(returns)
+    std = returns.std()
+    peak = np.maximum.accumulate(equity)
+    years = (n - 1) / bars_per_year
+    total = equity[-1] / equity[0] - 1
+    return {
+        "total_return": float(total),
+        "cagr": float((1 + total) ** (1 / years) - 1) if total > -1 else -1.0,
+        "max_drawdown": float(((equity - peak) / peak).min()),
+        "sharpe": float(returns.mean() / std * np.sqrt(bars_per_year)) if std > 0 else 0.0,
+        "trades": int(len(trades)),
+        "win_rate": float((trades > 0).mean()) if len(trades) else 0.0,
+        "exposure": float((np.asarray(positions) != 0).mean()),
+        "buy_and_hold": float(close[-1] / close[0] - 1),
+    }
+
+
+def run_backtest(df, params=None, fee=FEE_RATE, slippage=SLIPPAGE, features=None):
+    """
+    回测一个交易对的日线 DataFrame (time/close 列)
+    - features: 可传入预计算的 compute_features 结果（参数扫描 / 滚动验证复用）
+    返回 {"params", "stats", "equity", "positions", "time"}
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    close = df['close'].to_numpy(dtype=np.float64)
+    if features is None:
+        features = compute_features(close, p["sma_window"], p["slope_lookback"])
+    positions = generate_positions(close, features, p)
+    equity, trades = simulate(close, positions, fee, slippage)
+    return {
+        "params": p,
+        "stats": compute_stats(equity, trades, positions, close),
+        "equity": equity,
+        "positions": positions,
+        "time": df['time'].to_numpy(),
+    }
+
+
+def run_backtest_loop(close, features, params=None, fee=FEE_RATE, slippage=SLIPPAGE):
+    """
+    逐根K线的状态机参考实现（校验向量化版本用）
+    返回 (positions, equity)
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    n = len(close)
+    positions = np.zeros(n, dtype=np.int8)
+    equity = np.ones(n)
+    side, entry, entry_close, cash = 0, 0.0, 0.0, 1.0
+    long_blocked = short_blocked = short_hold = False
+
+    for t in range(n):
+        sma, slope, dev = features["sma"][t], features["slope"][t], features["dev"][t]
+        ready = not (np.isnan(sma) or np.isnan(slope))
+        is_bull = ready and (close[t] > sma or slope > 0)
+        can_short = ready and not is_bull and dev < p["short_dev"] and slope < p["short_slope"]
+        cover = not ready or is_bull or dev > p["cover_dev"]
+
+        if not is_bull:
+            long_blocked = False
+        if cover:
+            short_hold = short_blocked = False
+        elif can_short:
+            short_hold = True
+
+        want = 0
+        if is_bull and not long_blocked:
+            want = 1
+        if short_hold and not short_blocked:
+            want = -1
+
+        # 止盈
+        if side != 0 and side == want:
+            ratio = close[t] / entry_close
+            if (side > 0 and ratio >= 1 + p["take_profit"]) or (side < 0 and ratio <= 1 - p["take_profit"]):
+                want = 0
+                long_blocked, short_blocked = long_blocked or side > 0, short_blocked or side < 0
+
+        if want != side:
+            if side != 0:
+                fill = close[t] * (1 - side * slippage)
+                cash *= max((1 - fee) ** 2 * (1 + side * (fill / entry - 1)), 0.0)
+            if want != 0:
+                entry, entry_close = close[t] * (1 + want * slippage), close[t]
+            side = want
+
+        positions[t] = side
+        equity[t] = cash * (max((1 - fee) * (1 + side * (close[t] / entry - 1)), 0.0) if side else 1.0)
+    return positions, equity
+
+
+def verify_against_loop(seeds=10, n=2000):
+    """随机样本上比较向量化版本与逐根状态机的持仓和净值"""
+    from indicators import make_sample_ohlcv
+
+    ok = True
+    for seed in range(seeds):
+        df = make_sample_ohlcv(n, freq='1D', seed=seed)
+        close = df['close'].to_numpy()
+        features = compute_features(close)
+        for take_profit in (1.0, 0.3, 0.1):
+            params = {"take_profit": take_profit}
+            result = run_backtest(df, params, features=features)
+            positions, equity = run_backtest_loop(close, features, params)
+            if not ((result["positions"] == positions).all() and np.allclose(result["equity"], equity)):
+                print(f"❌ seed={seed} take_profit={take_profit} 与逐根实现不一致")
+                ok = False
+    return ok
+
+
+async def load_daily_history(symbol, years=5):
+    """从本地K线仓库加载（必要时回补）最近 years 年日线，额外多取 SMA 预热期"""
+    from candle_store import get_history
+    from market_data import close_exchange
+
+    since = int((pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=365 * years + DEFAULT_PARAMS["sma_window"]))
+                .timestamp() * 1000)
+    try:
+        return await get_history(symbol, '1d', since=since)
+    finally:
+        await close_exchange()
+
+
+def _print_stats(title, stats, elapsed):
+    print(f"{title}  ({elapsed * 1000:.1f} ms)")
+    print(f"  总收益 {stats['total_return']:+.1%}   年化 {stats['cagr']:+.1%}   "
+          f"最大回撤 {stats['max_drawdown']:.1%}   夏普 {stats['sharpe']:.2f}")
+    print(f"  交易 {stats['trades']} 笔   胜率 {stats['win_rate']:.0%}   "
+          f"持仓时间 {stats['exposure']:.0%}   买入持有 {stats['buy_and_hold']:+.1%}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="V6++ 策略回测")
+    parser.add_argument("symbol", nargs="?", default="BTC/USDT")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--sample", action="store_true", help="使用随机游走样本数据（离线测试）")
+    parser.add_argument("--verify", action="store_true", help="与逐根状态机参考实现对比")
+    args = parser.parse_args()
+
+    if args.verify:
+        if not verify_against_loop():
+            raise SystemExit(1)
+        print("✅ 向量化回测与逐根实现一致")
+
+    if args.sample:
+        from indicators import make_sample_ohlcv
+        df = make_sample_ohlcv(365 * args.years + DEFAULT_PARAMS["sma_window"], freq='1D')
+    else:
+        df = asyncio.run(load_daily_history(args.symbol, args.years))
+
+    start = time.perf_counter()
+    result = run_backtest(df)
+    elapsed = time.perf_counter() - start
+    first, last = pd.Timestamp(result["time"][0]), pd.Timestamp(result["time"][-1])
+    _print_stats(f"{args.symbol} V6++ {first:%Y-%m-%d} ~ {last:%Y-%m-%d} ({len(df)} 根日线)",
+                 result["stats"], elapsed)
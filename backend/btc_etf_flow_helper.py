@@ -1,41 +1,132 @@
 #!/usr/bin/env python3
 """
 BTC ETF Flow Helper - 为 main.py 提供的简化接口
+汇总来自本地 ETF 资金流仓库 (etf_flow_store)，Farside 全量表只用来追加新交易日 / 修正最近几个交易日
+可在工作线程中与其他宏观数据并行调用: 不修改全局 sys.stdout，抓取 / 解析日志都走 log 参数
 """
 
-from btc_etf_scraper import BTCETFScraper
+import os
+import re
+import threading
+import time
+from io import StringIO
 
+import pandas as pd
 
-def get_btc_etf_flow_summary():
+from etf_flow_store import TOTAL_COLUMN, get_etf_store
+
+FARSIDE_URL = "https://farside.co.uk/bitcoin-etf-flow-all-data/"
+
+# Farside 抓取最小间隔（秒）: 数据每个交易日只更新一次
+ETF_SCRAPE_INTERVAL = int(os.getenv("ETF_SCRAPE_INTERVAL", "3600"))
+FARSIDE_TIMEOUT = 30
+
+_last_scrape = 0.0
+_scrape_lock = threading.Lock()
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def fetch_farside_html(log=print):
+    """用 cloudscraper 绕过 Cloudflare 获取 Farside 全量表页面"""
+    import cloudscraper
+
+    log(f"Fetching data from {FARSIDE_URL}...")
+    response = cloudscraper.create_scraper().get(FARSIDE_URL, timeout=FARSIDE_TIMEOUT)
+    response.raise_for_status()
+    log(f"✓ Successfully fetched data with cloudscraper (Status: {response.status_code})")
+    return response.text
+
+
+def _parse_flow(value):
+    # Excel 风格: "(10.5)" -> -10.5，"-" / 空 -> 0，"1,234.5" -> 1234.5
+    text = str(value).strip().replace(",", "")
+    if text in ("", "-", "nan", "None"):
+        return 0.0
+    match = re.fullmatch(r"\((.+)\)", text)
+    try:
+        return -float(match.group(1)) if match else float(text)
+    except ValueError:
+        return 0.0
+
+
+def parse_flow_table(html, log=print):
+    """
+    页面中列数最多且含 Total 列的表格 -> [{"Date": "2024-01-11", "IBIT": 111.7, ..., "Total": 655.3}, ...]
+    汇总行 (Total / Average / Maximum / Minimum) 和表头费率行的日期无法解析，直接丢弃
+    """
+    tables = []
+    for table in pd.read_html(StringIO(html)):
+        if isinstance(table.columns, pd.MultiIndex):
+            table.columns = table.columns.get_level_values(0)
+        table.columns = [str(c).strip() for c in table.columns]
+        if TOTAL_COLUMN in table.columns:
+            tables.append(table)
+    if not tables:
+        raise ValueError("Farside 页面中未找到资金流表格")
+    table = max(tables, key=len)
+    log(f"✓ Found table with {len(table)} rows and {len(table.columns)} columns")
+
+    table = table.rename(columns={table.columns[0]: "Date"})
+    dates = pd.to_datetime(table["Date"], format="%d %b %Y", errors="coerce")
+    table = table[dates.notna()]
+    records = [
+        {"Date": date.strftime("%Y-%m-%d"),
+         **{name: _parse_flow(row[name]) for name in table.columns if name != "Date" and not name.startswith("Unnamed")}}
+        for date, (_, row) in zip(dates[dates.notna()], table.iterrows())
+    ]
+    log(f"✓ Cleaned {len(records)} rows of data")
+    return records
+
+
+def update_etf_flows(store=None, log=print):
+    """
+    抓取 Farside 全量表，追加新交易日并修正最近几个交易日，返回新增或修正的天数
+    距上次抓取不足 ETF_SCRAPE_INTERVAL，或其他线程正在抓取时直接返回 0
+    """
+    global _last_scrape
+    store = store if store is not None else get_etf_store()
+    if not _scrape_lock.acquire(blocking=False):
+        return 0
+    try:
+        if time.time() - _last_scrape < ETF_SCRAPE_INTERVAL:
+            return 0
+        _last_scrape = time.time()
+
+        records = parse_flow_table(fetch_farside_html(log), log)
+        added = store.append(records)
+        log(f"✓ BTC ETF 新增/修正 {added} 个交易日 (最新 {store.last_date})")
+        return added
+    finally:
+        _scrape_lock.release()
+
+
+def get_btc_etf_flow_summary(quiet=True, log=print, strict=False):
     """
     获取 BTC ETF 流向汇总信息
+    quiet: 不输出抓取日志；log: 日志函数 (默认 print，可传 logger.info)
+    strict: 本地也没有数据时抛异常而不是返回 "数据不可用"
     返回: 中文描述字符串，例如 "单日流入 $211.4M; 近5日累计流出 $447.7M"
     """
+    log = _silent if quiet else log
+    store = get_etf_store()
     try:
-        scraper = BTCETFScraper()
-        
-        # 静默模式：不打印详细信息
-        import sys
-        from io import StringIO
-        old_stdout = sys.stdout
-        sys.stdout = StringIO()
-        
-        # 获取数据
-        html_content = scraper.fetch_data()
-        raw_df = scraper.parse_html_table(html_content)
-        clean_df = scraper.clean_dataframe(raw_df)
-        summary = scraper.get_flow_summary(clean_df)
-        
-        # 恢复输出
-        sys.stdout = old_stdout
-        
-        return summary
+        update_etf_flows(store, log=log)
     except Exception as e:
-        # 如果获取失败，返回默认值
-        return f"数据不可用 (错误: {str(e)})"
+        # 抓取失败时沿用本地数据；本地也没有则返回默认值
+        log(f"⚠️ BTC ETF 抓取失败，使用本地数据: {e!r}")
+        if not len(store):
+            if strict:
+                raise
+            return f"数据不可用 (错误: {str(e)})"
+    if strict and not len(store):
+        raise RuntimeError("本地没有 BTC ETF 资金流数据")
+    return store.summary_text()
 
 
 if __name__ == "__main__":
     # 测试
-    result = get_btc_etf_flow_summary()
+    result = get_btc_etf_flow_summary(quiet=False)
     print(f"BTC ETF Flow Summary: {result}")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+本地 K 线存储 - SQLite 持久化 + 增量尾部刷新
+按 (symbol, timeframe) 存储 OHLCV，每次只向交易所请求最后一根已存K线之后的数据，
+冷启动时直接从磁盘加载历史
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+import market_data
+
+CANDLE_DB_PATH = os.getenv(
+    "CANDLE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "candles.db")
+)
+
+# 单次尾部刷新最多请求的K线数 (Binance 上限 1000)
+MAX_FETCH_LIMIT = 1000
+
+
+class CandleStore:
+    """
+    SQLite K线仓库 - 主键 (symbol, timeframe, time)，重复写入即覆盖（用于更新未收盘K线）
+    """
+
+    def __init__(self, path=CANDLE_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    time INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, timeframe, time)
+                ) WITHOUT ROWID
+            """)
+            # 交易所最早可用的K线时间（回补时发现 since 早于上市时间后记录）
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS history_heads (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    time INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, timeframe)
+                ) WITHOUT ROWID
+            """)
+            self._conn.commit()
+
+    def upsert(self, symbol, timeframe, bars):
+        """
+        写入 ccxt 格式K线 [[ts_ms, o, h, l, c, v], ...]
+        """
+        if not bars:
+            return
+        rows = [(symbol, timeframe, int(b[0]), b[1], b[2], b[3], b[4], b[5]) for b in bars]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def last_timestamp(self, symbol, timeframe):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(time) FROM candles WHERE symbol = ? AND timeframe = ?",
+                (symbol, timeframe)
+            ).fetchone()
+        return row[0]
+
+    def first_timestamp(self, symbol, timeframe):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(time) FROM candles WHERE symbol = ? AND timeframe = ?",
+                (symbol, timeframe)
+            ).fetchone()
+        return row[0]
+
+    def history_head(self, symbol, timeframe):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT time FROM history_heads WHERE symbol = ? AND timeframe = ?", (symbol, timeframe)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_history_head(self, symbol, timeframe, ts):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO history_heads VALUES (?, ?, ?)", (symbol, timeframe, int(ts)))
+            self._conn.commit()
+
+    def symbols(self, timeframe):
+        """本地已存有该周期K线的全部交易对"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT symbol FROM candles WHERE timeframe = ?", (timeframe,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def count_since(self, symbol, timeframe, since):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM candles WHERE symbol = ? AND timeframe = ? AND time >= ?",
+                (symbol, timeframe, since)
+            ).fetchone()
+        return row[0]
+
+    def load(self, symbol, timeframe, limit=None, since=None):
+        """
+        读取K线（按时间升序），limit 表示取最新的 N 根
+        """
+        sql = "SELECT time, open, high, low, close, volume FROM candles WHERE symbol = ? AND timeframe = ?"
+        params = [symbol, timeframe]
+        if since is not None:
+            sql += " AND time >= ?"
+            params.append(since)
+        sql += " ORDER BY time DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [list(r) for r in reversed(rows)]
+
+
+_store = None
+_key_locks = {}
+
+
+def get_store():
+    """
+    获取进程内共享的K线仓库
+    """
+    global _store
+    if _store is None:
+        _store = CandleStore()
+    return _store
+
+
+def _get_key_lock(symbol, timeframe):
+    # 同一 (symbol, timeframe) 的刷新串行化，避免并发请求重复拉取
+    key = (symbol, timeframe)
+    if key not in _key_locks:
+        _key_locks[key] = asyncio.Lock()
+    return _key_locks[key]
+
+
+async def refresh(symbol, timeframe, limit):
+    """
+    增量刷新: 本地已有连续的 limit 根K线时只拉取尾部，否则整段拉取
+    """
+    store = get_store()
+    tf_ms = market_data.timeframe_to_ms(timeframe)
+    last_ts = await asyncio.to_thread(store.last_timestamp, symbol, timeframe)
+
+    if last_ts is not None:
+        now_ms = int(time.time() * 1000)
+        missing = (now_ms - last_ts) // tf_ms + 1
+        window_start = last_ts - (limit - 1) * tf_ms
+        stored = await asyncio.to_thread(store.count_since, symbol, timeframe, window_start)
+        if stored >= limit and missing < MAX_FETCH_LIMIT:
+            # 从最后一根已存K线开始拉取（它可能尚未收盘，需要覆盖）
+            bars = await market_data.fetch_ohlcv(symbol, timeframe, since=last_ts, limit=int(missing) + 1)
+            await asyncio.to_thread(store.upsert, symbol, timeframe, bars)
+            return len(bars)
+
+    bars = await market_data.fetch_ohlcv(symbol, timeframe, limit=limit)
+    await asyncio.to_thread(store.upsert, symbol, timeframe, bars)
+    return len(bars)
+
+
+async def backfill(symbol, timeframe, since):
+    """
+    分页拉取 since (毫秒) 之后的全部K线，用于回测等需要多年历史的场景
+    本地已有从 since 起的连续数据时只拉取尾部；since 早于交易所最早K线时以最早K线为起点
+    """
+    store = get_store()
+    tf_ms = market_data.timeframe_to_ms(timeframe)
+    first_ts = await asyncio.to_thread(store.first_timestamp, symbol, timeframe)
+    last_ts = await asyncio.to_thread(store.last_timestamp, symbol, timeframe)
+    head = await asyncio.to_thread(store.history_head, symbol, timeframe)
+    start = max(since, head) if head is not None else since
+
+    cursor = start
+    if first_ts is not None and first_ts <= start:
+        expected = (last_ts - start) // tf_ms + 1
+        stored = await asyncio.to_thread(store.count_since, symbol, timeframe, start)
+        if stored >= expected:
+            cursor = last_ts
+
+    total = 0
+    while True:
+        bars = await market_data.fetch_ohlcv(symbol, timeframe, since=cursor, limit=MAX_FETCH_LIMIT)
+        if cursor == start and bars and bars[0][0] > start:
+            # 交易所在这之前没有K线，下次从这里判断本地是否连续
+            await asyncio.to_thread(store.set_history_head, symbol, timeframe, bars[0][0])
+        await asyncio.to_thread(store.upsert, symbol, timeframe, bars)
+        total += len(bars)
+        if len(bars) < MAX_FETCH_LIMIT:
+            return total
+        cursor = bars[-1][0] + tf_ms
+
+
+async def get_history(symbol, timeframe='1d', since=0):
+    """
+    获取 since (毫秒) 之后的全部K线 (DataFrame)，交易所不可用时退回磁盘缓存
+    """
+    store = get_store()
+    async with _get_key_lock(symbol, timeframe):
+        try:
+            await backfill(symbol, timeframe, since)
+        except Exception as e:
+            if await asyncio.to_thread(store.last_timestamp, symbol, timeframe) is None:
+                raise
+            print(f"⚠️ {symbol} {timeframe} 历史回补失败，使用本地缓存: {e}")
+        bars = await asyncio.to_thread(store.load, symbol, timeframe, None, since)
+    return market_data.bars_to_dataframe(bars)
+
+
+async def get_candles(symbol, timeframe='1h', limit=500):
+    """
+    获取最新 limit 根K线 (DataFrame)，交易所不可用时退回磁盘缓存
+    """
+    store = get_store()
+    async with _get_key_lock(symbol, timeframe):
+        try:
+            await refresh(symbol, timeframe, limit)
+        except Exception as e:
+            if await asyncio.to_thread(store.last_timestamp, symbol, timeframe) is None:
+                raise
+            print(f"⚠️ {symbol} {timeframe} 增量刷新失败，使用本地缓存: {e}")
+        bars = await asyncio.to_thread(store.load, symbol, timeframe, limit)
+    return market_data.bars_to_dataframe(bars)
+
+
+if __name__ == "__main__":
+    # 测试: 连续两次获取，第二次只拉取尾部
+    async def _main():
+        try:
+            for _ in range(2):
+                start = time.time()
+                df = await get_candles('BTC/USDT', '1d', limit=365)
+                print(f"1d: {len(df)} 根K线, 耗时 {time.time() - start:.2f}s, 最新 {df.iloc[-1]['time']}")
+        finally:
+            await market_data.close_exchange()
+
+    asyncio.run(_main())
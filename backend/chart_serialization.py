@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+图表数据序列化 - 列式 / 一次性生成记录，替代逐行 iterrows
+配合 ORJSONResponse 直接序列化 numpy 数组，避免 FastAPI 通用编码器逐个处理 numpy 标量
+"""
+
+import numpy as np
+
+# DataFrame 列 -> 前端字段
+CHART_FIELDS = {
+    'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close',
+    'volume': 'volume', 'SMA50': 'sma50', 'SMA200': 'sma200',
+}
+
+
+def _epoch_seconds(df):
+    return df['time'].to_numpy().astype('datetime64[s]').astype(np.int64)
+
+
+def chart_columns(df):
+    """
+    列式输出: {"time": [...], "open": [...], ...}，每列是一个 float64/int64 数组
+    """
+    if df.empty:
+        return {"time": [], **{field: [] for field in CHART_FIELDS.values()}}
+    columns = {"time": _epoch_seconds(df)}
+    for col, field in CHART_FIELDS.items():
+        columns[field] = np.ascontiguousarray(df[col].to_numpy(dtype=np.float64))
+    return columns
+
+
+def chart_records(df):
+    """
+    记录输出 (与原接口格式一致): [{"time": ..., "open": ..., ...}, ...]
+    每列先整体 tolist() 转为 Python 原生类型，再一次性 zip 成记录
+    """
+    if df.empty:
+        return []
+    keys = ["time", *CHART_FIELDS.values()]
+    values = [_epoch_seconds(df).tolist()]
+    values += [df[col].to_numpy(dtype=np.float64).tolist() for col in CHART_FIELDS]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def benchmark(sizes=(365, 2000, 10000), repeat=5):
+    """
+    微基准: 每根K线的序列化耗时 (构建 payload + JSON 编码)
+    """
+    import json
+    import timeit
+
+    import orjson
+    import pandas as pd
+    from fastapi.encoders import jsonable_encoder
+
+    from indicators import calculate_daily_indicators, make_sample_ohlcv
+
+    def legacy(df):
+        chart_data = []
+        for index, row in df.iterrows():
+            chart_data.append({
+                "time": int(row['time'].timestamp()),
+                "open": row['open'], "high": row['high'], "low": row['low'], "close": row['close'],
+                "volume": row['volume'],
+                "sma50": row['SMA50'], "sma200": row['SMA200']
+            })
+        return json.dumps(jsonable_encoder({"data": chart_data})).encode()
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    variants = [
+        ("iterrows + jsonable_encoder", legacy),
+        ("records + orjson", lambda df: orjson.dumps({"data": chart_records(df)}, option=option)),
+        ("columns + orjson", lambda df: orjson.dumps({"data": chart_columns(df)}, option=option)),
+    ]
+
+    for n in sizes:
+        df = calculate_daily_indicators(make_sample_ohlcv(n, freq='1D'))
+        assert pd.Series(orjson.loads(variants[1][1](df))["data"][-1]).equals(
+            pd.Series(json.loads(legacy(df))["data"][-1]))
+        for name, fn in variants:
+            t = min(timeit.repeat(lambda: fn(df), number=1, repeat=repeat))
+            print(f"n={n:6d}  {name:28s} {t * 1000:8.2f} ms  ({t / n * 1e6:6.2f} µs/根)")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("图表序列化基准测试")
+    print("=" * 60)
+    benchmark()
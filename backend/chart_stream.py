@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+图表实时推送 - 一次快照 + K线增量
+订阅实时K线接入 (kline_stream) 的日线推送，SMA50 / SMA200 直接取推送附带的指标行
+（与快照同一个 indicator_engine 状态，不再单独维护收盘价窗口），再分发给该交易对的所有连接
+"""
+
+import asyncio
+
+# 每个连接最多积压的增量条数（客户端过慢时丢弃最旧的）
+MAX_PENDING = 256
+
+
+def delta(bar, closed, indicators=None):
+    """
+    bar(time ms) + 指标行 -> 前端增量 {time(s), open, high, low, close, volume, sma50, sma200, closed}
+    指标尚未预热时 SMA 为 0（前端不绘制）
+    """
+    indicators = indicators or {}
+    return {
+        "time": bar["time"] // 1000,
+        "open": bar["open"], "high": bar["high"], "low": bar["low"], "close": bar["close"],
+        "volume": bar["volume"],
+        "sma50": indicators.get("SMA50", 0.0),
+        "sma200": indicators.get("SMA200", 0.0),
+        "closed": closed,
+    }
+
+
+class ChartFeed:
+    """
+    - subscribe(symbol): 返回该连接的队列
+    - on_bar: 注册为 KlineIngestor 的监听器
+    """
+
+    def __init__(self, timeframe='1d'):
+        self.timeframe = timeframe
+        self._queues = {}
+
+    def subscribe(self, symbol):
+        queue = asyncio.Queue(maxsize=MAX_PENDING)
+        self._queues.setdefault(symbol, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, symbol, queue):
+        queues = self._queues.get(symbol)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._queues[symbol]
+
+    def on_bar(self, symbol, timeframe, bar, closed, indicators=None):
+        queues = self._queues.get(symbol)
+        if not queues or timeframe != self.timeframe:
+            return
+        payload = delta(bar, closed, indicators)
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    def subscribers(self):
+        return {symbol: len(queues) for symbol, queues in self._queues.items()}
+
+
+if __name__ == "__main__":
+    # 测试: 按 KlineIngestor 的方式 (快照 apply -> 未收盘 preview_bar / 收盘 update_bar) 推送，
+    # 增量 SMA 与 calculate_daily_indicators 全量计算一致
+    import numpy as np
+
+    from incremental_indicators import IndicatorEngine
+    from indicators import calculate_daily_indicators, make_sample_ohlcv
+
+    df = make_sample_ohlcv(400, freq='1D')
+    full = calculate_daily_indicators(df)
+    engine = IndicatorEngine()
+    chart_feed = ChartFeed()
+
+    async def _main():
+        engine.apply('BTC/USDT', '1d', df.iloc[:300], daily=True)
+        feed_queue = chart_feed.subscribe('BTC/USDT')
+        for i in range(299, 400):
+            row = df.iloc[i]
+            bar = {"time": int(row['time'].timestamp() * 1000), "open": row['open'], "high": row['high'],
+                   "low": row['low'], "close": row['close'], "volume": row['volume']}
+            live = {**bar, "close": row['close'] * 1.01}
+            chart_feed.on_bar('BTC/USDT', '1d', live, False, engine.preview_bar('BTC/USDT', '1d', live, daily=True))
+            chart_feed.on_bar('BTC/USDT', '1d', bar, True, engine.update_bar('BTC/USDT', '1d', bar, daily=True))
+        deltas = [feed_queue.get_nowait() for _ in range(feed_queue.qsize())]
+        closed = [d for d in deltas if d["closed"]]
+        ok = np.allclose([d["sma200"] for d in closed], full['SMA200'].iloc[299:]) and \
+            np.allclose([d["sma50"] for d in closed], full['SMA50'].iloc[299:])
+        preview = [d for d in deltas if not d["closed"]]
+        expected = full['SMA50'].iloc[299:].to_numpy() + df['close'].iloc[299:].to_numpy() * 0.01 / 50
+        print(f"增量 {len(deltas)} 条, 收盘 {len(closed)} 条, SMA 与全量计算一致: {ok}, "
+              f"未收盘预览一致: {np.allclose([d['sma50'] for d in preview], expected)}")
+
+    asyncio.run(_main())
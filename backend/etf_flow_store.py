@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+BTC ETF 资金流仓库 - btc_etf_flows.json 一次加载为列式数组
+每日流向按 (交易日, 基金) 存成二维数组，并预先计算前缀和 (及平方前缀和)，
+单日 / 近5日 / 近一周 / 近一月汇总、区间累计、N 日滚动和、z-score 都由前缀和相减得到；
+抓取到新数据时追加新交易日，并用最新值覆盖最近几个交易日（Farside 当日行会在各基金公布后修正）
+仓库里的 btc_etf_flows.json 只作为初始数据，运行时写入 data/ 下的副本
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+# 随代码提交的历史数据（只读）
+ETF_FLOWS_SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "btc_etf_flows.json")
+
+# 运行时数据: 存在时优先加载，抓取更新只写这里
+ETF_FLOWS_PATH = os.getenv(
+    "ETF_FLOWS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "btc_etf_flows.json")
+)
+
+# 每次抓取重新合并的最近交易日数（当日未公布的基金记为 "-" 即 0，之后的抓取用修正值覆盖）
+REVISE_DAYS = int(os.getenv("ETF_FLOWS_REVISE_DAYS", "3"))
+
+TOTAL_COLUMN = "Total"
+
+# 近5日净流向绝对值低于该值 (百万美元) 视为小幅波动
+QUIET_FLOW_THRESHOLD = 100.0
+
+
+def _parse_date(value):
+    """'2024-01-11' / Timestamp -> datetime64[D]；汇总行 (Total / Average ...) 返回 None"""
+    try:
+        return np.datetime64(str(value)[:10], 'D')
+    except ValueError:
+        return None
+
+
+def format_flow(amount):
+    """百万美元 -> '$211.4M' / '$1.2B'（不带方向）"""
+    amount = abs(amount)
+    if amount >= 1000:
+        return f"${amount / 1000:.1f}B"
+    return f"${amount:.1f}M"
+
+
+class _Columns:
+    # 一次追加生成的不可变快照: 读取方拿到引用后无需加锁
+    def __init__(self, dates, columns, flows):
+        self.dates = dates
+        self.columns = columns
+        self.index = {name: i for i, name in enumerate(columns)}
+        self.flows = flows
+        self.prefix = np.vstack([np.zeros((1, len(columns))), np.cumsum(flows, axis=0)])
+        self.prefix_sq = np.vstack([np.zeros((1, len(columns))), np.cumsum(flows ** 2, axis=0)])
+
+
+class ETFFlowStore:
+    """
+    - columns: 各基金代码 + Total（单位: 百万美元）
+    - append(records): 追加新交易日，最近 revise_days 个交易日用新记录覆盖，更早的不再改动
+    """
+
+    def __init__(self, path=ETF_FLOWS_PATH, seed_path=ETF_FLOWS_SEED_PATH, revise_days=REVISE_DAYS):
+        self.path = path
+        self.revise_days = revise_days
+        self._lock = threading.Lock()
+        self._data = _Columns(np.empty(0, dtype='datetime64[D]'), [TOTAL_COLUMN], np.empty((0, 1)))
+        source = path if path and os.path.exists(path) else seed_path
+        if source and os.path.exists(source):
+            with open(source, encoding='utf-8') as f:
+                self.append(json.load(f), save=False)
+
+    def __len__(self):
+        return len(self._data.dates)
+
+    @property
+    def columns(self):
+        return self._data.columns
+
+    @property
+    def last_date(self):
+        dates = self._data.dates
+        return dates[-1] if len(dates) else None
+
+    def append(self, records, save=True):
+        """
+        records: [{"Date": ..., "IBIT": ..., ..., "Total": ...}, ...]（任意顺序，可含汇总行）
+        返回新增或被修正的交易日数（无变化时不写文件）
+        """
+        with self._lock:
+            data = self._data
+            n = len(data.dates)
+            keep = max(n - self.revise_days, 0)
+            cutoff = data.dates[keep - 1] if keep else None
+            rows = {}
+            for record in records:
+                date = _parse_date(record.get("Date"))
+                if date is not None and (cutoff is None or date > cutoff):
+                    rows[date] = record
+            if not rows:
+                return 0
+
+            columns = list(data.columns)
+            for record in rows.values():
+                for name in record:
+                    if name != "Date" and name not in columns:
+                        # 新上市的基金: 历史补 0，Total 保持在最后一列
+                        columns.insert(len(columns) - 1, name)
+
+            old_flows = np.zeros((n, len(columns)))
+            old_flows[:, [columns.index(name) for name in data.columns]] = data.flows
+            # 可修正的尾部: 已有行 + 本次记录（同一交易日以本次为准）
+            old_tail = dict(zip(data.dates[keep:], old_flows[keep:]))
+            merged = dict(old_tail)
+            for date, record in rows.items():
+                merged[date] = np.nan_to_num(np.array([float(record.get(name) or 0.0) for name in columns]))
+            tail_dates = np.array(sorted(merged), dtype='datetime64[D]')
+            changed = sum(1 for d in tail_dates if d not in old_tail or not np.array_equal(old_tail[d], merged[d]))
+            if not changed:
+                return 0
+            tail_flows = np.array([merged[d] for d in tail_dates]).reshape(len(tail_dates), len(columns))
+            self._data = _Columns(np.concatenate([data.dates[:keep], tail_dates]), columns,
+                                  np.vstack([old_flows[:keep], tail_flows]))
+        if save and self.path:
+            self.save()
+        return changed
+
+    def save(self):
+        """写回 JSON（只保留逐日记录），先写临时文件再替换"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = self._data
+        records = [
+            {"Date": str(date), **{name: round(float(v), 1) for name, v in zip(data.columns, row)}}
+            for date, row in zip(data.dates, data.flows)
+        ]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def window_sum(self, days, column=TOTAL_COLUMN):
+        """最近 N 个交易日的净流向"""
+        data = self._data
+        i = data.index[column]
+        n = len(data.dates)
+        return float(data.prefix[n, i] - data.prefix[max(n - days, 0), i])
+
+    def calendar_sum(self, days, column=TOTAL_COLUMN):
+        """截至最后一个交易日的最近 N 个自然日净流向（周 = 7，月 = 30）"""
+        data = self._data
+        if not len(data.dates):
+            return 0.0
+        i = data.index[column]
+        start = np.searchsorted(data.dates, data.dates[-1] - np.timedelta64(days - 1, 'D'))
+        return float(data.prefix[-1, i] - data.prefix[start, i])
+
+    def aggregates(self):
+        """{"date", "daily", "sum_5d", "week", "month"}（百万美元），无数据返回 None"""
+        if not len(self):
+            return None
+        return {
+            "date": str(self.last_date),
+            "daily": round(self.window_sum(1), 1),
+            "sum_5d": round(self.window_sum(5), 1),
+            "week": round(self.calendar_sum(7), 1),
+            "month": round(self.calendar_sum(30), 1),
+        }
+
+    def _column_indices(self, columns):
+        data = self._data
+        columns = list(columns or data.columns)
+        unknown = [name for name in columns if name not in data.index]
+        if unknown:
+            raise ValueError(f"未知的基金代码: {', '.join(unknown)}")
+        return columns, [data.index[name] for name in columns]
+
+    def _row_range(self, start=None, end=None):
+        # 日期区间 [start, end] -> 行下标 [i0, i1)
+        data = self._data
+        i0 = 0 if start is None else int(np.searchsorted(data.dates, np.datetime64(start, 'D'), side='left'))
+        i1 = len(data.dates) if end is None else int(np.searchsorted(data.dates, np.datetime64(end, 'D'),
+                                                                     side='right'))
+        return i0, max(i1, i0)
+
+    def range_sum(self, start=None, end=None, columns=None):
+        """[start, end] 区间内各列净流向 {列名: 百万美元}"""
+        columns, idx = self._column_indices(columns)
+        i0, i1 = self._row_range(start, end)
+        prefix = self._data.prefix
+        return dict(zip(columns, (prefix[i1, idx] - prefix[i0, idx]).tolist()))
+
+    def zscores(self, window=20, column=TOTAL_COLUMN):
+        """
+        每日净流向相对前 window 个交易日的 z-score（不含当日），历史不足或方差为 0 时为 NaN
+        """
+        data = self._data
+        i = data.index[column]
+        n = len(data.dates)
+        out = np.full(n, np.nan)
+        if n <= window:
+            return out
+        rows = np.arange(window, n)
+        total = data.prefix[rows, i] - data.prefix[rows - window, i]
+        total_sq = data.prefix_sq[rows, i] - data.prefix_sq[rows - window, i]
+        mean = total / window
+        std = np.sqrt(np.maximum(total_sq / window - mean ** 2, 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[rows] = np.where(std > 1e-9, (data.flows[rows, i] - mean) / std, np.nan)
+        return out
+
+    def query(self, start=None, end=None, columns=None, window=5, zscore_window=20):
+        """
+        区间查询（列式）:
+        - daily / cumulative (区间内累计) / rolling (截至当日 window 个交易日之和，历史不足为 NaN): {列名: [...]}
+        - zscore: Total 每日净流向相对前 zscore_window 日的 z-score
+        - totals: 区间内各列净流向
+        """
+        if window < 1 or zscore_window < 2:
+            raise ValueError("window 须 >= 1，zscore_window 须 >= 2")
+        data = self._data
+        columns, idx = self._column_indices(columns)
+        i0, i1 = self._row_range(start, end)
+        rows = np.arange(i0, i1)
+        prefix = data.prefix[:, idx]
+        cumulative = prefix[rows + 1] - prefix[i0]
+        rolling = prefix[rows + 1] - prefix[np.maximum(rows + 1 - window, 0)]
+        rolling[rows + 1 < window] = np.nan
+        zscore = self.zscores(zscore_window)[i0:i1]
+
+        def _series(values):
+            return {name: np.round(values[:, j], 2).tolist() for j, name in enumerate(columns)}
+
+        return {
+            "dates": [str(d) for d in data.dates[i0:i1]],
+            "columns": columns,
+            "window": window,
+            "daily": _series(data.flows[i0:i1][:, idx]),
+            "cumulative": _series(cumulative),
+            "rolling": _series(rolling),
+            "zscore": np.round(zscore, 3).tolist(),
+            "totals": {name: round(v, 1) for name, v in zip(columns, (prefix[i1] - prefix[i0]).tolist())},
+        }
+
+    def features(self, zscore_window=20):
+        """
+        情景评分用的数值特征（百万美元）: etf_daily / etf_5d / etf_week / etf_month / etf_zscore
+        """
+        if not len(self):
+            return {}
+        zscore = self.zscores(zscore_window)[-1]
+        return {
+            "etf_daily": round(self.window_sum(1), 1),
+            "etf_5d": round(self.window_sum(5), 1),
+            "etf_week": round(self.calendar_sum(7), 1),
+            "etf_month": round(self.calendar_sum(30), 1),
+            "etf_zscore": round(float(zscore), 3) if np.isfinite(zscore) else 0.0,
+        }
+
+    def summary_text(self):
+        """例如 "单日流入 $211.4M; 近5日累计流出 $447.7M" """
+        agg = self.aggregates()
+        if agg is None:
+            return "数据不可用"
+        daily = f"单日{'流入' if agg['daily'] >= 0 else '流出'} {format_flow(agg['daily'])}"
+        if abs(agg["sum_5d"]) < QUIET_FLOW_THRESHOLD:
+            return f"{daily}; 近5日小幅波动"
+        return f"{daily}; 近5日累计{'流入' if agg['sum_5d'] >= 0 else '流出'} {format_flow(agg['sum_5d'])}"
+
+
+_store = None
+
+
+def get_etf_store():
+    """
+    获取进程内共享的 ETF 资金流仓库（首次调用时加载 JSON）
+    """
+    global _store
+    if _store is None:
+        _store = ETFFlowStore()
+    return _store
+
+
+if __name__ == "__main__":
+    # 测试: 前缀和汇总与逐日求和一致，追加接收新交易日并修正最近几个交易日
+    import time
+
+    start = time.perf_counter()
+    store = ETFFlowStore(path=None, seed_path=None)
+    with open(ETF_FLOWS_SEED_PATH, encoding='utf-8') as f:
+        records = json.load(f)
+    store.append(records[:-10], save=False)
+    print(f"加载 {len(store)} 个交易日, {len(store.columns) - 1} 只基金, "
+          f"耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    added = store.append(records, save=False)
+    print(f"追加新交易日 {added} 个 (重复追加: {store.append(records, save=False)} 个)")
+
+    dated = [r for r in records if _parse_date(r["Date"]) is not None]
+    # 当日行先以部分基金 "-" (0) 发布，之后的抓取修正；早于修正窗口的交易日不受影响
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        revised = ETFFlowStore(path=os.path.join(tmp, "data", "flows.json"), seed_path=None)
+        revised.append(dated[:-1])
+        final = dict(dated[-1])
+        partial = {**final, "FBTC": 0.0, "Total": final["Total"] - final["FBTC"]}
+        revised.append([partial])
+        partial_total = revised.window_sum(1)
+        fixed = revised.append([final, {**dated[-20], "Total": 0.0}])
+        reloaded = ETFFlowStore(path=revised.path, seed_path=None)
+        print(f"当日修正: {partial_total:.1f} -> {reloaded.window_sum(1):.1f} (修正 {fixed} 天, "
+              f"Farside {final['Total']:.1f}, 窗口外交易日未改动: "
+              f"{reloaded.range_sum(dated[-20]['Date'], dated[-20]['Date'])['Total'] == dated[-20]['Total']})")
+
+    expected = sum(r["Total"] for r in dated[-5:])
+    print(f"近5日: {store.window_sum(5):.1f} (逐日求和 {expected:.1f})")
+    print(store.aggregates())
+    print(store.summary_text())
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        store.aggregates()
+    print(f"汇总查询 {(time.perf_counter() - start) * 100:.2f} µs/次")
+
+    # 区间查询 / z-score 与逐日计算一致
+    result = store.query('2025-01-01', '2025-06-30', ['IBIT', 'GBTC', 'Total'], window=5)
+    in_range = [r for r in dated if '2025-01-01' <= r["Date"] <= '2025-06-30']
+    print(f"2025H1 IBIT 累计: {result['totals']['IBIT']} (逐日求和 {sum(r['IBIT'] for r in in_range):.1f})")
+    totals = np.array([r["Total"] for r in dated])
+    ref = (totals[-1] - totals[-21:-1].mean()) / totals[-21:-1].std()
+    print(f"最新 z-score: {store.zscores(20)[-1]:.4f} (直接计算 {ref:.4f})")
+    print(store.features())
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        store.query(window=20)
+    print(f"全量区间查询 {(time.perf_counter() - start):.3f} ms/次")
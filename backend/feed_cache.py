@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+RSS 新闻缓存 - get_crypto_news 与情景分析的新闻摘要 (Fed / ETF / 风险事件) 共用
+- TTL 内直接返回内存中已解析的条目，不走网络也不调用 feedparser
+- 过期后带 ETag / Last-Modified 发条件请求，304 只刷新有效期
+- 抓取失败时返回过期条目（无缓存才抛异常，由调用方走原有降级）
+- dedupe_titles: 跨查询去掉重复标题（Google News 同一条新闻常出现在多个搜索里）
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import feedparser
+
+from http_client import get_client
+
+FEED_CACHE_TTL = float(os.getenv("FEED_CACHE_TTL", "300"))
+FEED_CACHE_SIZE = int(os.getenv("FEED_CACHE_SIZE", "64"))
+
+# Google News 标题结尾的 " - 来源"
+_SOURCE_SUFFIX = re.compile(r"\s+[-–—|]\s+[^-–—|]{1,60}$")
+
+
+def title_key(title):
+    """标题归一化: 去掉来源后缀、大小写与多余空白"""
+    return " ".join(_SOURCE_SUFFIX.sub("", title or "").lower().split())
+
+
+def dedupe_titles(groups, limits=None):
+    """
+    groups: [[标题, ...], ...] -> 同样结构，去掉组内与前面各组已保留的标题
+    limits: 每组最多保留条数（截掉的标题不占用去重集合）
+    """
+    seen = set()
+    result = []
+    for i, titles in enumerate(groups):
+        limit = limits[i] if limits else None
+        kept = []
+        for title in titles:
+            if limit is not None and len(kept) >= limit:
+                break
+            key = title_key(title)
+            if key and key not in seen:
+                seen.add(key)
+                kept.append(title)
+        result.append(kept)
+    return result
+
+
+class _Feed:
+    __slots__ = ("entries", "etag", "last_modified", "fetched_at", "lock")
+
+    def __init__(self):
+        self.entries = None
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+
+
+class FeedCache:
+    """
+    按 URL 缓存解析后的条目 [{title, link, published}, ...]
+    同一 URL 的并发刷新只发一次请求（其余线程等待同一把锁后直接命中）
+    """
+
+    def __init__(self, ttl=FEED_CACHE_TTL, maxsize=FEED_CACHE_SIZE, client=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.client = client
+        self._feeds = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.not_modified = 0
+        self.fetches = 0
+        self.stale = 0
+
+    def _feed(self, url):
+        with self._lock:
+            feed = self._feeds.get(url)
+            if feed is None:
+                feed = self._feeds[url] = _Feed()
+            self._feeds.move_to_end(url)
+            while len(self._feeds) > self.maxsize:
+                self._feeds.popitem(last=False)
+            return feed
+
+    def _fresh(self, feed):
+        return feed.entries is not None and time.monotonic() - feed.fetched_at < self.ttl
+
+    def get(self, url):
+        feed = self._feed(url)
+        if self._fresh(feed):
+            self.hits += 1
+            return feed.entries
+        with feed.lock:
+            if self._fresh(feed):
+                self.hits += 1
+                return feed.entries
+            try:
+                self._refresh(url, feed)
+            except Exception:
+                if feed.entries is None:
+                    raise
+                self.stale += 1
+                print(f"⚠️ RSS 刷新失败，使用缓存条目: {url}")
+            return feed.entries
+
+    def _refresh(self, url, feed):
+        headers = {}
+        if feed.entries is not None:
+            if feed.etag:
+                headers["If-None-Match"] = feed.etag
+            if feed.last_modified:
+                headers["If-Modified-Since"] = feed.last_modified
+        response = (self.client or get_client()).get(url, headers=headers)
+        if response.status_code == 304 and feed.entries is not None:
+            self.not_modified += 1
+        else:
+            response.raise_for_status()
+            parsed = feedparser.parse(response.content)
+            feed.entries = [
+                {"title": e.get("title", ""), "link": e.get("link", ""), "published": e.get("published", "N/A")}
+                for e in parsed.entries
+            ]
+            feed.etag = response.headers.get("ETag")
+            feed.last_modified = response.headers.get("Last-Modified")
+            self.fetches += 1
+        feed.fetched_at = time.monotonic()
+
+    def titles(self, url, limit=None):
+        return [e["title"] for e in self.get(url)[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._feeds.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._feeds),
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "fetches": self.fetches,
+            "stale": self.stale,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_feed_cache():
+    """
+    获取进程内共享的 RSS 缓存
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FeedCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    # 测试: 本地 RSS 服务器，验证 TTL 命中、304 条件请求、失败时返回旧条目与跨查询去重
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from http_client import HTTPClient
+
+    items = "".join(
+        f"<item><title>Bitcoin headline {i} - Source {i % 3}</title><link>https://example.com/{i}</link>"
+        f"<pubDate>Fri, 05 Dec 2025 0{i % 10}:00:00 GMT</pubDate></item>"
+        for i in range(50)
+    )
+    body = f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{items}</channel></rss>'.encode()
+    etag = '"v1"'
+    requests_seen = []
+    upstream = {"down": False}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.headers.get("If-None-Match"))
+            if upstream["down"]:
+                self.send_response(500)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    cache = FeedCache(ttl=0.2, client=HTTPClient(retries=0, breaker_threshold=100))
+    start = time.perf_counter()
+    first = cache.get(f"{base}/feed")
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(1000):
+        cache.get(f"{base}/feed")
+    warm = (time.perf_counter() - start) / 1000
+    print(f"首次抓取 {len(first)} 条: {cold * 1000:.2f} ms, TTL 内命中: {warm * 1e6:.2f} µs/次")
+
+    time.sleep(0.25)
+    start = time.perf_counter()
+    cache.get(f"{base}/feed")
+    print(f"过期后条件请求 (If-None-Match={requests_seen[-1]}): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    time.sleep(0.25)
+    upstream["down"] = True
+    print(f"上游 500 时返回旧条目: {len(cache.get(f'{base}/feed'))} 条")
+    print(f"服务器收到 {len(requests_seen)} 次请求, 缓存统计 {cache.stats()}")
+
+    groups = dedupe_titles([
+        ["Fed holds rates - Reuters", "Bitcoin ETF inflows rise - CoinDesk"],
+        ["Bitcoin ETF inflows rise - Bloomberg", "BlackRock IBIT sees record day - CNBC"],
+        ["Fed  holds rates - WSJ", "Exchange hacked - The Block"],
+    ])
+    print(f"跨查询去重: {groups}")
+    server.shutdown()
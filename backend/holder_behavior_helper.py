@@ -3,9 +3,11 @@
 优先级: Bitcoin Magazine Pro (长期持有者实现价格) > CoinGecko (市场数据) > News AI 分析
 """
 
-import requests
 import pandas as pd
 
+from http_client import get_client
+from feed_cache import get_feed_cache
+
 def get_lth_realized_price():
     """
     获取长期持有者实现价格 (Long-Term Holder Realized Price)
@@ -31,7 +33,7 @@ def get_lth_realized_price():
             ]
         }
         
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = get_client().post(url, headers=headers, json=payload)
         
         if response.status_code == 200:
             json_data = response.json()
@@ -98,7 +100,7 @@ def get_coingecko_market_data():
             "developer_data": "false"
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = get_client().get(url, params=params)
         
         if response.status_code == 200:
             data = response.json()
@@ -121,10 +123,10 @@ def get_coingecko_market_data():
         return {'success': False, 'error': str(e)}
 
 
-def get_holder_behavior_summary():
+def get_holder_behavior_summary(strict=False):
     """
     生成长期持有者行为摘要
-    整合多个数据源，优先使用链上数据
+    整合多个数据源，优先使用链上数据；strict 时全部数据源失败抛异常而不是返回 "数据暂时不可用"
     """
     
     # 1. 尝试获取长期持有者实现价格
@@ -184,7 +186,6 @@ def get_holder_behavior_summary():
     else:
         # 所有数据源失败，使用新闻降级
         try:
-            import feedparser
             import google.generativeai as genai
             import os
             from dotenv import load_dotenv
@@ -194,8 +195,7 @@ def get_holder_behavior_summary():
             model = genai.GenerativeModel('gemini-2.0-flash-exp')
             
             rss_url = "https://news.google.com/rss/search?q=Bitcoin+long+term+holders+selling&hl=en-US&gl=US&ceid=US:en"
-            feed = feedparser.parse(rss_url)
-            news_titles = [entry.title for entry in feed.entries[:3]]
+            news_titles = get_feed_cache().titles(rss_url, limit=3)
             news_text = "\n".join([f"- {title}" for title in news_titles])
             
             prompt = f"""根据以下新闻，判断长期持有者是在抛售还是持有：
@@ -210,6 +210,8 @@ def get_holder_behavior_summary():
             
         except Exception as e:
             print(f"❌ 所有数据源失败: {e}")
+            if strict:
+                raise
             return "数据暂时不可用"
 
 
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+共享 HTTP 客户端 - 数据助手 (S&P500 / 持有者行为 / 恐慌指数 / 新闻 RSS) 共用
+- 一个 requests.Session: 按主机复用 keep-alive 连接（助手都在工作线程中调用，连接池线程安全）
+- 统一超时；连接错误 / 429 / 5xx 指数退避 + 随机抖动重试（读超时说明上游挂起，不重试）
+- 按主机熔断: 连续失败达到阈值后冷却期内直接抛 CircuitOpenError，调用方立即走原有的降级文案
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+
+# 重试退避（秒）: base * 2^attempt * (0.5 ~ 1.5)
+RETRY_BASE_DELAY = 0.3
+
+# 熔断: 连续失败次数阈值与冷却时间（秒）
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("HTTP_BREAKER_COOLDOWN", "60"))
+
+# 每个主机的连接池大小
+POOL_SIZE = 10
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """主机处于熔断冷却期，请求未发出"""
+
+
+class CircuitBreaker:
+    """
+    closed -> (连续失败 threshold 次) -> open -> (冷却 cooldown 秒) -> half-open: 放行一个试探请求
+    试探成功恢复 closed，失败重新进入 open
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class HTTPClient:
+    def __init__(self, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, breaker_threshold=BREAKER_THRESHOLD,
+                 breaker_cooldown=BREAKER_COOLDOWN):
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return self._breakers[host]
+
+    def request(self, method, url, retries=None, **kwargs):
+        """
+        发送请求，返回 Response（非重试类的 4xx 直接返回，由调用方判断 status_code）
+        重试耗尽抛出最后一次的异常；熔断时抛 CircuitOpenError
+        每次调用都会向熔断器记录一次成功或失败（保证半开试探结束后 _probing 复位）
+        """
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{urlsplit(url).netloc} 熔断中，跳过请求")
+        kwargs.setdefault("timeout", self.timeout)
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                # 含 ConnectTimeout；ReadTimeout 等其余异常落到下面，不重试
+                error = e
+            except Exception:
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                error = requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            if attempt < retries:
+                time.sleep(RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+        breaker.record_failure()
+        if isinstance(error, requests.HTTPError):
+            # 429 / 5xx 重试耗尽: 把最后的响应交给调用方（沿用其 status_code 分支）
+            return error.response
+        raise error
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def status(self):
+        """各主机熔断状态"""
+        with self._lock:
+            return {host: {"state": b.state, "failures": b.failures} for host, b in self._breakers.items()}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    获取进程内共享的 HTTP 客户端
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+if __name__ == "__main__":
+    # 测试: 本地 HTTP 服务器模拟 503 / 挂起 / 错误分块 / 宕机，验证重试、熔断快速失败与冷却后恢复
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            if self.path.startswith("/hang"):
+                time.sleep(0.5)
+                return
+            if self.path.startswith("/bad"):
+                # 非法分块编码 -> ChunkedEncodingError
+                self.send_response(200)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self.wfile.write(b"zz\r\nbroken")
+                return
+            status = 503 if self.path.startswith("/down") else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    client = HTTPClient(retries=2, breaker_threshold=2, breaker_cooldown=0.5)
+    print(f"正常请求: {client.get(f'{base}/ok').status_code}")
+    for _ in range(2):
+        print(f"503 重试后: {client.get(f'{base}/down').status_code}, 服务器收到 {len(hits)} 次")
+    start = time.perf_counter()
+    try:
+        client.get(f"{base}/down")
+    except CircuitOpenError as e:
+        print(f"熔断: {e} ({(time.perf_counter() - start) * 1000:.2f} ms), 服务器收到 {len(hits)} 次")
+    time.sleep(0.6)
+    print(f"冷却后试探: {client.get(f'{base}/ok').status_code}, 状态 {client.status()}")
+
+    hung = HTTPClient(timeout=0.2, retries=2)
+    before = len(hits)
+    start = time.perf_counter()
+    try:
+        hung.get(f"{base}/hang")
+    except requests.ReadTimeout:
+        print(f"挂起主机: ReadTimeout 不重试 ({(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"服务器收到 {len(hits) - before} 次)")
+
+    # 半开试探抛出非连接类异常: 熔断器仍需记录失败并复位，冷却后可再次试探
+    probe = HTTPClient(retries=0, breaker_threshold=1, breaker_cooldown=0.2)
+    probe.get(f"{base}/down")
+    time.sleep(0.3)
+    try:
+        probe.get(f"{base}/bad")
+    except requests.RequestException as e:
+        print(f"试探失败: {type(e).__name__}, 状态 {probe.status()}")
+    time.sleep(0.3)
+    print(f"再次冷却后试探: {probe.get(f'{base}/ok').status_code}, 状态 {probe.status()}")
+
+    dead = HTTPClient(retries=1, breaker_threshold=1, breaker_cooldown=60)
+    for _ in range(2):
+        start = time.perf_counter()
+        try:
+            dead.get("http://127.0.0.1:9/")
+        except requests.RequestException as e:
+            print(f"宕机主机: {type(e).__name__} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    server.shutdown()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+流式指标引擎 - 按 (symbol, timeframe) 保存递推状态，每根新K线 O(1) 更新
+EMA / RSI (Wilder) / MACD / ATR / ADX 都是递推指标，无需每次请求重算整段历史。
+计算内核与 indicators.py 共用 (micro_indicators / daily_indicators): 冷启动或一次追加多根K线时
+整段数组一次算完，逐根提交时对长度为 1 的数组调用同一内核，两条路径不会出现口径差异。
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from indicators import daily_indicators, micro_indicators
+
+MICRO_COLUMNS = ['RSI', 'MACD', 'MACD_signal', 'MACD_diff', 'EMA20', 'EMA50', 'EMA200',
+                 'BBL_20_2.0', 'BBU_20_2.0', 'ATR', 'ADX', 'Pivot', 'R1', 'S1', 'Vol_MA20']
+DAILY_COLUMNS = ['SMA50', 'SMA200', 'SMA200_Slope', 'SMA200_Dev']
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+class MicroIndicatorState:
+    """微观指标 (1H/4H/1W) 状态，对应 calculate_indicators 的全部列"""
+
+    columns = MICRO_COLUMNS
+
+    def __init__(self, state=None):
+        self.state = state
+
+    def extend(self, bars):
+        """
+        bars: {'high': 数组, 'low': ..., 'close': ..., 'volume': ...}，返回 (指标列 dict, 新的状态对象)
+        不修改自身，未收盘K线的预览直接丢弃返回的新状态即可
+        """
+        columns, state = micro_indicators(bars['high'], bars['low'], bars['close'], bars['volume'], self.state)
+        return columns, MicroIndicatorState(state)
+
+
+class DailyIndicatorState:
+    """宏观指标 (1D) 状态，对应 calculate_daily_indicators 的全部列"""
+
+    columns = DAILY_COLUMNS
+
+    def __init__(self, state=None):
+        self.state = state
+
+    def extend(self, bars):
+        columns, state = daily_indicators(bars['close'], self.state)
+        return columns, DailyIndicatorState(state)
+
+
+def _bar_arrays(bar):
+    return {k: np.array([float(bar[k])]) for k in OHLCV}
+
+
+def _rows(columns, names):
+    # 与 df.fillna(0) 保持一致
+    block = np.nan_to_num(np.column_stack([columns[c] for c in names]), nan=0.0)
+    return [dict(zip(names, row)) for row in block.tolist()]
+
+
+class _KeyState:
+    def __init__(self, daily):
+        self.state = DailyIndicatorState() if daily else MicroIndicatorState()
+        self.last_time = None
+        self.rows = OrderedDict()
+
+
+class IndicatorEngine:
+    """
+    多 (symbol, timeframe) 的流式指标注册表
+    - update_bar: 提交一根已收盘K线
+    - preview_bar: 未收盘K线的指标预览（不提交）
+    - apply: 给 DataFrame 补齐指标列；已提交的K线直接复用，新K线整段增量提交，
+      最后一根（可能未收盘）只在新状态上预览，不污染递推状态
+    """
+
+    def __init__(self, history=2000):
+        self.history = history
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def _commit(self, entry, times, bars):
+        columns, entry.state = entry.state.extend(bars)
+        rows = _rows(columns, entry.state.columns)
+        entry.rows.update(zip(times, rows))
+        entry.last_time = times[-1]
+        while len(entry.rows) > self.history:
+            entry.rows.popitem(last=False)
+        return rows
+
+    def update_bar(self, symbol, timeframe, bar, daily=False):
+        """
+        提交一根已收盘K线 (bar 含 time(ms)/open/high/low/close/volume)，返回该K线的指标值
+        """
+        key = (symbol, timeframe, daily)
+        ts = int(bar['time'])
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = _KeyState(daily)
+            elif entry.last_time is not None and ts <= entry.last_time:
+                return entry.rows.get(ts)
+            elif entry.last_time is not None and ts != entry.last_time + market_data.timeframe_to_ms(timeframe):
+                # K线不连续，从这根开始重新累积
+                entry = self._keys[key] = _KeyState(daily)
+            return self._commit(entry, [ts], _bar_arrays(bar))[0]
+
+    def preview_bar(self, symbol, timeframe, bar, daily=False):
+        """
+        未收盘K线的指标值: 在当前状态上试算，丢弃新状态
+        只有紧接已提交K线之后的那一根可预览（已提交的直接返回缓存行），否则返回 None
+        """
+        key = (symbol, timeframe, daily)
+        ts = int(bar['time'])
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None or entry.last_time is None:
+                return None
+            if ts <= entry.last_time:
+                return entry.rows.get(ts)
+            if ts != entry.last_time + market_data.timeframe_to_ms(timeframe):
+                return None
+            columns, _ = entry.state.extend(_bar_arrays(bar))
+            return _rows(columns, entry.state.columns)[0]
+
+    def reset(self, symbol, timeframe, daily=False):
+        with self._lock:
+            self._keys.pop((symbol, timeframe, daily), None)
+
+    def apply(self, symbol, timeframe, df, daily=False):
+        """
+        计算 df 的指标列（与 calculate_indicators / calculate_daily_indicators 同列名）
+        """
+        if df.empty:
+            return df
+        columns = DAILY_COLUMNS if daily else MICRO_COLUMNS
+        key = (symbol, timeframe, daily)
+        times = (df['time'].astype('int64') // 1_000_000).tolist()
+        arrays = {k: np.ascontiguousarray(df[k].to_numpy(dtype=np.float64)) for k in OHLCV}
+        tf_ms = market_data.timeframe_to_ms(timeframe)
+
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is not None and entry.last_time is not None:
+                known = [t for t in times if t <= entry.last_time]
+                new = [t for t in times if t > entry.last_time]
+                if any(t not in entry.rows for t in known) or (new and new[0] != entry.last_time + tf_ms):
+                    entry = None
+            elif entry is not None:
+                # 之前只预览过一根K线、尚未提交任何K线: 按冷启动处理
+                entry = None
+            if entry is None:
+                entry = self._keys[key] = _KeyState(daily)
+
+            start = sum(1 for t in times if entry.last_time is not None and t <= entry.last_time)
+            last = len(times) - 1
+            out = [entry.rows[ts] for ts in times[:start]]
+            if start < last:
+                # 冷启动 / 一次到达多根: 整段交给内核
+                out += self._commit(entry, times[start:last], {k: v[start:last] for k, v in arrays.items()})
+            if start <= last:
+                preview, _ = entry.state.extend({k: v[last:] for k, v in arrays.items()})
+                out += _rows(preview, columns)
+
+        # 指标列作为一个 float64 块拼接，避免逐列赋值
+        block = np.array([[row[c] for c in columns] for row in out], dtype=np.float64)
+        base = df.drop(columns=columns, errors='ignore')
+        return pd.concat([base, pd.DataFrame(block, columns=columns, index=df.index)], axis=1)
+
+
+# 进程内共享实例
+indicator_engine = IndicatorEngine()
+
+
+def verify_against_ta(n=600, chunk=37, tolerance=1e-8):
+    """
+    校验: 流式结果与 ta 版本逐列一致（一次性回放 + 分批追加两种方式）
+    """
+    from indicators import calculate_indicators_ta, calculate_daily_indicators_ta, make_sample_ohlcv
+
+    df = make_sample_ohlcv(n)
+
+    ok = True
+    for daily, reference, columns in [(False, calculate_indicators_ta, MICRO_COLUMNS),
+                                      (True, calculate_daily_indicators_ta, DAILY_COLUMNS)]:
+        expected = reference(df.copy())
+
+        engine = IndicatorEngine()
+        full = engine.apply('TEST/USDT', '1h', df, daily=daily)
+
+        # 分批追加：模拟K线陆续到达，每次都带上未收盘的最后一根
+        engine = IndicatorEngine()
+        for end in range(chunk, n + chunk, chunk):
+            streamed = engine.apply('TEST/USDT', '1h', df.iloc[:min(end, n)], daily=daily)
+
+        # 逐根提交（K线 WebSocket 路径），最后用 apply 取回全部行
+        engine = IndicatorEngine()
+        for bar in df.assign(time=df['time'].astype('int64') // 1_000_000).to_dict('records')[:-1]:
+            engine.update_bar('TEST/USDT', '1h', bar, daily=daily)
+        per_bar = engine.apply('TEST/USDT', '1h', df, daily=daily)
+
+        for name, got in [('一次性', full), ('分批', streamed), ('逐根', per_bar)]:
+            for col in columns:
+                if not np.allclose(got[col], expected[col], rtol=tolerance, atol=tolerance):
+                    diff = np.nanmax(np.abs(got[col].values - expected[col].values))
+                    print(f"❌ {name} {col} 不一致, 最大误差 {diff}")
+                    ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("流式指标 vs ta 校验")
+    print("=" * 60)
+    if not verify_against_ta():
+        raise SystemExit(1)
+    print("✅ 全部指标与 ta 版本一致")
+
+    # 冷启动 (整段内核) 与热路径 (只追加最后一根) 耗时
+    import timeit
+    from indicators import make_sample_ohlcv
+    df = make_sample_ohlcv(2000)
+    cold = min(timeit.repeat(lambda: IndicatorEngine().apply('TEST/USDT', '1h', df), number=1, repeat=5))
+    engine = IndicatorEngine()
+    engine.apply('TEST/USDT', '1h', df)
+    warm = min(timeit.repeat(lambda: engine.apply('TEST/USDT', '1h', df), number=1, repeat=5))
+    print(f"apply n=2000: 冷启动 {cold * 1000:.2f} ms, 已缓存 {warm * 1000:.2f} ms")
+
+    # 新上线交易对只有一根K线: 冷启动只预览不提交，之后 K线增多时仍能正常计算
+    fresh = IndicatorEngine()
+    fresh.apply('NEW/USDT', '1h', df.iloc[:1])
+    grown = fresh.apply('NEW/USDT', '1h', df.iloc[:3])
+    print(f"单根K线冷启动后再次 apply: {len(grown)} 行")
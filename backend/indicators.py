@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+技术指标计算 - NumPy 内核
+递推指标 (EMA/MACD/RSI/ATR/ADX) 都是一阶线性递推 y[i] = b[i] * y[i-1] + x[i]，
+对 float64 连续数组按块累乘 + 累加一次算完；滚动窗口指标 (布林带/均量/SMA) 与 Pivot 用向量化计算。
+每个函数接收并返回计算状态，流式引擎 (incremental_indicators) 逐根追加时复用同一套内核。
+列名与数值和原 ta 版本一致，ta 版本保留为 *_ta 参考实现，用于校验和基准测试。
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+NAN = float('nan')
+
+# 分块递推的块长: 块内累乘因子最小约 0.8^64 ≈ 6e-7，不会下溢或放大误差
+SCAN_BLOCK = 64
+
+# MACD (12, 26, 9) 与 EMA 周期
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+EMA_WINDOWS = (20, 50, 200)
+
+BB_WINDOW = 20
+VOL_MA_WINDOW = 20
+
+
+def as_array(series):
+    return np.ascontiguousarray(series.to_numpy(dtype=np.float64))
+
+
+def rolling_mean(x, window):
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def _rolling_mean_std(x, window):
+    mean = np.full(len(x), np.nan)
+    std = np.full(len(x), np.nan)
+    if len(x) >= window:
+        view = sliding_window_view(x, window)
+        mean[window - 1:] = view.mean(axis=1)
+        std[window - 1:] = view.std(axis=1)
+    return mean, std
+
+
+def _with_tail(tail, x, window):
+    # 接上上一批末尾 window - 1 个值，返回 (拼接后数组, 新的末尾)
+    full = np.concatenate([tail, x])
+    return full, full[len(full) - min(len(full), window - 1):]
+
+
+def _attach(df, columns):
+    """
+    把指标列作为一个 float64 块一次性拼接到 df（NaN 置 0，与原 fillna(0) 一致）
+    """
+    block = np.nan_to_num(np.column_stack(list(columns.values())), nan=0.0)
+    base = df.drop(columns=list(columns), errors='ignore')
+    return pd.concat([base, pd.DataFrame(block, columns=list(columns), index=df.index)], axis=1)
+
+
+def _linear_scan(b, x, y0):
+    """
+    逐列计算 y[i] = b[i] * y[i-1] + x[i]（y[-1] = y0，0 < b <= 1）
+    块内 y = P * (y0 + cumsum(x / P))，P 为 b 的累乘
+    """
+    out = np.empty_like(x)
+    y = y0
+    for s in range(0, len(x), SCAN_BLOCK):
+        p = np.cumprod(b[s:s + SCAN_BLOCK], axis=0)
+        block = p * (y + np.cumsum(x[s:s + SCAN_BLOCK] / p, axis=0))
+        out[s:s + SCAN_BLOCK] = block
+        y = block[-1]
+    return out
+
+
+class RecursiveState:
+    """
+    递推指标的跨批次状态（不可变，每次计算返回新状态）
+    - n: 已计算的K线数（决定各指标的起始位置）
+    - prev: 最后一根K线 (high, low, close)
+    - scan: EMA12/26/20/50/200、RSI 涨/跌均值、ATR、ADX 的 TR/+DM/-DM 平滑和
+    - scan2: MACD 信号线、ADX
+    """
+
+    __slots__ = ('n', 'prev', 'scan', 'scan2')
+
+    def __init__(self, n=0, prev=None, scan=None, scan2=None):
+        self.n = n
+        self.prev = prev
+        self.scan = np.zeros(11) if scan is None else scan
+        self.scan2 = np.zeros(2) if scan2 is None else scan2
+
+
+def recursive_indicators(high, low, close, state=None, window=14):
+    """
+    RSI / MACD / MACD_signal / EMA20/50/200 / ATR / ADX，口径与 ta 库一致:
+    EMA/MACD 为 ewm(adjust=False)，RSI 为 Wilder 平滑，ATR/ADX 沿用 ta 的起始位置与平滑方式（之前为 0）
+    state: 上一批的 RecursiveState（None 表示从第一根K线开始）
+    返回 (指标列 dict, 新状态)
+    """
+    state = state or RecursiveState()
+    m = len(close)
+    w = window
+    g = state.n + np.arange(m)
+    first = g == 0
+    prev_h, prev_l, prev_c = state.prev if state.prev is not None else (NAN, NAN, NAN)
+    ph, pl, pc = np.r_[prev_h, high[:-1]], np.r_[prev_l, low[:-1]], np.r_[prev_c, close[:-1]]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        diff = np.where(first, 0.0, close - pc)
+        tr = np.where(first, high - low,
+                      np.maximum(high - low, np.maximum(np.abs(high - pc), np.abs(low - pc))))
+        ddm = np.where(first, 0.0, np.maximum(high, pc) - np.minimum(low, pc))
+        up_move, down_move = high - ph, pl - low
+        pos = np.where(~first & (up_move > down_move) & (up_move > 0), up_move, 0.0)
+        neg = np.where(~first & (down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+        # 第一轮递推: 5 条 EMA、RSI 涨跌均值、ATR、ADX 的三个平滑和
+        alphas = np.array([2 / (MACD_FAST + 1), 2 / (MACD_SLOW + 1)] + [2 / (n + 1) for n in EMA_WINDOWS])
+        aw = 1 / w
+        b = np.empty((m, 11))
+        x = np.empty((m, 11))
+        b[:, :5] = np.where(first[:, None], 1.0, 1 - alphas)  # 首根: y = close
+        x[:, :5] = np.where(first[:, None], close[:, None], alphas * close[:, None])
+        b[:, 5:7] = 1 - aw
+        x[:, 5] = aw * np.maximum(diff, 0.0)
+        x[:, 6] = aw * np.maximum(-diff, 0.0)
+        b[:, 7] = np.where(g <= w - 1, 1.0, 1 - aw)  # 前 window 根累加 TR / window 即首值
+        x[:, 7] = tr * aw
+        b[:, 8:11] = np.where(g <= w, 1.0, 1 - aw)[:, None]
+        x[:, 8], x[:, 9], x[:, 10] = ddm, pos, neg
+        scan = _linear_scan(b, x, state.scan)
+
+        e12, e26, up, dn, atr, trs, dip_s, din_s = (scan[:, i] for i in (0, 1, 5, 6, 7, 8, 9, 10))
+        macd_start = MACD_SLOW - 1
+        macd = e12 - e26
+        rsi = np.where(dn == 0, 100.0, 100 - 100 / (1 + up / dn))
+        dip = np.where(trs != 0, 100 * dip_s / trs, 0.0)
+        din = np.where(trs != 0, 100 * din_s / trs, 0.0)
+        di = np.where(dip + din != 0, 100 * np.abs((dip - din) / (dip + din)), 0.0)
+
+        # 第二轮递推: MACD 信号线 (从 MACD 首个有效值开始)、ADX (前 window 个 DI 的均值为首值)
+        a9 = 2 / (MACD_SIGNAL + 1)
+        b2 = np.empty((m, 2))
+        x2 = np.empty((m, 2))
+        b2[:, 0] = np.where(g <= macd_start, 1.0, 1 - a9)
+        x2[:, 0] = np.where(g < macd_start, 0.0, np.where(g == macd_start, macd, a9 * macd))
+        b2[:, 1] = np.where(g <= 2 * w - 1, 1.0, 1 - aw)
+        x2[:, 1] = np.where(g >= w, di * aw, 0.0)
+        scan2 = _linear_scan(b2, x2, state.scan2)
+
+    columns = {
+        'RSI': np.where(g >= w - 1, rsi, np.nan),
+        'MACD': np.where(g >= macd_start, macd, np.nan),
+        'MACD_signal': np.where(g >= macd_start + MACD_SIGNAL - 1, scan2[:, 0], np.nan),
+    }
+    for i, n in enumerate(EMA_WINDOWS):
+        columns[f'EMA{n}'] = np.where(g >= n - 1, scan[:, 2 + i], np.nan)
+    columns['ATR'] = np.where(g >= w - 1, atr, 0.0)
+    columns['ADX'] = np.where(g >= 2 * w - 1, scan2[:, 1], 0.0)
+
+    if not m:
+        return columns, state
+    new_state = RecursiveState(state.n + m, (float(high[-1]), float(low[-1]), float(close[-1])), scan[-1], scan2[-1])
+    return columns, new_state
+
+
+class MicroState:
+    """微观指标跨批次状态: 递推状态 + 滚动窗口所需的末尾收盘价 / 成交量"""
+
+    __slots__ = ('rec', 'close_tail', 'volume_tail')
+
+    def __init__(self, rec=None, close_tail=None, volume_tail=None):
+        self.rec = rec or RecursiveState()
+        self.close_tail = np.empty(0) if close_tail is None else close_tail
+        self.volume_tail = np.empty(0) if volume_tail is None else volume_tail
+
+
+def micro_indicators(high, low, close, volume, state=None):
+    """
+    微观指标全部列 (RSI, MACD, EMA, 布林带, ATR, ADX, Pivot, 均量)
+    返回 (指标列 dict, 新的 MicroState)
+    """
+    state = state or MicroState()
+    prev = state.rec.prev
+    rec, rec_state = recursive_indicators(high, low, close, state.rec)
+
+    closes, close_tail = _with_tail(state.close_tail, close, BB_WINDOW)
+    bb_mid, bb_std = _rolling_mean_std(closes, BB_WINDOW)
+    bb_mid, bb_std = bb_mid[len(state.close_tail):], bb_std[len(state.close_tail):]
+    volumes, volume_tail = _with_tail(state.volume_tail, volume, VOL_MA_WINDOW)
+
+    # Pivot Points (前一根K线)
+    prev_high, prev_low, prev_close = prev if prev is not None else (NAN, NAN, NAN)
+    prev_high = np.r_[prev_high, high[:-1]]
+    prev_low = np.r_[prev_low, low[:-1]]
+    pivot = (prev_high + prev_low + np.r_[prev_close, close[:-1]]) / 3
+
+    columns = {
+        'RSI': rec['RSI'],
+        'MACD': rec['MACD'],
+        'MACD_signal': rec['MACD_signal'],
+        'MACD_diff': rec['MACD'] - rec['MACD_signal'],
+        'EMA20': rec['EMA20'],
+        'EMA50': rec['EMA50'],
+        'EMA200': rec['EMA200'],
+        'BBL_20_2.0': bb_mid - 2 * bb_std,
+        'BBU_20_2.0': bb_mid + 2 * bb_std,
+        'ATR': rec['ATR'],
+        'ADX': rec['ADX'],
+        'Pivot': pivot,
+        'R1': 2 * pivot - prev_low,
+        'S1': 2 * pivot - prev_high,
+        'Vol_MA20': rolling_mean(volumes, VOL_MA_WINDOW)[len(state.volume_tail):],
+    }
+    return columns, MicroState(rec_state, close_tail, volume_tail)
+
+
+class DailyState:
+    """宏观指标跨批次状态: 末尾 199 个收盘价 + 末尾 slope_lookback 个 SMA200"""
+
+    __slots__ = ('close_tail', 'sma_tail')
+
+    def __init__(self, close_tail=None, sma_tail=None):
+        self.close_tail = np.empty(0) if close_tail is None else close_tail
+        self.sma_tail = np.empty(0) if sma_tail is None else sma_tail
+
+
+def daily_indicators(close, state=None, slope_lookback=5):
+    """
+    宏观指标 SMA50 / SMA200 / 斜率 / 乖离率，返回 (指标列 dict, 新的 DailyState)
+    """
+    state = state or DailyState()
+    skip = len(state.close_tail)
+    closes, close_tail = _with_tail(state.close_tail, close, 200)
+    sma200 = rolling_mean(closes, 200)[skip:]
+
+    # 斜率基准: slope_lookback 根之前的 SMA200（不足时为 NaN）
+    smas = np.concatenate([np.full(slope_lookback - len(state.sma_tail), np.nan), state.sma_tail, sma200])
+    base = smas[:len(sma200)]
+
+    columns = {
+        'SMA50': rolling_mean(closes, 50)[skip:],
+        'SMA200': sma200,
+        'SMA200_Slope': (sma200 - base) / base * 100,
+        'SMA200_Dev': (close - sma200) / sma200 * 100,
+    }
+    return columns, DailyState(close_tail, smas[len(smas) - slope_lookback:])
+
+
+def calculate_indicators(df):
+    """微观指标 (1H/15m): RSI, MACD, EMA, ADX"""
+    if df.empty: return df
+    columns, _ = micro_indicators(as_array(df['high']), as_array(df['low']), as_array(df['close']),
+                                  as_array(df['volume']))
+    return _attach(df, columns)
+
+
+def calculate_daily_indicators(df, slope_lookback=5):
+    """宏观指标 (1D): SMA200, 斜率, 乖离率"""
+    if df.empty: return df
+    columns, _ = daily_indicators(as_array(df['close']), slope_lookback=slope_lookback)
+    return _attach(df, columns)
+
+
+# --- ta 参考实现 (校验 / 基准测试用) ---
+
+def calculate_indicators_ta(df):
+    """微观指标的 ta 库实现（原 main.py 版本）"""
+    import ta
+    if df.empty: return df
+    df['RSI'] = ta.momentum.RSIIndicator(close=df['close'], window=14).rsi()
+    macd = ta.trend.MACD(close=df['close'])
+    df['MACD'] = macd.macd()
+    df['MACD_signal'] = macd.macd_signal()
+    df['MACD_diff'] = macd.macd_diff() # 柱状图
+
+    df['EMA20'] = ta.trend.EMAIndicator(close=df['close'], window=20).ema_indicator()
+    df['EMA50'] = ta.trend.EMAIndicator(close=df['close'], window=50).ema_indicator()
+    df['EMA200'] = ta.trend.EMAIndicator(close=df['close'], window=200).ema_indicator()
+
+    df['BBL_20_2.0'] = ta.volatility.BollingerBands(close=df['close']).bollinger_lband()
+    df['BBU_20_2.0'] = ta.volatility.BollingerBands(close=df['close']).bollinger_hband()
+    df['ATR'] = ta.volatility.AverageTrueRange(high=df['high'], low=df['low'], close=df['close']).average_true_range()
+    df['ADX'] = ta.trend.ADXIndicator(high=df['high'], low=df['low'], close=df['close']).adx()
+
+    # Pivot Points
+    prev_high = df['high'].shift(1)
+    prev_low = df['low'].shift(1)
+    prev_close = df['close'].shift(1)
+    df['Pivot'] = (prev_high + prev_low + prev_close) / 3
+    df['R1'] = (2 * df['Pivot']) - prev_low
+    df['S1'] = (2 * df['Pivot']) - prev_high
+    df['Vol_MA20'] = df['volume'].rolling(window=20).mean()
+    return df.fillna(0)
+
+
+def calculate_daily_indicators_ta(df):
+    """宏观指标的 ta 库实现（原 main.py 版本）"""
+    import ta
+    if df.empty: return df
+    df['SMA50'] = ta.trend.SMAIndicator(close=df['close'], window=50).sma_indicator()
+    df['SMA200'] = ta.trend.SMAIndicator(close=df['close'], window=200).sma_indicator()
+
+    df['SMA200_Slope'] = (df['SMA200'] - df['SMA200'].shift(5)) / df['SMA200'].shift(5) * 100
+    df['SMA200_Dev'] = (df['close'] - df['SMA200']) / df['SMA200'] * 100
+    return df.fillna(0)
+
+
+def make_sample_ohlcv(n, freq='1h', seed=42):
+    """生成随机游走 OHLCV（校验 / 基准测试用）"""
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'time': pd.date_range('2023-01-01', periods=n, freq=freq),
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n)),
+        'low': np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n)),
+        'close': close,
+        'volume': rng.uniform(100, 1000, n),
+    })
+
+
+def benchmark(sizes=(100, 500, 2000), repeat=20, tolerance=1e-8):
+    """
+    微基准: NumPy 融合版 vs ta 版（同时校验数值一致）
+    """
+    import timeit
+
+    ok = True
+    for n in sizes:
+        df = make_sample_ohlcv(n)
+        for name, fast, slow in [('micro', calculate_indicators, calculate_indicators_ta),
+                                 ('daily', calculate_daily_indicators, calculate_daily_indicators_ta)]:
+            got, expected = fast(df.copy()), slow(df.copy())
+            for col in expected.columns:
+                if col == 'time':
+                    continue
+                if not np.allclose(got[col], expected[col], rtol=tolerance, atol=tolerance):
+                    print(f"❌ {name} n={n} 列 {col} 与 ta 不一致")
+                    ok = False
+
+            t_fast = min(timeit.repeat(lambda: fast(df.copy()), number=1, repeat=repeat))
+            t_slow = min(timeit.repeat(lambda: slow(df.copy()), number=1, repeat=repeat))
+            print(f"{name:5s} n={n:5d}  numpy {t_fast * 1000:7.2f} ms   ta {t_slow * 1000:7.2f} ms   "
+                  f"加速 {t_slow / t_fast:5.1f}x")
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("指标计算基准测试 (NumPy 融合版 vs ta)")
+    print("=" * 60)
+    if benchmark():
+        print("✅ 数值与 ta 版本一致")
+    else:
+        raise SystemExit(1)
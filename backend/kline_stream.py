@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+实时K线接入 - 订阅 Binance kline WebSocket 流
+收盘K线写入本地K线仓库并增量更新流式指标；断线后指数退避重连，
+重连成功先通过 REST 补齐断线期间缺失的K线，再继续消费推送
+"""
+
+import asyncio
+import json
+import os
+import random
+
+import websockets
+
+import candle_store
+import market_data
+from incremental_indicators import indicator_engine
+
+KLINE_WS_URL = os.getenv("KLINE_WS_URL", "wss://stream.binance.com:9443/stream")
+KLINE_SYMBOLS = [s.strip() for s in os.getenv("KLINE_SYMBOLS", "BTC/USDT,ETH/USDT,SOL/USDT").split(",") if s.strip()]
+KLINE_TIMEFRAMES = [t.strip() for t in os.getenv("KLINE_TIMEFRAMES", "1h,4h,1d").split(",") if t.strip()]
+
+# 补齐 / 指标预热时加载的K线数 (与 /api/analyze 一致)
+SEED_LIMITS = {'1d': 500, '1w': 52}
+DEFAULT_SEED_LIMIT = 100
+
+# 重连退避（秒）
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+
+
+def stream_name(symbol, timeframe):
+    """'BTC/USDT', '1h' -> 'btcusdt@kline_1h'"""
+    return f"{symbol.replace('/', '').lower()}@kline_{timeframe}"
+
+
+def parse_kline(message):
+    """
+    解析 combined stream 消息，返回 (stream, bar, closed)
+    bar 为 {time(ms), open, high, low, close, volume}
+    """
+    payload = json.loads(message)
+    k = payload["data"]["k"]
+    bar = {
+        "time": int(k["t"]),
+        "open": float(k["o"]),
+        "high": float(k["h"]),
+        "low": float(k["l"]),
+        "close": float(k["c"]),
+        "volume": float(k["v"]),
+    }
+    return payload["stream"], bar, bool(k["x"])
+
+
+class KlineIngestor:
+    """
+    - symbols / timeframes: 订阅的交易对与周期（全部组合）
+    - store / engine: K线仓库与流式指标引擎（可替换，便于测试）
+    - backfill: async (symbol, timeframe, limit)，默认走 candle_store.refresh 的增量 REST 拉取
+    """
+
+    def __init__(self, symbols=None, timeframes=None, url=KLINE_WS_URL, store=None, engine=indicator_engine,
+                 backfill=None):
+        self.symbols = list(symbols or KLINE_SYMBOLS)
+        self.timeframes = list(timeframes or KLINE_TIMEFRAMES)
+        self.url = url
+        self.store = store or candle_store.get_store()
+        self.engine = engine
+        self.backfill = backfill or candle_store.refresh
+        self._streams = {stream_name(s, tf): (s, tf) for s in self.symbols for tf in self.timeframes}
+        self._listeners = []
+        self._task = None
+        self.connected = asyncio.Event()
+        self.reconnects = 0
+
+    def add_listener(self, callback):
+        """
+        每条K线推送后回调 callback(symbol, timeframe, bar, closed, indicators)
+        indicators 为该K线的指标行（未收盘时为预览值）；指标状态尚未预热或K线不连续时为 None
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def stream_url(self):
+        return f"{self.url}?streams={'/'.join(self._streams)}"
+
+    async def _seed(self, symbol, timeframe):
+        """REST 补齐缺口，再用仓库中的K线预热指标（已算过的K线直接复用）"""
+        limit = SEED_LIMITS.get(timeframe, DEFAULT_SEED_LIMIT)
+        try:
+            await self.backfill(symbol, timeframe, limit)
+        except Exception as e:
+            print(f"⚠️ {symbol} {timeframe} REST 补齐失败: {e!r}")
+        bars = await asyncio.to_thread(self.store.load, symbol, timeframe, limit)
+        if bars:
+            self.engine.apply(symbol, timeframe, market_data.bars_to_dataframe(bars), daily=timeframe == '1d')
+
+    async def _handle(self, message):
+        stream, bar, closed = parse_kline(message)
+        if stream not in self._streams:
+            return
+        symbol, timeframe = self._streams[stream]
+        daily = timeframe == '1d'
+        if closed:
+            row = [bar["time"], bar["open"], bar["high"], bar["low"], bar["close"], bar["volume"]]
+            await asyncio.to_thread(self.store.upsert, symbol, timeframe, [row])
+            indicators = self.engine.update_bar(symbol, timeframe, bar, daily=daily)
+        else:
+            indicators = self.engine.preview_bar(symbol, timeframe, bar, daily=daily)
+        for callback in self._listeners:
+            try:
+                callback(symbol, timeframe, bar, closed, indicators)
+            except Exception as e:
+                print(f"⚠️ K线推送回调失败: {e}")
+
+    async def _consume(self):
+        async with websockets.connect(self.stream_url()) as ws:
+            # 先建立订阅再补齐，补齐期间的推送由连接缓冲，不会漏掉
+            await asyncio.gather(*[self._seed(s, tf) for s, tf in self._streams.values()])
+            self.connected.set()
+            async for message in ws:
+                try:
+                    await self._handle(message)
+                except (KeyError, ValueError) as e:
+                    print(f"⚠️ 无法解析的K线消息: {e!r}")
+
+    async def run(self):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                await self._consume()
+                delay = RECONNECT_MIN_DELAY
+                print("⚠️ K线 WebSocket 连接关闭，准备重连")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ K线 WebSocket 异常: {e!r}，{delay}s 后重连")
+            self.connected.clear()
+            self.reconnects += 1
+            await asyncio.sleep(delay * (1 + random.random() * 0.2))
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def _kline_message(symbol, timeframe, t, close, closed):
+    # 与 Binance combined stream 相同的消息格式（测试用）
+    return json.dumps({
+        "stream": stream_name(symbol, timeframe),
+        "data": {"e": "kline", "s": symbol.replace('/', ''), "k": {
+            "t": t, "i": timeframe, "o": str(close), "h": str(close * 1.01), "l": str(close * 0.99),
+            "c": str(close), "v": "10", "x": closed,
+        }},
+    })
+
+
+if __name__ == "__main__":
+    # 测试: 本地假 WebSocket 服务器推送 3 根K线后断开，验证收盘K线入库、指标更新、断线重连与补齐
+    async def _main():
+        hour = market_data.timeframe_to_ms('1h')
+        base = 1_700_000_000_000 // hour * hour
+        connections = []
+
+        async def handler(ws):
+            connections.append(ws)
+            start = base + (len(connections) - 1) * 3 * hour
+            for i in range(3):
+                t = start + i * hour
+                await ws.send(_kline_message('BTC/USDT', '1h', t, 100.0 + i, closed=False))
+                await ws.send(_kline_message('BTC/USDT', '1h', t, 101.0 + i, closed=True))
+            await ws.close()
+
+        backfills = []
+
+        async def fake_backfill(symbol, timeframe, limit):
+            backfills.append((symbol, timeframe))
+
+        store = candle_store.CandleStore(":memory:")
+        ingestor = KlineIngestor(['BTC/USDT'], ['1h'], url="ws://127.0.0.1:8765/stream", store=store,
+                                 backfill=fake_backfill)
+        updates = []
+        ingestor.add_listener(lambda s, tf, bar, closed, ind: updates.append((closed, ind is not None)))
+
+        global RECONNECT_MIN_DELAY
+        RECONNECT_MIN_DELAY = 0.05
+        async with websockets.serve(handler, "127.0.0.1", 8765):
+            ingestor.start()
+            while len(connections) < 2 or len(store.load('BTC/USDT', '1h')) < 6:
+                await asyncio.sleep(0.05)
+            await ingestor.stop()
+
+        bars = store.load('BTC/USDT', '1h')
+        print(f"连接次数 {len(connections)}, REST 补齐 {len(backfills)} 次, 入库收盘K线 {len(bars)} 根")
+        print(f"推送 {len(updates)} 条 (收盘 {sum(c for c, _ in updates)} 条, 均带指标: "
+              f"{all(has for c, has in updates if c)}; 未收盘带预览指标 {sum(has for c, has in updates if not c)} 条)")
+
+    asyncio.run(_main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+新闻摘要批处理 - 把多个新闻总结子任务合并为一次 Gemini 调用
+按 JSON Schema 输出，每个字段单独校验，某个字段异常只回退该字段，不影响整批结果
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from feed_cache import dedupe_titles, get_feed_cache
+
+# 单个字段最大长度（超过视为模型输出异常）
+MAX_FIELD_LENGTH = 120
+
+# 最近几次成功摘要 (prompt 哈希 -> 结果)；新闻标题没有变化时不再调用模型
+DIGEST_MEMO_SIZE = 8
+_digest_memo = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+class NewsTask:
+    """
+    一个新闻总结子任务
+    - key: JSON 字段名
+    - rss_url: 新闻来源
+    - instruction: 给模型的要求（含输出示例）
+    - fallback: 该字段解析失败时的默认值
+    """
+
+    def __init__(self, key, rss_url, instruction, fallback, limit=5):
+        self.key = key
+        self.rss_url = rss_url
+        self.instruction = instruction
+        self.fallback = fallback
+        self.limit = limit
+
+
+FED_POLICY_TASK = NewsTask(
+    "fed_policy",
+    "https://news.google.com/rss/search?q=Federal+Reserve+interest+rate&hl=en-US&gl=US&ceid=US:en",
+    '用一句话总结当前 Fed 利率政策状态，例如: "降息 25bp" 或 "维持利率不变" 或 "加息 50bp"',
+    "维持现状",
+)
+
+ETF_FLOW_TASK = NewsTask(
+    "etf_flow",
+    "https://news.google.com/rss/search?q=Bitcoin+ETF+flow&hl=en-US&gl=US&ceid=US:en",
+    '总结最近的 BTC ETF 资金流动情况，例如: "单周流入 $1.2B" 或 "单月流出 $3B" 或 "每日小幅波动"',
+    "数据不明确",
+)
+
+RISK_EVENTS_TASK = NewsTask(
+    "risk_events",
+    "https://news.google.com/rss/search?q=cryptocurrency+crisis+OR+exchange+collapse+OR+regulation&hl=en-US&gl=US&ceid=US:en",
+    '判断是否存在重大风险事件或黑天鹅，例如: "无明显风险" 或 "某交易所爆雷" 或 "监管收紧"',
+    "未检测到",
+)
+
+
+def _fetch_titles(task):
+    # 取全部缓存标题，跨任务去重后再截取 limit 条
+    return get_feed_cache().titles(task.rss_url)
+
+
+def _safe_titles(task):
+    # 获取失败返回 None（与 "没有新闻" 区分开）
+    try:
+        return _fetch_titles(task)
+    except Exception as e:
+        print(f"⚠️ 新闻获取失败 ({task.key}): {e}")
+        return None
+
+
+def build_batch_prompt(tasks, titles):
+    """
+    构建合并后的 prompt，每个子任务一个小节
+    """
+    sections = []
+    for task in tasks:
+        news_text = "\n".join([f"- {title}" for title in titles.get(task.key, [])]) or "- (无相关新闻)"
+        sections.append(f"【{task.key}】\n要求: {task.instruction}\n新闻:\n{news_text}")
+    keys = ", ".join(f'"{task.key}"' for task in tasks)
+    return (
+        "根据以下各组最新新闻，分别完成每组的总结要求。每个字段用简短中文回答。\n\n"
+        + "\n\n".join(sections)
+        + f"\n\n请输出纯 JSON 对象，包含字段: {keys}，每个字段的值为字符串。"
+    )
+
+
+def build_response_schema(tasks):
+    return {
+        "type": "object",
+        "properties": {task.key: {"type": "string"} for task in tasks},
+        "required": [task.key for task in tasks],
+    }
+
+
+def _valid(value):
+    return isinstance(value, str) and 0 < len(value.strip()) <= MAX_FIELD_LENGTH
+
+
+def parse_batch_response(text, tasks):
+    """
+    逐字段解析: 整体 JSON 解析失败时按字段正则提取，缺失/异常字段使用各自的 fallback
+    返回 (结果 dict, 回退字段列表)
+    """
+    cleaned = re.sub(r'```json\s*', '', text or '').replace('```', '').strip()
+    try:
+        data = json.loads(cleaned)
+        if not isinstance(data, dict):
+            data = {}
+    except json.JSONDecodeError:
+        data = {}
+        for task in tasks:
+            match = re.search(rf'"{re.escape(task.key)}"\s*:\s*"((?:[^"\\]|\\.)*)"', cleaned)
+            if match:
+                try:
+                    data[task.key] = json.loads(f'"{match.group(1)}"')
+                except json.JSONDecodeError:
+                    pass
+
+    results, fallbacks = {}, []
+    for task in tasks:
+        value = data.get(task.key)
+        if _valid(value):
+            results[task.key] = value.strip()
+        else:
+            results[task.key] = task.fallback
+            fallbacks.append(task.key)
+    return results, fallbacks
+
+
+def summarize_news_batch(model, tasks, strict=False):
+    """
+    并发抓取各子任务的新闻，然后一次模型调用得到全部摘要
+    同一条新闻只出现在第一个命中的任务中；标题与上次成功调用完全相同时直接复用上次结果
+    返回 {task.key: 摘要}
+    strict: 供后台刷新使用，不返回 fallback 文案——新闻全部获取失败或模型调用失败时抛异常，
+    新闻获取失败 / 输出异常的单个字段为 None（由调用方沿用旧值）
+    """
+    if not tasks:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        fetched = list(pool.map(_safe_titles, tasks))
+    failed = [task.key for task, result in zip(tasks, fetched) if result is None]
+    if strict and len(failed) == len(tasks):
+        raise RuntimeError("新闻全部获取失败")
+    groups = dedupe_titles([result or [] for result in fetched], [task.limit for task in tasks])
+    titles = dict(zip([task.key for task in tasks], groups))
+
+    prompt = build_batch_prompt(tasks, titles)
+    digest = hashlib.sha1(prompt.encode()).hexdigest()
+    with _digest_lock:
+        if digest in _digest_memo:
+            _digest_memo.move_to_end(digest)
+            print("✓ 新闻标题无变化，复用上次摘要")
+            results = dict(_digest_memo[digest])
+            return _drop(results, failed) if strict else results
+
+    try:
+        response = model.generate_content(
+            prompt,
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": build_response_schema(tasks),
+            },
+        )
+        text = response.text
+    except Exception as e:
+        if strict:
+            raise
+        print(f"⚠️ 批量新闻摘要调用失败，全部使用默认值: {e}")
+        return {task.key: task.fallback for task in tasks}
+
+    results, fallbacks = parse_batch_response(text, tasks)
+    if fallbacks:
+        print(f"⚠️ 批量新闻摘要字段异常，已单独回退: {fallbacks}")
+    else:
+        with _digest_lock:
+            _digest_memo[digest] = dict(results)
+            while len(_digest_memo) > DIGEST_MEMO_SIZE:
+                _digest_memo.popitem(last=False)
+    return _drop(results, failed + fallbacks) if strict else results
+
+
+def _drop(results, keys):
+    # strict 模式: 这些字段没有可信的新结果
+    return {key: (None if key in keys else value) for key, value in results.items()}
+
+
+if __name__ == "__main__":
+    # 测试: 解析容错（不调用模型）
+    tasks = [FED_POLICY_TASK, ETF_FLOW_TASK, RISK_EVENTS_TASK]
+    print(parse_batch_response('{"fed_policy": "降息 25bp", "etf_flow": "", "risk_events": "无明显风险"}', tasks))
+    print(parse_batch_response('```json\n{"fed_policy": "维持利率不变", "risk_events": "监管收紧", "etf_flow": ', tasks))
+    print(parse_batch_response('not json', tasks))
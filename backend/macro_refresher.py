@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+宏观数据后台刷新器 - 供 /api/scenario-analysis 使用
+每个宏观输入按自己的周期在后台刷新（小时/天级别变化的数据无需每次请求都抓取），
+结果汇总为带版本号的快照，接口直接读取快照并返回数据时效
+"""
+
+import asyncio
+import time
+
+from llm_batch import ETF_FLOW_TASK, FED_POLICY_TASK, RISK_EVENTS_TASK, summarize_news_batch
+
+# 宏观数据字段（保持接口返回顺序）
+MACRO_FIELDS = [
+    "美元指数 (DXY)",
+    "Fed 利率政策",
+    "BTC ETF 净流入",
+    "长期持有者行为",
+    "挖矿生产成本",
+    "美股表现 (S&P500)",
+    "风险事件",
+]
+
+# 各数据源刷新周期（秒）
+REFRESH_INTERVALS = {
+    "dxy": 24 * 3600,
+    "news_digest": 3600,
+    "holder_behavior": 3600,
+    "mining_cost": 12 * 3600,
+    "sp500": 1800,
+}
+
+# 单个数据源单次刷新超时（秒）
+SOURCE_TIMEOUT = 60
+
+
+# --- 数据源（同步函数，在线程池中执行）---
+# 助手以 strict=True 调用: 失败时抛异常（字段级失败返回 None），不把 "数据不可用" 之类的占位文案当成新值
+
+def fetch_dxy():
+    # 美元指数（简化 - 使用固定值或外部API）
+    dxy_value = "98.5 (估算)"
+    dxy_trend = "走弱"
+    return {"美元指数 (DXY)": f"{dxy_value}, {dxy_trend}"}
+
+
+def fetch_holder_behavior():
+    # 长期持有者行为 (链上数据，备用方案在 holder_behavior_helper.py 中实现)
+    from holder_behavior_helper import get_holder_behavior_summary
+    holder_behavior = get_holder_behavior_summary(strict=True)
+    print(f"✓ 获取到持有者行为链上数据: {holder_behavior}")
+    return {"长期持有者行为": holder_behavior}
+
+
+def fetch_mining_cost():
+    # 挖矿成本 (来自 Bitdeer 矿机关机价数据)
+    from mining_shutdown_price import get_mining_cost_summary
+    return {"挖矿生产成本": get_mining_cost_summary(strict=True)}
+
+
+def fetch_sp500():
+    # 美股 S&P500 表现 (从 Yahoo Finance 获取真实数据)
+    from sp500_helper import get_sp500_performance
+    return {"美股表现 (S&P500)": get_sp500_performance(strict=True)}
+
+
+def fetch_news_digest(model):
+    # Fed 利率政策 / BTC ETF 净流入 / 风险事件 合并为一次 Gemini 调用
+    # BTC ETF 优先使用 Farside Investors 真实数据，失败时才加入新闻总结
+    tasks = [FED_POLICY_TASK, RISK_EVENTS_TASK]
+    etf_flow = None
+    try:
+        from btc_etf_flow_helper import get_btc_etf_flow_summary
+        etf_flow = get_btc_etf_flow_summary(strict=True)
+        print(f"✓ 获取到 BTC ETF 真实数据: {etf_flow}")
+    except Exception as e:
+        print(f"⚠️ BTC ETF 数据获取失败，使用备用方案: {e}")
+        # 备用方案：使用AI分析新闻（并入同一次调用）
+        tasks.append(ETF_FLOW_TASK)
+
+    try:
+        summaries = summarize_news_batch(model, tasks, strict=True)
+    except Exception as e:
+        if etf_flow is None:
+            raise
+        # ETF 数据有效，只让新闻字段沿用旧值
+        print(f"⚠️ 新闻摘要失败: {e!r}")
+        summaries = {task.key: None for task in tasks}
+    return {
+        "Fed 利率政策": summaries["fed_policy"],
+        "BTC ETF 净流入": etf_flow if etf_flow is not None else summaries["etf_flow"],
+        "风险事件": summaries["risk_events"],
+    }
+
+
+class MacroSource:
+    """
+    一个宏观数据源: fetch() 返回 {宏观字段: 值}，失败时抛异常，保留上次的值（首次失败用 fallback）
+    某个字段为 None 表示只有该字段失败，沿用该字段上次的值
+    """
+
+    def __init__(self, name, fetch, interval, fallback):
+        self.name = name
+        self.fetch = fetch
+        self.interval = interval
+        self.fallback = fallback
+
+
+def default_sources(model):
+    return [
+        MacroSource("dxy", fetch_dxy, REFRESH_INTERVALS["dxy"], {"美元指数 (DXY)": "98.5 (估算), 走弱"}),
+        MacroSource("news_digest", lambda: fetch_news_digest(model), REFRESH_INTERVALS["news_digest"], {
+            "Fed 利率政策": FED_POLICY_TASK.fallback,
+            "BTC ETF 净流入": ETF_FLOW_TASK.fallback,
+            "风险事件": RISK_EVENTS_TASK.fallback,
+        }),
+        MacroSource("holder_behavior", fetch_holder_behavior, REFRESH_INTERVALS["holder_behavior"], {"长期持有者行为": "数据不可用"}),
+        MacroSource("mining_cost", fetch_mining_cost, REFRESH_INTERVALS["mining_cost"], {"挖矿生产成本": "约$75,000 (参考值)"}),
+        MacroSource("sp500", fetch_sp500, REFRESH_INTERVALS["sp500"], {"美股表现 (S&P500)": "数据不可用"}),
+    ]
+
+
+class MacroRefresher:
+    """
+    后台调度器: 每个数据源一个循环任务，刷新后生成新版本快照
+    快照为不可变 dict，读取无需加锁
+    """
+
+    def __init__(self, sources, timeout=SOURCE_TIMEOUT):
+        self.sources = list(sources)
+        self.timeout = timeout
+        self._values = {}
+        self._updated_at = {}
+        self._version = 0
+        self._snapshot = None
+        self._tasks = []
+        self._listeners = []
+        self._initial = None
+
+    def add_listener(self, callback):
+        """快照更新后回调 callback(snapshot)"""
+        self._listeners.append(callback)
+
+    async def refresh(self, source, publish=True):
+        """
+        刷新单个数据源，值有变化时生成新版本快照
+        失败（含部分字段失败）时沿用旧值，且不更新该数据源的时效
+        """
+        previous = self._values.get(source.name, source.fallback)
+        try:
+            values = await asyncio.wait_for(asyncio.to_thread(source.fetch), timeout=self.timeout)
+        except Exception as e:
+            print(f"⚠️ 宏观数据源 {source.name} 刷新失败，沿用旧值: {e!r}")
+            values = previous
+        else:
+            missing = [field for field, value in values.items() if value is None]
+            if missing:
+                print(f"⚠️ 宏观数据源 {source.name} 部分字段刷新失败，沿用旧值: {missing}")
+                values = {field: previous.get(field) if value is None else value for field, value in values.items()}
+            else:
+                self._updated_at[source.name] = time.time()
+        changed = values != self._values.get(source.name)
+        self._values[source.name] = values
+        if publish and changed:
+            self._publish()
+        return changed
+
+    async def refresh_all(self):
+        """并发刷新全部数据源，只生成一个新版本"""
+        changed = await asyncio.gather(*[self.refresh(source, publish=False) for source in self.sources])
+        if any(changed) or self._snapshot is None:
+            self._publish()
+
+    def _publish(self):
+        merged = {}
+        for source in self.sources:
+            merged.update(self._values.get(source.name, source.fallback))
+        self._version += 1
+        self._snapshot = {
+            "version": self._version,
+            "created_at": time.time(),
+            "macro_data": {field: merged[field] for field in MACRO_FIELDS if field in merged},
+            "updated_at": dict(self._updated_at),
+        }
+        for callback in self._listeners:
+            try:
+                callback(self._snapshot)
+            except Exception as e:
+                print(f"⚠️ 快照回调失败: {e}")
+
+    async def _run(self, source):
+        while True:
+            await self.refresh(source)
+            await asyncio.sleep(source.interval)
+
+    def start(self):
+        """启动后台刷新（在事件循环中调用）"""
+        if self._tasks:
+            return
+        self._initial = asyncio.ensure_future(self.refresh_all())
+        for source in self.sources:
+            self._tasks.append(asyncio.ensure_future(self._delayed(source)))
+
+    async def _delayed(self, source):
+        # 首轮由 refresh_all 完成，之后按各自周期刷新
+        await asyncio.shield(self._initial)
+        await asyncio.sleep(source.interval)
+        await self._run(source)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def wait_ready(self):
+        """等待首轮刷新完成（冷启动时的第一个请求）"""
+        if self._snapshot is None:
+            if self._initial is None:
+                self._initial = asyncio.ensure_future(self.refresh_all())
+            await asyncio.shield(self._initial)
+        return self._snapshot
+
+    def snapshot(self):
+        return self._snapshot
+
+    def data_age(self, now=None):
+        """各数据源距上次成功刷新的秒数（从未成功为 None）"""
+        now = now or time.time()
+        return {
+            source.name: round(now - self._updated_at[source.name], 1) if source.name in self._updated_at else None
+            for source in self.sources
+        }
+
+
+if __name__ == "__main__":
+    # 测试: 不调用 Gemini 的数据源刷新一次；数据源失败时保留上次的值、版本与时效
+    async def _main():
+        sources = [s for s in default_sources(model=None) if s.name in ("dxy", "mining_cost", "sp500")]
+        refresher = MacroRefresher(sources)
+        snapshot = await refresher.wait_ready()
+        print(f"快照版本 {snapshot['version']}: {snapshot['macro_data']}")
+        print(f"数据时效: {refresher.data_age()}")
+
+        outcomes = iter([{"风险事件": "无明显风险", "Fed 利率政策": "维持利率不变"},
+                         RuntimeError("模型调用失败"),
+                         {"风险事件": None, "Fed 利率政策": "降息 25bp"}])
+
+        def flaky():
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        source = MacroSource("flaky", flaky, 3600, {"风险事件": "未检测到", "Fed 利率政策": "维持现状"})
+        refresher = MacroRefresher([source])
+        await refresher.refresh(source)
+        updated = refresher._updated_at["flaky"]
+        for _ in range(2):
+            await refresher.refresh(source)
+            snapshot = refresher.snapshot()
+            print(f"版本 {snapshot['version']}: {snapshot['macro_data']}, "
+                  f"时效未重置: {refresher._updated_at['flaky'] == updated}")
+
+    asyncio.run(_main())
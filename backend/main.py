@@ -1,17 +1,23 @@
 import os
-import ccxt
+import asyncio
 import pandas as pd
-import ta
 import json
 import re
-import feedparser
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import google.generativeai as genai
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from datetime import datetime
+from market_data import close_exchange, current_bar_open
+from candle_store import get_candles
+from incremental_indicators import indicator_engine
+from response_cache import AsyncTTLCache
+from chart_serialization import chart_columns, chart_records
+from http_client import get_client
+from feed_cache import get_feed_cache, title_key
 
 # 1. 加载环境变量
 load_dotenv()
@@ -31,8 +37,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 关闭共享的交易所连接池
+    await close_exchange()
+
 # 3. 初始化
-exchange = ccxt.binance()
 GENAI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 if not GENAI_API_KEY:
@@ -45,14 +55,33 @@ model = genai.GenerativeModel('gemini-2.5-flash')
 class AnalysisRequest(BaseModel):
     symbol: str 
 
+# 各数据源超时 (秒)，超时后使用兜底值，不拖慢整个请求
+CANDLE_TIMEOUT = 10
+NEWS_TIMEOUT = 8
+FNG_TIMEOUT = 6
+DEFAULT_FNG = {"value": "50", "value_classification": "Neutral"}
+
+# /api/analyze 结果缓存: 同一交易对、同一根1H K线内的请求共享结果（含 Gemini 调用）
+ANALYZE_CACHE_TTL = int(os.getenv("ANALYZE_CACHE_TTL", "120"))
+ANALYZE_CACHE_SIZE = int(os.getenv("ANALYZE_CACHE_SIZE", "128"))
+analyze_cache = AsyncTTLCache(ttl=ANALYZE_CACHE_TTL, maxsize=ANALYZE_CACHE_SIZE)
+
 # --- 辅助功能 ---
+async def gather_with_fallback(coro, timeout, fallback, name):
+    """带超时的数据源获取，失败或超时返回兜底值"""
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except Exception as e:
+        print(f"⚠️ {name} 获取失败或超时，使用兜底值: {e!r}")
+        return fallback
+
 def get_fear_and_greed():
     try:
         url = "https://api.alternative.me/fng/?limit=1"
-        r = requests.get(url, timeout=5)
-        return {"value": r.json()['data'][0]['value'], "value_classification": r.json()['data'][0]['value_classification']}
+        data = get_client().get(url, timeout=5).json()['data'][0]
+        return {"value": data['value'], "value_classification": data['value_classification']}
     except:
-        return {"value": "50", "value_classification": "Neutral"}
+        return dict(DEFAULT_FNG)
 
 def get_crypto_news(symbol_query: str):
     """获取 Google News (包含发布时间)"""
@@ -63,82 +92,32 @@ def get_crypto_news(symbol_query: str):
         
         # RSS URL
         rss_url = f"https://news.google.com/rss/search?q={query}+crypto&hl=en-US&gl=US&ceid=US:en"
-        feed = feedparser.parse(rss_url)
-        
+        # 缓存内的已解析条目 (TTL + 条件请求)，同一标题被多个来源转载时只保留一条
         news_items = []
-        for entry in feed.entries[:5]:
-            # 获取发布时间，如果没有则显示 '未知'
-            pub_date = entry.get('published', 'N/A')
-            
-            # 尝试简单格式化日期 (去掉时区等冗余信息，让前端显示更短)
-            # Google 格式通常是: "Fri, 05 Dec 2025 03:00:00 GMT"
-            try:
-                # 截取前16个字符 -> "Fri, 05 Dec 2025" 
-                # 或者保留原样让前端处理
-                pass 
-            except:
-                pass
-
-            news_items.append({
-                "title": entry.title,
-                "link": entry.link,
-                "published": pub_date  # <--- 新增这行
-            })
+        seen = set()
+        for entry in get_feed_cache().get(rss_url):
+            key = title_key(entry["title"])
+            if key in seen:
+                continue
+            seen.add(key)
+            # Google 格式通常是: "Fri, 05 Dec 2025 03:00:00 GMT"，保留原样让前端处理
+            news_items.append(dict(entry))
+            if len(news_items) == 5:
+                break
             
         return news_items
     except Exception as e:
         print(f"获取新闻出错: {e}")
         return []
 
-def fetch_data(symbol: str, timeframe='1h', limit=500):
+async def fetch_data(symbol: str, timeframe='1h', limit=500):
     try:
-        bars = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-        df = pd.DataFrame(bars, columns=['time', 'open', 'high', 'low', 'close', 'volume'])
-        df['time'] = pd.to_datetime(df['time'], unit='ms')
-        return df
+        return await get_candles(symbol, timeframe=timeframe, limit=limit)
     except Exception as e:
         print(f"Error fetching {timeframe}: {e}")
         return pd.DataFrame()
 
-# --- 🔥 核心指标计算 ---
-
-def calculate_indicators(df):
-    """微观指标 (1H/15m): RSI, MACD, EMA, ADX"""
-    if df.empty: return df
-    df['RSI'] = ta.momentum.RSIIndicator(close=df['close'], window=14).rsi()
-    macd = ta.trend.MACD(close=df['close'])
-    df['MACD'] = macd.macd()
-    df['MACD_signal'] = macd.macd_signal()
-    df['MACD_diff'] = macd.macd_diff() # 柱状图
-    
-    df['EMA20'] = ta.trend.EMAIndicator(close=df['close'], window=20).ema_indicator()
-    df['EMA50'] = ta.trend.EMAIndicator(close=df['close'], window=50).ema_indicator()
-    df['EMA200'] = ta.trend.EMAIndicator(close=df['close'], window=200).ema_indicator()
-    
-    df['BBL_20_2.0'] = ta.volatility.BollingerBands(close=df['close']).bollinger_lband()
-    df['BBU_20_2.0'] = ta.volatility.BollingerBands(close=df['close']).bollinger_hband()
-    df['ATR'] = ta.volatility.AverageTrueRange(high=df['high'], low=df['low'], close=df['close']).average_true_range()
-    df['ADX'] = ta.trend.ADXIndicator(high=df['high'], low=df['low'], close=df['close']).adx()
-    
-    # Pivot Points
-    prev_high = df['high'].shift(1)
-    prev_low = df['low'].shift(1)
-    prev_close = df['close'].shift(1)
-    df['Pivot'] = (prev_high + prev_low + prev_close) / 3
-    df['R1'] = (2 * df['Pivot']) - prev_low
-    df['S1'] = (2 * df['Pivot']) - prev_high
-    df['Vol_MA20'] = df['volume'].rolling(window=20).mean()
-    return df.fillna(0)
-
-def calculate_daily_indicators(df):
-    """宏观指标 (1D): SMA200, 斜率, 乖离率"""
-    if df.empty: return df
-    df['SMA50'] = ta.trend.SMAIndicator(close=df['close'], window=50).sma_indicator()
-    df['SMA200'] = ta.trend.SMAIndicator(close=df['close'], window=200).sma_indicator()
-    
-    df['SMA200_Slope'] = (df['SMA200'] - df['SMA200'].shift(5)) / df['SMA200'].shift(5) * 100
-    df['SMA200_Dev'] = (df['close'] - df['SMA200']) / df['SMA200'] * 100
-    return df.fillna(0)
+# --- 🔥 核心指标计算 (见 indicators.py / incremental_indicators.py) ---
 
 # --- 🔥 这里就是你缺少的 Function 🔥 ---
 def get_trend_status(row, is_macro=False, macro_bullish=False):
@@ -177,317 +156,681 @@ def get_trend_status(row, is_macro=False, macro_bullish=False):
 
 # --- API ---
 
-@app.get("/api/market-data/{symbol}")
-async def get_market_data(symbol: str):
-    """图表数据"""
+def format_symbol(symbol: str):
+    """URL 中的交易对 (BTC-USDT / BTCUSDT) -> BTC/USDT"""
+    formatted_symbol = symbol.replace('-', '/').upper()
+    if '/' not in formatted_symbol: formatted_symbol = formatted_symbol[:-4] + '/' + formatted_symbol[-4:]
+    return formatted_symbol
+
+@app.get("/api/market-data/{symbol}", response_class=ORJSONResponse)
+async def get_market_data(symbol: str, format: str = "records"):
+    """图表数据 (format=records 逐根记录, format=columns 列式数组)"""
     try:
-        formatted_symbol = symbol.replace('-', '/').upper()
-        if '/' not in formatted_symbol: formatted_symbol = formatted_symbol[:-4] + '/' + formatted_symbol[-4:]
+        formatted_symbol = format_symbol(symbol)
         
         # 返回日线数据画长线图
-        df = fetch_data(formatted_symbol, timeframe='1d', limit=365)
-        df = calculate_daily_indicators(df)
+        df = await fetch_data(formatted_symbol, timeframe='1d', limit=365)
+        df = indicator_engine.apply(formatted_symbol, '1d', df, daily=True)
         
-        chart_data = []
-        for index, row in df.iterrows():
-            chart_data.append({
-                "time": int(row['time'].timestamp()),
-                "open": row['open'], "high": row['high'], "low": row['low'], "close": row['close'],
-                "volume": row['volume'],
-                "sma50": row['SMA50'], "sma200": row['SMA200']
-            })
-        return {"symbol": formatted_symbol, "data": chart_data}
+        chart_data = chart_columns(df) if format == "columns" else chart_records(df)
+        return ORJSONResponse({"symbol": formatted_symbol, "data": chart_data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/analyze")
 async def analyze_market(request: AnalysisRequest):
+    # 缓存键: 交易对 + 当前1H K线开盘时间，并发的相同请求 (含 /api/analyze/stream) 合并为一次计算
+    cache_key = (request.symbol, current_bar_open('1h'))
+    return await analyze_cache.get_or_compute(
+        cache_key, analysis_factory(request, cache_key), cacheable=analysis_cacheable
+    )
+
+def analysis_cacheable(result):
+    return "v6pp_info" in result
+
+# 在途分析的进度 (缓存键 -> AnalysisProgress)，同一键的 SSE 请求订阅同一次计算
+analysis_progress = {}
+
+def analysis_factory(request: AnalysisRequest, cache_key):
+    """analyze_cache 的计算函数: 创建计算时登记进度，JSON 与 SSE 两个接口共用"""
+    def factory():
+        progress = analysis_progress[cache_key] = AnalysisProgress()
+        return run_registered_analysis(request, cache_key, progress)
+    return factory
+
+async def run_registered_analysis(request: AnalysisRequest, cache_key, progress):
     try:
-        # 1. 双脑数据获取
-        df_daily = fetch_data(request.symbol, '1d', limit=500)
-        df_hourly = fetch_data(request.symbol, '1h', limit=100)
-        
-        if df_daily.empty: df_daily = df_hourly # 兜底
-        if df_hourly.empty: raise HTTPException(status_code=500, detail="数据获取失败")
-
-        # 2. 计算指标
-        df_daily = calculate_daily_indicators(df_daily)
-        df_hourly = calculate_indicators(df_hourly)
-        
-        last_daily = df_daily.iloc[-1]
-        last_hourly = df_hourly.iloc[-1]
-        
-        # 3. 宏观背景判定 (🔥 V6++策略核心逻辑)
-        slope = last_daily['SMA200_Slope']
-        dev = last_daily['SMA200_Dev']
-        price = last_daily['close']
-        sma200 = last_daily['SMA200']
-        
-        # 🔥 V6++逻辑: 宽松牛市判定 (价格>SMA200 OR 斜率>0)
-        # 优势: 减少误判，避免震荡市频繁止损，5年回测+514% vs V7的-18%
-        is_bull_regime = (price > sma200) or (slope > 0)
-        
-        # 做空条件判定 (V6++新增)
-        can_short = (not is_bull_regime) and (dev < -10) and (slope < -0.5)
-        
-        regime_desc = "🐮 牛市/强势背景" if is_bull_regime else "🐻 熊市/弱势背景"
-
-        # 4. 生成雷达图信号
-        ui_signals = {}
-        mtf_desc = {}
-        target_timeframes = ['1w', '1d', '4h', '1h'] 
-
-        for tf in target_timeframes:
-            if tf == '1d':
-                # 日线强制跟随严格风控判定
-                status = "bullish" if is_bull_regime else "bearish"
-                ui_signals[tf] = status
-                mtf_desc[tf] = f"趋势:{'牛市' if is_bull_regime else '熊市'} (SMA200:{sma200:.0f})"
-            elif tf == '1w':
-                df_w = fetch_data(request.symbol, '1w', limit=52)
-                if not df_w.empty:
-                    df_w = calculate_indicators(df_w)
-                    ui_signals[tf] = get_trend_status(df_w.iloc[-1])
-                    mtf_desc[tf] = f"RSI:{df_w.iloc[-1]['RSI']:.1f}"
-                else: ui_signals[tf] = "neutral"
-            elif tf == '1h':
-                 ui_signals[tf] = get_trend_status(last_hourly)
-                 mtf_desc[tf] = f"RSI:{last_hourly['RSI']:.1f}"
-            else:
-                df_tf = fetch_data(request.symbol, tf, limit=100)
-                if not df_tf.empty:
-                    df_tf = calculate_indicators(df_tf)
-                    ui_signals[tf] = get_trend_status(df_tf.iloc[-1])
-                    mtf_desc[tf] = f"RSI:{df_tf.iloc[-1]['RSI']:.1f}"
-                else: ui_signals[tf] = "neutral"
-
-        # 5. 微观数据
-        momentum_4h = 0.0
-        if len(df_hourly) >= 4:
-            momentum_4h = (last_hourly['close'] - df_hourly.iloc[-4]['close']) / df_hourly.iloc[-4]['close'] * 100
-            
-        macd_status = "✅ 金叉" if last_hourly['MACD'] > last_hourly['MACD_signal'] else "⚠️ 死叉"
-        
-        # 6. Prompt (🔥 V6++策略版 - 历史回测+514%收益)
-        news_list = get_crypto_news(request.symbol)
-        news_text = "\n".join([f"- {n['title']}" for n in news_list])
-        fng = get_fear_and_greed()
-        
-        # 预计算做空状态（避免f-string嵌套）
-        short_status = "✅可做空" if can_short else "❌不可做空"
-
-        prompt = f"""
-        你是一位采用**V6++策略**的趋势交易员。
-        
-        【宏观背景 (日线)】
-        - 环境: **{regime_desc}**
-        - SMA200: ${sma200:.2f}
-        - 乖离率: {dev:.2f}% (价格距离SMA200的距离)
-        - 斜率: {slope:.4f}
-        - 恐慌指数: {fng['value']}
-        
-        【微观参考 (1小时)】
-        - 现价: ${last_hourly['close']:.2f}
-        - Pivot: ${last_hourly['Pivot']:.2f}
-        - MACD: {macd_status}
-        
-        
-        【🔥 V6++核心决策逻辑 (历史回测+514%收益) 🔥】
-        
-        **V6++牛市判定**: 价格>SMA200 OR 斜率>0 (宽松判定，避免误判)
-        
-        **场景 A: 牛市背景**
-        *逻辑: 持有为主，回调买入，盈利100%获利了结。*
-        1. **🎯 100%获利了结**: 如果持仓盈利 >= 100% -> **立即卖出锁定利润** (避免顶点回撤)。
-        2. **悬崖勒马**: 乖离率 < 3% 且 斜率 < 0 (均线拐头) -> **减仓/观望**。
-        3. **牛市回调**: 价格 > SMA200 且 RSI < 50 -> **买入/加仓**。
-        4. **趋势跟随**: 价格稳在 SMA200 之上或斜率向上 -> **持有**。
-
-        **场景 B: 熊市背景 (价格<SMA200 且 斜率<0)**
-        *逻辑: 可做空赚钱，不要轻易抄底。*
-        1. **止损/空仓**: 价格 < SMA200 -> **卖出/观望**。
-        2. **📉 做空机会 (当前{short_status})**: 
-           - 条件: 乖离率 < -10% 且 斜率 < -0.5% -> **可考虑做空**
-           - 平空: 盈利100% 或 乖离率>-5% 或 转牛
-        3. **极端超跌**: 乖离率 < -30% -> 可轻仓博反弹。
-
-        【任务】
-        请给出未来 **14-30天** 的操作建议。
-        
-        请输出纯 JSON:
-        {{
-            "direction": "买入" | "持有" | "卖出" | "观望" | "做空",
-            "entry_price": "建议挂单价",
-            "stop_loss": "建议止损价 (参考 SMA200)",
-            "target_price": "建议止盈价 (多头考虑100%获利)",
-            "reasoning": "详细理由 (必须基于V6++逻辑)",
-            "confidence": "1-10",
-            "risk_warning": "风险提示"
-        }}
-        """
-        
-        response = model.generate_content(prompt)
-        
-        try:
-            cleaned_text = re.sub(r'```json\s*', '', response.text).replace('```', '').strip()
-            analysis_json = json.loads(cleaned_text)
-            
-            
-            return {
-                "ui_signals": ui_signals,
-                "analysis": analysis_json,
-                "news": news_list,
-                "fng": fng,
-                "v6pp_info": {
-                    "is_bull_v6": bool(is_bull_regime),
-                    "can_short": bool(can_short),
-                    "strategy_version": "V6++",
-                    "backtest_performance": "+514% (2021-2025)"
-                }
-            }
-        except json.JSONDecodeError:
-            return {
-                "ui_signals": ui_signals,
-                "analysis": {"direction": "解析错误", "reasoning": response.text, "confidence": 0},
-                "news": news_list,
-                "fng": fng
-            }
+        return await run_analysis(request, progress)
+    finally:
+        if analysis_progress.get(cache_key) is progress:
+            del analysis_progress[cache_key]
 
+async def run_analysis(request: AnalysisRequest, progress=None):
+    """
+    准备数据 -> 流式调用模型 -> 解析结果
+    progress: 同时把 signals / delta / result (出错时 error) 事件写入该进度，供 SSE 订阅者转发
+    """
+    progress = progress or AnalysisProgress()
+    try:
+        context = await prepare_analysis(request)
+        await progress.emit("signals", {k: context[k] for k in ("ui_signals", "fng", "news")})
+        chunks = []
+        async for text in stream_model_text(context["prompt"]):
+            chunks.append(text)
+            await progress.emit("delta", {"text": text})
+        result = build_analysis_result(context, "".join(chunks))
+        await progress.emit("result", result)
+        return result
     except Exception as e:
         print(f"Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-# --- 🔥 情景分析 API (新增) ---
+        detail = str(getattr(e, "detail", e))
+        await progress.emit("error", {"detail": detail})
+        raise HTTPException(status_code=500, detail=detail)
+    finally:
+        await progress.finish()
+
+async def prepare_analysis(request: AnalysisRequest):
+    """获取数据、计算指标并构建 Prompt（模型调用之前的全部工作）"""
+    # 1. 双脑数据获取 (所有独立数据源并发获取，各自超时兜底)
+    df_daily, df_hourly, df_w, df_4h, news_list, fng = await asyncio.gather(
+        gather_with_fallback(fetch_data(request.symbol, '1d', limit=500), CANDLE_TIMEOUT, pd.DataFrame(), "1d K线"),
+        gather_with_fallback(fetch_data(request.symbol, '1h', limit=100), CANDLE_TIMEOUT, pd.DataFrame(), "1h K线"),
+        gather_with_fallback(fetch_data(request.symbol, '1w', limit=52), CANDLE_TIMEOUT, pd.DataFrame(), "1w K线"),
+        gather_with_fallback(fetch_data(request.symbol, '4h', limit=100), CANDLE_TIMEOUT, pd.DataFrame(), "4h K线"),
+        gather_with_fallback(asyncio.to_thread(get_crypto_news, request.symbol), NEWS_TIMEOUT, [], "新闻"),
+        gather_with_fallback(asyncio.to_thread(get_fear_and_greed), FNG_TIMEOUT, dict(DEFAULT_FNG), "恐慌指数"),
+    )
+    
+    daily_tf = '1d'
+    if df_daily.empty: df_daily, daily_tf = df_hourly, '1h' # 兜底
+    if df_hourly.empty: raise HTTPException(status_code=500, detail="数据获取失败")
 
-from scenario_scoring import ScenarioScorer
+    # 2. 计算指标 (流式引擎: 已算过的K线直接复用，只增量计算新K线)
+    df_daily = indicator_engine.apply(request.symbol, daily_tf, df_daily, daily=True)
+    df_hourly = indicator_engine.apply(request.symbol, '1h', df_hourly)
+    
+    last_daily = df_daily.iloc[-1]
+    last_hourly = df_hourly.iloc[-1]
+    
+    # 3. 宏观背景判定 (🔥 V6++策略核心逻辑)
+    slope = last_daily['SMA200_Slope']
+    dev = last_daily['SMA200_Dev']
+    price = last_daily['close']
+    sma200 = last_daily['SMA200']
+    
+    # 🔥 V6++逻辑: 宽松牛市判定 (价格>SMA200 OR 斜率>0)
+    # 优势: 减少误判，避免震荡市频繁止损，5年回测+514% vs V7的-18%
+    is_bull_regime = (price > sma200) or (slope > 0)
+    
+    # 做空条件判定 (V6++新增)
+    can_short = (not is_bull_regime) and (dev < -10) and (slope < -0.5)
+    
+    regime_desc = "🐮 牛市/强势背景" if is_bull_regime else "🐻 熊市/弱势背景"
+
+    # 4. 生成雷达图信号
+    ui_signals = {}
+    mtf_desc = {}
+    target_timeframes = ['1w', '1d', '4h', '1h'] 
+
+    for tf in target_timeframes:
+        if tf == '1d':
+            # 日线强制跟随严格风控判定
+            status = "bullish" if is_bull_regime else "bearish"
+            ui_signals[tf] = status
+            mtf_desc[tf] = f"趋势:{'牛市' if is_bull_regime else '熊市'} (SMA200:{sma200:.0f})"
+        elif tf == '1w':
+            if not df_w.empty:
+                df_w = indicator_engine.apply(request.symbol, '1w', df_w)
+                ui_signals[tf] = get_trend_status(df_w.iloc[-1])
+                mtf_desc[tf] = f"RSI:{df_w.iloc[-1]['RSI']:.1f}"
+            else: ui_signals[tf] = "neutral"
+        elif tf == '1h':
+             ui_signals[tf] = get_trend_status(last_hourly)
+             mtf_desc[tf] = f"RSI:{last_hourly['RSI']:.1f}"
+        else:
+            df_tf = df_4h
+            if not df_tf.empty:
+                df_tf = indicator_engine.apply(request.symbol, tf, df_tf)
+                ui_signals[tf] = get_trend_status(df_tf.iloc[-1])
+                mtf_desc[tf] = f"RSI:{df_tf.iloc[-1]['RSI']:.1f}"
+            else: ui_signals[tf] = "neutral"
+
+    # 5. 微观数据
+    momentum_4h = 0.0
+    if len(df_hourly) >= 4:
+        momentum_4h = (last_hourly['close'] - df_hourly.iloc[-4]['close']) / df_hourly.iloc[-4]['close'] * 100
+        
+    macd_status = "✅ 金叉" if last_hourly['MACD'] > last_hourly['MACD_signal'] else "⚠️ 死叉"
+    
+    # 6. Prompt (🔥 V6++策略版 - 历史回测+514%收益)
+    news_text = "\n".join([f"- {n['title']}" for n in news_list])
+    
+    # 预计算做空状态（避免f-string嵌套）
+    short_status = "✅可做空" if can_short else "❌不可做空"
 
-@app.post("/api/scenario-analysis")
-async def scenario_analysis(request: AnalysisRequest):
-    """
-    宏观情景分析 - 自动获取数据并计算四大情景概率
+    prompt = f"""
+    你是一位采用**V6++策略**的趋势交易员。
+    
+    【宏观背景 (日线)】
+    - 环境: **{regime_desc}**
+    - SMA200: ${sma200:.2f}
+    - 乖离率: {dev:.2f}% (价格距离SMA200的距离)
+    - 斜率: {slope:.4f}
+    - 恐慌指数: {fng['value']}
+    
+    【微观参考 (1小时)】
+    - 现价: ${last_hourly['close']:.2f}
+    - Pivot: ${last_hourly['Pivot']:.2f}
+    - MACD: {macd_status}
+    
+    
+    【🔥 V6++核心决策逻辑 (历史回测+514%收益) 🔥】
+    
+    **V6++牛市判定**: 价格>SMA200 OR 斜率>0 (宽松判定，避免误判)
+    
+    **场景 A: 牛市背景**
+    *逻辑: 持有为主，回调买入，盈利100%获利了结。*
+    1. **🎯 100%获利了结**: 如果持仓盈利 >= 100% -> **立即卖出锁定利润** (避免顶点回撤)。
+    2. **悬崖勒马**: 乖离率 < 3% 且 斜率 < 0 (均线拐头) -> **减仓/观望**。
+    3. **牛市回调**: 价格 > SMA200 且 RSI < 50 -> **买入/加仓**。
+    4. **趋势跟随**: 价格稳在 SMA200 之上或斜率向上 -> **持有**。
+
+    **场景 B: 熊市背景 (价格<SMA200 且 斜率<0)**
+    *逻辑: 可做空赚钱，不要轻易抄底。*
+    1. **止损/空仓**: 价格 < SMA200 -> **卖出/观望**。
+    2. **📉 做空机会 (当前{short_status})**: 
+       - 条件: 乖离率 < -10% 且 斜率 < -0.5% -> **可考虑做空**
+       - 平空: 盈利100% 或 乖离率>-5% 或 转牛
+    3. **极端超跌**: 乖离率 < -30% -> 可轻仓博反弹。
+
+    【任务】
+    请给出未来 **14-30天** 的操作建议。
+    
+    请输出纯 JSON:
+    {{
+        "direction": "买入" | "持有" | "卖出" | "观望" | "做空",
+        "entry_price": "建议挂单价",
+        "stop_loss": "建议止损价 (参考 SMA200)",
+        "target_price": "建议止盈价 (多头考虑100%获利)",
+        "reasoning": "详细理由 (必须基于V6++逻辑)",
+        "confidence": "1-10",
+        "risk_warning": "风险提示"
+    }}
     """
+    
+    return {
+        "ui_signals": ui_signals,
+        "news": news_list,
+        "fng": fng,
+        "is_bull_regime": bool(is_bull_regime),
+        "can_short": bool(can_short),
+        "prompt": prompt,
+    }
+
+def build_analysis_result(context, text):
+    """解析模型输出，生成 /api/analyze 的响应"""
     try:
-        # 1. 自动获取宏观数据
-        print(f"📊 开始获取 {request.symbol} 的宏观数据...")
-        
-        # 1.1 美元指数（简化 - 使用固定值或外部API）
-        dxy_value = "98.5 (估算)"
-        dxy_trend = "走弱"
+        cleaned_text = re.sub(r'```json\s*', '', text).replace('```', '').strip()
+        analysis_json = json.loads(cleaned_text)
         
-        # 1.2 Fed 利率政策（通过AI分析新闻）
-        try:
-            rss_url = "https://news.google.com/rss/search?q=Federal+Reserve+interest+rate&hl=en-US&gl=US&ceid=US:en"
-            feed = feedparser.parse(rss_url)
-            news_titles = [entry.title for entry in feed.entries[:5]]
-            news_text = "\n".join([f"- {title}" for title in news_titles])
-            
-            prompt = f"""根据以下最新新闻，用一句话总结当前 Fed 利率政策状态：
-{news_text}
-请用简短格式回答，例如: "降息 25bp" 或 "维持利率不变" 或 "加息 50bp"
-"""
-            response = model.generate_content(prompt)
-            fed_policy = response.text.strip()
-        except:
-            fed_policy = "维持现状"
-        
-        # 1.3 BTC ETF 净流入 (来自 Farside Investors 真实数据)
-        try:
-            from btc_etf_flow_helper import get_btc_etf_flow_summary
-            etf_flow = get_btc_etf_flow_summary()
-            print(f"✓ 获取到 BTC ETF 真实数据: {etf_flow}")
-        except Exception as e:
-            print(f"⚠️ BTC ETF 数据获取失败，使用备用方案: {e}")
-            # 备用方案：使用AI分析新闻
-            try:
-                rss_url = "https://news.google.com/rss/search?q=Bitcoin+ETF+flow&hl=en-US&gl=US&ceid=US:en"
-                feed = feedparser.parse(rss_url)
-                news_titles = [entry.title for entry in feed.entries[:5]]
-                news_text = "\n".join([f"- {title}" for title in news_titles])
-                
-                prompt = f"""根据以下新闻，总结最近的 BTC ETF 资金流动情况：
-{news_text}
-请用简短格式回答，例如: "单周流入 $1.2B" 或 "单月流出 $3B" 或 "每日小幅波动"
-"""
-                response = model.generate_content(prompt)
-                etf_flow = response.text.strip()
-            except:
-                etf_flow = "数据不明确"
         
-        # 1.4 长期持有者行为 (来自 CryptoQuant 链上真实数据)
-        try:
-            from holder_behavior_helper import get_holder_behavior_summary as get_holder_summary
-            holder_behavior = get_holder_summary()
-            print(f"✓ 获取到持有者行为链上数据: {holder_behavior}")
-        except Exception as e:
-            print(f"⚠️ 持有者行为数据获取失败，使用备用方案: {e}")
-            # 备用方案已在 holder_behavior_helper.py 中实现
-            holder_behavior = "数据不可用"
-        
-        # 1.5 挖矿成本 (来自 Bitdeer 矿机关机价数据)
+        return {
+            "ui_signals": context["ui_signals"],
+            "analysis": analysis_json,
+            "news": context["news"],
+            "fng": context["fng"],
+            "v6pp_info": {
+                "is_bull_v6": context["is_bull_regime"],
+                "can_short": context["can_short"],
+                "strategy_version": "V6++",
+                "backtest_performance": "+514% (2021-2025)"
+            }
+        }
+    except json.JSONDecodeError:
+        return {
+            "ui_signals": context["ui_signals"],
+            "analysis": {"direction": "解析错误", "reasoning": text, "confidence": 0},
+            "news": context["news"],
+            "fng": context["fng"]
+        }
+
+# --- 流式分析 (SSE) ---
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_model_text(prompt):
+    """在线程中迭代 Gemini 流式输出，逐段交给事件循环"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def produce():
         try:
-            from mining_shutdown_price import get_mining_cost_summary
-            mining_cost = get_mining_cost_summary()
-            print(f"✓ 获取到矿机关机价数据: {mining_cost}")
+            for chunk in model.generate_content(prompt, stream=True):
+                if chunk.text:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
         except Exception as e:
-            print(f"⚠️ 矿机成本数据获取失败，使用备用值: {e}")
-            mining_cost = "约$75,000 (参考值)"
-        
-        # 1.6 美股 S&P500 表现 (从 Yahoo Finance 获取真实数据)
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))
+    while True:
+        item = await queue.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            await producer
+            raise item
+        yield item
+
+class AnalysisProgress:
+    """
+    一次在途分析已产生的 SSE 事件；后加入的订阅者先补发已有事件，再等待新事件
+    """
+
+    def __init__(self):
+        self.events = []
+        self.finished = False
+        self._changed = asyncio.Condition()
+
+    async def emit(self, event, data):
+        async with self._changed:
+            self.events.append(sse_event(event, data))
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.finished = True
+            self._changed.notify_all()
+
+    async def follow(self):
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.events) > sent or self.finished)
+                pending, finished = self.events[sent:], self.finished
+            for event in pending:
+                yield event
+            sent += len(pending)
+            if finished:
+                return
+
+async def analysis_events(request: AnalysisRequest):
+    """
+    事件顺序: signals (ui_signals / fng / news) -> delta (模型输出片段, 多次) -> result (与 /api/analyze 相同结构)
+    出错时发送 error 事件；与 /api/analyze 共用缓存和在途计算，并发的相同请求只调用一次模型
+    """
+    cache_key = (request.symbol, current_bar_open('1h'))
+    cached, task = analyze_cache.join(cache_key, analysis_factory(request, cache_key), cacheable=analysis_cacheable)
+    progress = analysis_progress.get(cache_key) if task is not None else None
+    if progress is not None:
+        async for event in progress.follow():
+            yield event
+        return
+
+    if task is not None:
+        # 计算恰好结束、进度已注销: 直接等待共享结果
         try:
-            from sp500_helper import get_sp500_performance
-            sp500_performance = get_sp500_performance()
-            print(f"✓ 获取到 S&P500 真实数据: {sp500_performance}")
+            cached = await asyncio.shield(task)
         except Exception as e:
-            print(f"⚠️ S&P500 数据获取失败: {e}")
-            sp500_performance = "数据不可用"
-        
-        # 1.7 风险事件
+            yield sse_event("error", {"detail": str(getattr(e, "detail", e))})
+            return
+    yield sse_event("signals", {k: cached[k] for k in ("ui_signals", "fng", "news")})
+    yield sse_event("result", cached)
+
+@app.post("/api/analyze/stream")
+async def analyze_market_stream(request: AnalysisRequest):
+    """/api/analyze 的 SSE 版本: 先推送信号/新闻/情绪，再逐段推送模型输出"""
+    return StreamingResponse(
+        analysis_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- 实时K线接入 (Binance WebSocket) ---
+
+from kline_stream import KlineIngestor
+from chart_stream import ChartFeed
+
+# 默认关闭 (仅按请求走 REST 增量刷新)；设为 1 开启 WebSocket 接入，本地运行与导入 main 的脚本不会连 Binance
+KLINE_STREAM_ENABLED = os.getenv("KLINE_STREAM_ENABLED", "0") == "1"
+kline_ingestor = KlineIngestor()
+
+@app.on_event("startup")
+async def start_kline_ingestor():
+    if KLINE_STREAM_ENABLED:
+        kline_ingestor.start()
+
+@app.on_event("shutdown")
+async def stop_kline_ingestor():
+    await kline_ingestor.stop()
+
+# 图表实时推送: 日线K线推送 -> 各连接的增量队列
+chart_feed = ChartFeed()
+kline_ingestor.add_listener(chart_feed.on_bar)
+
+# SSE 心跳间隔 (秒)
+STREAM_KEEPALIVE = 15
+
+@app.get("/api/market-data/{symbol}/stream")
+async def stream_market_data(symbol: str):
+    """
+    图表数据推送 (SSE): snapshot (与 /api/market-data 相同的记录) -> bar (最后一根K线更新 / 新K线，含 SMA50/SMA200)
+    未接入实时K线的交易对只发送快照 (live=false)
+    """
+    formatted_symbol = format_symbol(symbol)
+    df = await fetch_data(formatted_symbol, timeframe='1d', limit=365)
+    if df.empty:
+        raise HTTPException(status_code=500, detail="数据获取失败")
+    df = indicator_engine.apply(formatted_symbol, '1d', df, daily=True)
+    live = (KLINE_STREAM_ENABLED and formatted_symbol in kline_ingestor.symbols
+            and chart_feed.timeframe in kline_ingestor.timeframes)
+
+    async def events():
+        queue = chart_feed.subscribe(formatted_symbol) if live else None
         try:
-            rss_url = "https://news.google.com/rss/search?q=cryptocurrency+crisis+OR+exchange+collapse+OR+regulation&hl=en-US&gl=US&ceid=US:en"
-            feed = feedparser.parse(rss_url)
-            news_titles = [entry.title for entry in feed.entries[:5]]
-            news_text = "\n".join([f"- {title}" for title in news_titles])
-            
-            prompt = f"""根据以下新闻，判断是否存在重大风险事件或黑天鹅：
-{news_text}
-请用简短格式回答，例如: "无明显风险" 或 "某交易所爆雷" 或 "监管收紧"
-"""
-            response = model.generate_content(prompt)
-            risk_events = response.text.strip()
-        except:
-            risk_events = "未检测到"
-        
-        # 2. 汇总宏观数据
-        macro_data = {
-            "美元指数 (DXY)": f"{dxy_value}, {dxy_trend}",
-            "Fed 利率政策": fed_policy,
-            "BTC ETF 净流入": etf_flow,
-            "长期持有者行为": holder_behavior,
-            "挖矿生产成本": mining_cost,
-            "美股表现 (S&P500)": sp500_performance,
-            "风险事件": risk_events
-        }
-        
-        # 3. 使用规则评分系统计算概率
-        scorer = ScenarioScorer()
-        probabilities = scorer.calculate_scenario_scores(macro_data)
-        most_likely = scorer.get_most_likely_scenario(probabilities)
-        
-        # 4. 用 AI 生成详细分析和操作建议
-        scenario_names = {
-            "scenario_1": "情景 1: V型反转",
-            "scenario_2": "情景 2: 高位横盘",
-            "scenario_3": "情景 3: 缓慢熊市",
-            "scenario_4": "情景 4: 深度熊市"
+            yield sse_event("snapshot", {"symbol": formatted_symbol, "data": chart_records(df), "live": live})
+            while queue is not None:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_event("bar", payload)
+        finally:
+            if queue is not None:
+                chart_feed.unsubscribe(formatted_symbol, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- 多交易对批量分析 ---
+
+from signals import last_values, trend_status, v6pp_regime
+
+MAX_BATCH_SYMBOLS = 50
+batch_cache = AsyncTTLCache(ttl=ANALYZE_CACHE_TTL, maxsize=32)
+
+class BatchAnalysisRequest(BaseModel):
+    symbols: list[str]
+
+async def fetch_symbol_frames(symbol):
+    """单个交易对的 1d/1h/4h/1w K线 + 指标；1h 数据缺失视为失败"""
+    df_daily, df_hourly, df_4h, df_w = await asyncio.gather(
+        gather_with_fallback(fetch_data(symbol, '1d', limit=500), CANDLE_TIMEOUT, pd.DataFrame(), f"{symbol} 1d K线"),
+        gather_with_fallback(fetch_data(symbol, '1h', limit=100), CANDLE_TIMEOUT, pd.DataFrame(), f"{symbol} 1h K线"),
+        gather_with_fallback(fetch_data(symbol, '4h', limit=100), CANDLE_TIMEOUT, pd.DataFrame(), f"{symbol} 4h K线"),
+        gather_with_fallback(fetch_data(symbol, '1w', limit=52), CANDLE_TIMEOUT, pd.DataFrame(), f"{symbol} 1w K线"),
+    )
+    if df_hourly.empty:
+        raise ValueError("数据获取失败")
+    daily_tf = '1d'
+    if df_daily.empty: df_daily, daily_tf = df_hourly, '1h' # 兜底
+    return {
+        '1d': indicator_engine.apply(symbol, daily_tf, df_daily, daily=True),
+        '1h': indicator_engine.apply(symbol, '1h', df_hourly),
+        '4h': indicator_engine.apply(symbol, '4h', df_4h) if not df_4h.empty else df_4h,
+        '1w': indicator_engine.apply(symbol, '1w', df_w) if not df_w.empty else df_w,
+    }
+
+def compute_batch_signals(symbols, frames):
+    """所有交易对的 V6++ 牛熊 / 做空 / 多周期红绿灯，一次向量化计算"""
+    daily = last_values([frames[s]['1d'] for s in symbols], ['close', 'SMA200', 'SMA200_Slope', 'SMA200_Dev'])
+    is_bull, can_short = v6pp_regime(daily['close'], daily['SMA200'], daily['SMA200_Slope'], daily['SMA200_Dev'])
+
+    statuses = {}
+    micro_cols = ['ADX', 'close', 'EMA20', 'MACD_diff', 'RSI']
+    for tf in ['1w', '4h', '1h']:
+        v = last_values([frames[s][tf] for s in symbols], micro_cols)
+        statuses[tf] = trend_status(v['ADX'], v['close'], v['EMA20'], v['MACD_diff'], v['RSI'])
+        statuses[tf + '_rsi'] = v['RSI']
+
+    results = {}
+    for i, symbol in enumerate(symbols):
+        results[symbol] = {
+            "ui_signals": {
+                "1w": str(statuses['1w'][i]),
+                "1d": "bullish" if is_bull[i] else "bearish",
+                "4h": str(statuses['4h'][i]),
+                "1h": str(statuses['1h'][i]),
+            },
+            "price": float(daily['close'][i]),
+            "sma200": float(daily['SMA200'][i]),
+            "slope": float(daily['SMA200_Slope'][i]),
+            "dev": float(daily['SMA200_Dev'][i]),
+            "rsi_1h": float(statuses['1h_rsi'][i]),
+            "v6pp_info": {
+                "is_bull_v6": bool(is_bull[i]),
+                "can_short": bool(can_short[i]),
+                "strategy_version": "V6++",
+            },
         }
-        
-        # 构建概率摘要
-        prob_summary = "\n".join([
-            f"- {scenario_names[k]}: {v['probability']}%"
-            for k, v in probabilities.items()
-        ])
-        
-        analysis_prompt = f"""
+    return results
+
+def rank_symbols_with_ai(results, fng):
+    """一次模型调用对全部交易对排序，返回 {symbol: {...}}，失败返回 None"""
+    lines = "\n".join(
+        f"- {symbol}: 现价 {r['price']:.4g}, {'牛市' if r['v6pp_info']['is_bull_v6'] else '熊市'}, "
+        f"{'可做空' if r['v6pp_info']['can_short'] else '不可做空'}, 乖离率 {r['dev']:.2f}%, 斜率 {r['slope']:.4f}, "
+        f"1H RSI {r['rsi_1h']:.1f}, 周线/4H/1H: {r['ui_signals']['1w']}/{r['ui_signals']['4h']}/{r['ui_signals']['1h']}"
+        for symbol, r in results.items()
+    )
+    prompt = f"""
+    你是一位采用**V6++策略**的趋势交易员 (牛市: 价格>SMA200 或 斜率>0；熊市中乖离率<-10% 且 斜率<-0.5% 可做空)。
+    恐慌指数: {fng['value']}
+
+    【观察列表】
+{lines}
+
+    【任务】
+    按未来 **14-30天** 的 V6++ 机会从好到差给以上全部交易对排序。
+    请输出纯 JSON: {{"ranking": [{{"symbol": "交易对", "rank": 1, "direction": "买入" | "持有" | "卖出" | "观望" | "做空", "score": "1-10", "reason": "一句话理由"}}]}}
+    """
+    try:
+        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        cleaned_text = re.sub(r'```json\s*', '', response.text).replace('```', '').strip()
+        ranking = json.loads(cleaned_text)["ranking"]
+        return {item["symbol"]: item for item in ranking if item.get("symbol") in results}
+    except Exception as e:
+        print(f"⚠️ 批量排序失败: {e}")
+        return None
+
+def _rank_value(item):
+    try:
+        return float(item["rank"])
+    except (TypeError, KeyError, ValueError):
+        return float("inf")
+
+async def run_batch_analysis(symbols):
+    frames_list, fng = await asyncio.gather(
+        asyncio.gather(*[fetch_symbol_frames(symbol) for symbol in symbols], return_exceptions=True),
+        gather_with_fallback(asyncio.to_thread(get_fear_and_greed), FNG_TIMEOUT, dict(DEFAULT_FNG), "恐慌指数"),
+    )
+    frames, failures = {}, {}
+    for symbol, result in zip(symbols, frames_list):
+        if isinstance(result, Exception):
+            failures[symbol] = str(result) or type(result).__name__
+        else:
+            frames[symbol] = result
+
+    ok_symbols = list(frames)
+    results = compute_batch_signals(ok_symbols, frames) if ok_symbols else {}
+
+    ranking = await asyncio.to_thread(rank_symbols_with_ai, results, fng) if results else None
+    for symbol, r in results.items():
+        r["analysis"] = ranking.get(symbol) if ranking else None
+    order = sorted(ok_symbols, key=lambda s: _rank_value(ranking.get(s))) if ranking else ok_symbols
+
+    return {
+        "results": results,
+        "failures": failures,
+        "ranking": order,
+        "fng": fng,
+        "ai_ranked": ranking is not None,
+    }
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """批量分析: 并发获取全部交易对，一次向量化计算信号，一次 AI 排序"""
+    # 与单交易对接口同一套规范化 (btc-usdt / BTCUSDT -> BTC/USDT)，再去重
+    symbols = list(dict.fromkeys(format_symbol(s.strip()) for s in request.symbols if s.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="symbols 不能为空")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"最多 {MAX_BATCH_SYMBOLS} 个交易对")
+    cache_key = (tuple(sorted(symbols)), current_bar_open('1h'))
+    return await batch_cache.get_or_compute(
+        cache_key,
+        lambda: run_batch_analysis(symbols),
+        cacheable=lambda result: result["ai_ranked"] and not result["failures"]
+    )
+
+# --- 全市场牛熊筛选 ---
+
+from screener import RegimeScreener
+
+# 后台全市场刷新默认关闭 (本地开发 / 导入 main 的自检脚本不会拉取全部 USDT 交易对)，生产环境设为 1 开启
+SCREENER_ENABLED = os.getenv("SCREENER_ENABLED", "0") == "1"
+screener = RegimeScreener()
+
+@app.on_event("startup")
+async def start_screener():
+    if SCREENER_ENABLED:
+        screener.start()
+
+@app.on_event("shutdown")
+async def stop_screener():
+    await screener.stop()
+
+@app.get("/api/screener", response_class=ORJSONResponse)
+async def get_screener(sort: str = "dev", order: str = "desc", regime: str | None = None,
+                       can_short: bool | None = None, limit: int | None = None):
+    """全部 USDT 交易对的 V6++ 牛熊 / 做空 / 多周期红绿灯（后台定时刷新，接口只排序过滤）"""
+    try:
+        return ORJSONResponse(screener.query(sort, order, regime, can_short, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# --- BTC ETF 资金流 ---
+
+from etf_flow_store import get_etf_store
+
+@app.get("/api/etf-flows", response_class=ORJSONResponse)
+async def get_etf_flows(start: str | None = None, end: str | None = None, funds: str | None = None,
+                        window: int = 5, zscore_window: int = 20):
+    """
+    各基金每日 / 区间累计 / N 日滚动净流向 + Total z-score（百万美元，列式）
+    funds: 逗号分隔的基金代码 (默认全部 + Total)
+    """
+    store = get_etf_store()
+    columns = [f.strip().upper() for f in funds.split(",") if f.strip()] if funds else None
+    if columns:
+        columns = ['Total' if c == 'TOTAL' else c for c in columns]
+    try:
+        result = store.query(start, end, columns, window, zscore_window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse({**result, "latest": store.aggregates(), "features": store.features(zscore_window)})
+
+# --- 🔥 情景分析 API (新增) ---
+
+from scenario_scoring import SCENARIO_NAMES, ScenarioScorer, extract_features
+from macro_refresher import MacroRefresher, default_sources
+from candle_store import get_store
+from scenario_history import ScenarioHistory, make_recorder
+from monte_carlo import CALIBRATION_DAYS, DEFAULT_DAYS, DEFAULT_PATHS, calibrate, simulate
+
+SCENARIO_AI_FALLBACK = {
+    "价格目标预期": "数据不足",
+    "操作建议": {
+        "仓位管理": "建议观望",
+        "止损位": "待定",
+        "止盈位": "待定"
+    },
+    "综合分析": "AI分析生成失败，请参考概率数据",
+    "风险提示": "数据不完整，谨慎操作"
+}
+
+# 宏观数据由后台按各自周期刷新，接口只读取最新快照
+macro_refresher = MacroRefresher(default_sources(model))
+
+# 同一快照版本、同一组情景概率与模拟起始价的 AI 分析只生成一次
+scenario_ai_cache = AsyncTTLCache(ttl=24 * 3600, maxsize=16)
+
+# 缓存键中的模拟起始价按 3 位有效数字取整（约 1% 以内的价格波动复用同一段分析）
+SCENARIO_AI_PRICE_DIGITS = 3
+
+def scenario_ai_key(snapshot, probabilities, simulation):
+    """
+    AI 分析的缓存键: 提示词里的情景概率与价格带随 BTC 价格 / ETF 特征变化，快照版本不变时也要重新生成
+    """
+    price = simulation["start_price"] if simulation else None
+    if price:
+        price = float(f"{price:.{SCENARIO_AI_PRICE_DIGITS}g}")
+    return (snapshot["version"], tuple(v['probability'] for v in probabilities.values()), price)
+
+@app.on_event("startup")
+async def start_macro_refresher():
+    macro_refresher.start()
+
+@app.on_event("shutdown")
+async def stop_macro_refresher():
+    await macro_refresher.stop()
+
+def latest_btc_price():
+    """本地日线缓存中 BTC 最新收盘价（无缓存返回 None）"""
+    bars = get_store().load('BTC/USDT', '1d', 1)
+    return bars[-1][4] if bars else None
+
+def scenario_features(macro_data):
+    return extract_features(macro_data, etf=get_etf_store().features(), btc_price=latest_btc_price())
+
+# 每个新版本快照的特征与情景概率追加写入历史 (python3 scenario_history.py 重放)
+# 快照回调在事件循环上执行，日线缓存读取与 SQLite 写入交给单独的写线程
+scenario_history = ScenarioHistory()
+scenario_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scenario-history")
+macro_refresher.add_listener(make_recorder(scenario_history, scenario_features, executor=scenario_writer))
+
+@app.on_event("shutdown")
+async def stop_scenario_writer():
+    await asyncio.to_thread(scenario_writer.shutdown, wait=True)
+
+async def run_price_simulation(probabilities, days=DEFAULT_DAYS, paths=DEFAULT_PATHS, seed=42):
+    """以情景概率为混合权重的 BTC 价格路径模拟（波动率 / 漂移由日线缓存校准）"""
+    df = await get_candles('BTC/USDT', '1d', CALIBRATION_DAYS + 1)
+    weights = {k: v['probability'] for k, v in probabilities.items()}
+    return await asyncio.to_thread(simulate, float(df['close'].iloc[-1]), *calibrate(df['close'].to_numpy()),
+                                   weights, days, paths, seed)
+
+def simulation_summary(simulation):
+    """模拟结果 -> 提示词中的分位数区间"""
+    days = simulation["days"][-1]
+    mix = simulation["mixture"]["bands"]
+    lines = [f"- 混合分布 {days} 天后: 50% 区间 ${mix['p25'][-1]:,.0f} - ${mix['p75'][-1]:,.0f}，"
+             f"90% 区间 ${mix['p5'][-1]:,.0f} - ${mix['p95'][-1]:,.0f}"]
+    for k, v in simulation["scenarios"].items():
+        lines.append(f"- {SCENARIO_NAMES[k]}: 中位数 ${v['bands']['p50'][-1]:,.0f}，"
+                     f"90% 区间 ${v['bands']['p5'][-1]:,.0f} - ${v['bands']['p95'][-1]:,.0f}")
+    return "\n".join(lines)
+
+def generate_scenario_ai_analysis(macro_data, probabilities, most_likely, simulation=None):
+    """用 AI 生成详细分析和操作建议（失败返回 SCENARIO_AI_FALLBACK）"""
+    # 构建概率摘要
+    prob_summary = "\n".join([
+        f"- {SCENARIO_NAMES[k]}: {v['probability']}%"
+        for k, v in probabilities.items()
+    ])
+    simulation_text = f"""
+【蒙特卡洛价格模拟 (起始价 ${simulation['start_price']:,.0f})】
+{simulation_summary(simulation)}
+""" if simulation else ""
+    
+    analysis_prompt = f"""
 你是一位专业的加密货币宏观分析师。
 
 【当前宏观数据】
@@ -498,8 +841,8 @@ async def scenario_analysis(request: AnalysisRequest):
 
 【最可能情景】
 {most_likely['name']} ({most_likely['probability']}%)
-
-请基于以上数据和概率分析，生成详细的操作建议。
+{simulation_text}
+请基于以上数据和概率分析，生成详细的操作建议。价格目标请参考模拟的分位数区间。
 
 请以 JSON 格式输出：
 {{
@@ -513,28 +856,50 @@ async def scenario_analysis(request: AnalysisRequest):
   "风险提示": "针对当前情景的风险警告"
 }}
 """
+    
+    try:
+        ai_response = model.generate_content(analysis_prompt)
+        cleaned_text = re.sub(r'```json\s*', '', ai_response.text).replace('```', '').strip()
+        return json.loads(cleaned_text)
+    except:
+        return SCENARIO_AI_FALLBACK
+
+@app.post("/api/scenario-analysis")
+async def scenario_analysis(request: AnalysisRequest):
+    """
+    宏观情景分析 - 读取后台刷新的宏观数据快照并计算四大情景概率
+    """
+    try:
+        # 1. 宏观数据快照（冷启动时等待首轮刷新）
+        snapshot = await macro_refresher.wait_ready()
+        macro_data = snapshot["macro_data"]
         
+        # 2. 数值特征 (ETF 流向取自本地仓库，BTC 价格取自本地日线缓存) + 规则评分系统计算概率
+        features = await asyncio.to_thread(scenario_features, macro_data)
+        scorer = ScenarioScorer()
+        probabilities = scorer.calculate_scenario_scores(macro_data, features)
+        most_likely = scorer.get_most_likely_scenario(probabilities)
+
+        # 3. 蒙特卡洛价格带（日线不可用时跳过）
         try:
-            ai_response = model.generate_content(analysis_prompt)
-            cleaned_text = re.sub(r'```json\s*', '', ai_response.text).replace('```', '').strip()
-            ai_analysis = json.loads(cleaned_text)
-        except:
-            ai_analysis = {
-                "价格目标预期": "数据不足",
-                "操作建议": {
-                    "仓位管理": "建议观望",
-                    "止损位": "待定",
-                    "止盈位": "待定"
-                },
-                "综合分析": "AI分析生成失败，请参考概率数据",
-                "风险提示": "数据不完整，谨慎操作"
-            }
+            simulation = await run_price_simulation(probabilities)
+        except Exception as e:
+            print(f"⚠️ 价格模拟失败: {e!r}")
+            simulation = None
+        
+        # 4. 用 AI 生成详细分析和操作建议（按快照版本 + 概率 + 起始价缓存）
+        ai_analysis = await scenario_ai_cache.get_or_compute(
+            scenario_ai_key(snapshot, probabilities, simulation),
+            lambda: asyncio.to_thread(generate_scenario_ai_analysis, macro_data, probabilities, most_likely,
+                                      simulation),
+            cacheable=lambda result: result is not SCENARIO_AI_FALLBACK
+        )
         
         # 5. 组装返回结果
         return {
             "macro_data": macro_data,
             "scenario_probabilities": {
-                scenario_names[k]: {
+                SCENARIO_NAMES[k]: {
                     "probability": f"{v['probability']}%",
                     "raw_score": f"{v['raw_score']}/100",
                     "matched_factors": v['details']['matched'],
@@ -546,12 +911,31 @@ async def scenario_analysis(request: AnalysisRequest):
                 "name": most_likely['name'],
                 "probability": f"{most_likely['probability']}%"
             },
+            "scenario_features": {k: (None if pd.isna(v) else v) for k, v in features.items()},
+            "price_simulation": simulation,
             "ai_analysis": ai_analysis,
-            "calculation_method": "rule_based_scoring_plus_ai"
+            "calculation_method": "rule_based_scoring_plus_ai",
+            "snapshot_version": snapshot["version"],
+            "data_age_seconds": macro_refresher.data_age()
         }
         
     except Exception as e:
         print(f"Scenario Analysis Error: {e}")
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/scenario-simulation", response_class=ORJSONResponse)
+async def scenario_simulation(days: int = DEFAULT_DAYS, paths: int = DEFAULT_PATHS, seed: int = 42):
+    """
+    四大情景蒙特卡洛价格带（当前快照的情景概率为混合权重，相同 seed 结果可复现）
+    """
+    snapshot = await macro_refresher.wait_ready()
+    macro_data = snapshot["macro_data"]
+    features = await asyncio.to_thread(scenario_features, macro_data)
+    probabilities = ScenarioScorer().calculate_scenario_scores(macro_data, features)
+    try:
+        simulation = await run_price_simulation(probabilities, days, paths, seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse({**simulation, "snapshot_version": snapshot["version"]})
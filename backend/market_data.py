@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+行情数据获取 - 异步 OHLCV 接口
+基于 ccxt.async_support，全进程共享一个 Binance 会话（aiohttp 连接池），
+不会在 async 接口里阻塞 uvicorn 事件循环
+"""
+
+import asyncio
+import time
+
+import ccxt.async_support as ccxt_async
+import pandas as pd
+
+# 同时在途的交易所请求上限（ccxt 的 enableRateLimit 负责请求间隔）
+MAX_CONCURRENT_REQUESTS = 10
+
+_exchange = None
+_semaphore = None
+
+
+def get_exchange():
+    """
+    获取共享的异步交易所实例（首次调用时创建）
+    """
+    global _exchange
+    if _exchange is None:
+        _exchange = ccxt_async.binance({'enableRateLimit': True})
+    return _exchange
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return _semaphore
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    周期字符串 -> 毫秒, 例如 '1h' -> 3600000
+    """
+    return ccxt_async.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def current_bar_open(timeframe: str) -> int:
+    """
+    当前（未收盘）K线的开盘时间戳 (ms)
+    """
+    tf_ms = timeframe_to_ms(timeframe)
+    return int(time.time() * 1000) // tf_ms * tf_ms
+
+
+def bars_to_dataframe(bars):
+    """
+    ccxt OHLCV 列表 -> DataFrame (time 转为 datetime)
+    """
+    df = pd.DataFrame(bars, columns=['time', 'open', 'high', 'low', 'close', 'volume'])
+    df['time'] = pd.to_datetime(df['time'], unit='ms')
+    return df
+
+
+async def fetch_ohlcv(symbol: str, timeframe='1h', limit=500, since=None):
+    """
+    异步获取原始 OHLCV 列表 [[ts_ms, o, h, l, c, v], ...]
+    """
+    async with _get_semaphore():
+        return await get_exchange().fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+
+
+async def fetch_ohlcv_df(symbol: str, timeframe='1h', limit=500):
+    """
+    异步获取 OHLCV 并转为 DataFrame
+    """
+    bars = await fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+    return bars_to_dataframe(bars)
+
+
+async def close_exchange():
+    """
+    关闭共享会话（应用退出时调用）
+    """
+    global _exchange
+    if _exchange is not None:
+        await _exchange.close()
+        _exchange = None
+
+
+if __name__ == "__main__":
+    # 测试: 并发获取多个周期
+    async def _main():
+        try:
+            results = await asyncio.gather(*[
+                fetch_ohlcv_df('BTC/USDT', tf, limit=5) for tf in ['1h', '4h', '1d', '1w']
+            ])
+            for tf, df in zip(['1h', '4h', '1d', '1w'], results):
+                print(f"{tf}: {len(df)} 根K线, 最新收盘 {df.iloc[-1]['close']}")
+        finally:
+            await close_exchange()
+
+    asyncio.run(_main())
@@ -87,10 +87,10 @@ def get_mining_shutdown_price_selenium():
         }
 
 
-def get_mining_cost_summary():
+def get_mining_cost_summary(strict=False):
     """
     生成矿机成本摘要 - 用于情景分析
-    返回中文简短描述
+    返回中文简短描述；strict 时失败抛异常而不是返回参考值
     """
     try:
         # 优先使用简化版本（快速稳定）
@@ -105,10 +105,14 @@ def get_mining_cost_summary():
             print(f"✓ 获取到矿机关机价数据: {summary}")
             return summary
         else:
+            if strict:
+                raise RuntimeError(data.get('error', '矿机关机价数据不可用'))
             return "约$75,000 (参考值)"
             
     except Exception as e:
         print(f"❌ 矿机数据获取失败: {e}")
+        if strict:
+            raise
         return "约$75,000 (参考值)"
 
 
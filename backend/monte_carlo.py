@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+情景蒙特卡洛模拟 - 四大情景下的 BTC 价格路径
+波动率 / 漂移由本地日线缓存校准，每个情景在此基础上调整漂移与波动，
+ScenarioScorer 概率作为混合权重，返回各情景及混合分布的分位数价格带
+"""
+
+import time
+
+import numpy as np
+
+from scenario_scoring import SCENARIOS
+
+# 校准使用的日线数
+CALIBRATION_DAYS = 365
+
+# 每个情景: (漂移调整，单位为日波动率 σ 的倍数, 波动率倍数)
+SCENARIO_REGIMES = {
+    "scenario_1": (0.10, 1.1),   # V型反转: 强漂移向上
+    "scenario_2": (0.0, 0.7),    # 高位横盘: 无漂移、低波动
+    "scenario_3": (-0.06, 1.0),  # 缓慢熊市: 温和向下
+    "scenario_4": (-0.15, 1.5),  # 深度熊市: 强漂移向下、高波动
+}
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+DEFAULT_DAYS = 30
+DEFAULT_PATHS = 20_000
+MAX_DAYS = 90
+MAX_PATHS = 100_000
+
+
+def calibrate(closes, days=CALIBRATION_DAYS):
+    """日对数收益的均值与标准差 (最近 days 根日线)"""
+    closes = np.asarray(closes, dtype=np.float64)[-(days + 1):]
+    if len(closes) < 31:
+        raise ValueError("日线数据不足，无法校准波动率")
+    log_returns = np.diff(np.log(closes))
+    return float(log_returns.mean()), float(log_returns.std(ddof=1))
+
+
+def _bands(prices):
+    """
+    prices: (days + 1, paths) -> {"p5": [...], ...}
+    逐日排序后按下标线性插值（与 np.percentile 默认口径一致，float32 排序比 partition 快得多）
+    """
+    ordered = np.sort(prices, axis=1)
+    n = ordered.shape[1]
+    bands = {}
+    for p in PERCENTILES:
+        pos = p / 100 * (n - 1)
+        lo = int(pos)
+        hi = min(lo + 1, n - 1)
+        values = ordered[:, lo] + (ordered[:, hi] - ordered[:, lo]) * (pos - lo)
+        bands[f"p{p}"] = np.round(values.astype(np.float64), 2).tolist()
+    return bands
+
+
+def simulate(start_price, mu, sigma, weights, days=DEFAULT_DAYS, paths=DEFAULT_PATHS, seed=42):
+    """
+    weights: {scenario_N: 概率 (% 或 0-1)}
+    每个情景模拟 paths 条几何布朗运动路径；混合分布按权重从各情景中取相应比例的路径
+    返回 {"days", "start_price", "scenarios": {...}, "mixture": {...}}，价格带含第 0 天（当前价）
+    """
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days 须在 1-{MAX_DAYS} 之间")
+    if not 100 <= paths <= MAX_PATHS:
+        raise ValueError(f"paths 须在 100-{MAX_PATHS} 之间")
+    w = np.array([max(float(weights.get(s, 0.0)), 0.0) for s in SCENARIOS])
+    w = w / w.sum() if w.sum() > 0 else np.full(len(SCENARIOS), 1 / len(SCENARIOS))
+
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(SCENARIOS))]
+    log_start = np.log(start_price)
+    scenario_paths = {}
+    result = {}
+    for i, scenario in enumerate(SCENARIOS):
+        drift_shift, vol_mult = SCENARIO_REGIMES[scenario]
+        vol = sigma * vol_mult
+        drift = mu + drift_shift * sigma - 0.5 * (vol ** 2 - sigma ** 2)
+        # (天, 路径) 布局: 逐日分位数在连续内存上计算
+        shocks = rngs[i].standard_normal((days, paths), dtype=np.float32)
+        log_paths = np.empty((days + 1, paths), dtype=np.float32)
+        log_paths[0] = log_start
+        np.cumsum(shocks * np.float32(vol) + np.float32(drift), axis=0, out=log_paths[1:])
+        log_paths[1:] += np.float32(log_start)
+        prices = np.exp(log_paths)
+        scenario_paths[scenario] = prices
+        final = prices[-1]
+        result[scenario] = {
+            "weight": round(float(w[i]), 4),
+            "bands": _bands(prices),
+            "prob_up": round(float((final > start_price).mean()), 4),
+        }
+
+    # 混合分布: 按权重分配 paths 条路径，各情景取前 N 条（情景内路径独立同分布）
+    counts = np.floor(w * paths).astype(int)
+    counts[np.argmax(w)] += paths - counts.sum()
+    mixture = np.concatenate([scenario_paths[s][:, :c] for s, c in zip(SCENARIOS, counts) if c > 0], axis=1)
+    return {
+        "days": list(range(days + 1)),
+        "start_price": round(float(start_price), 2),
+        "calibration": {"mu": round(mu, 6), "sigma": round(sigma, 6)},
+        "paths_per_scenario": paths,
+        "seed": seed,
+        "scenarios": result,
+        "mixture": {
+            "bands": _bands(mixture),
+            "prob_up": round(float((mixture[-1] > start_price).mean()), 4),
+        },
+    }
+
+
+def simulate_from_bars(bars, weights, days=DEFAULT_DAYS, paths=DEFAULT_PATHS, seed=42):
+    """bars: 日线 [[time_ms, o, h, l, c, v], ...]（升序），以最后收盘价为起点"""
+    closes = [b[4] for b in bars]
+    mu, sigma = calibrate(closes)
+    return simulate(closes[-1], mu, sigma, weights, days, paths, seed)
+
+
+if __name__ == "__main__":
+    # 测试: 随机游走日线校准，30 天 x 4 情景 x 20000 条路径的耗时与可复现性
+    from indicators import make_sample_ohlcv
+
+    df = make_sample_ohlcv(CALIBRATION_DAYS + 1, freq='1D')
+    bars = df[['time', 'open', 'high', 'low', 'close', 'volume']].values.tolist()
+    weights = {"scenario_1": 10.5, "scenario_2": 48.5, "scenario_3": 35.0, "scenario_4": 6.0}
+
+    simulate_from_bars(bars, weights)  # 预热
+    start = time.perf_counter()
+    result = simulate_from_bars(bars, weights, days=30, paths=20_000, seed=7)
+    elapsed = time.perf_counter() - start
+    again = simulate_from_bars(bars, weights, days=30, paths=20_000, seed=7)
+
+    print(f"起始价 {result['start_price']}, 校准 {result['calibration']}")
+    for scenario, r in result["scenarios"].items():
+        print(f"  {scenario} (权重 {r['weight']}): 30天 p5-p95 {r['bands']['p5'][-1]:,.0f} - "
+              f"{r['bands']['p95'][-1]:,.0f}, 中位数 {r['bands']['p50'][-1]:,.0f}, 上涨概率 {r['prob_up']:.1%}")
+    mix = result["mixture"]
+    print(f"  混合: p5-p95 {mix['bands']['p5'][-1]:,.0f} - {mix['bands']['p95'][-1]:,.0f}, "
+          f"上涨概率 {mix['prob_up']:.1%}")
+    print(f"模拟耗时 {elapsed * 1000:.1f} ms, 相同种子结果一致: {result == again}")
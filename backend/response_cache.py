@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+接口响应缓存 - TTL + LRU 淘汰 + 单飞合并 (single-flight)
+同一个 key 的并发请求只触发一次计算，其余请求等待同一个结果
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class AsyncTTLCache:
+    """
+    异步 TTL 缓存
+    - ttl: 结果有效期（秒）
+    - maxsize: 最多缓存条目数，超出按最近最少使用淘汰
+    """
+
+    def __init__(self, ttl=60, maxsize=128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_compute(self, key, factory, cacheable=None):
+        """
+        命中缓存直接返回；已有相同计算在途则等待它；否则调用 factory() 计算
+        - cacheable: 可选判断函数，返回 False 的结果不写入缓存（例如解析失败的响应）
+        """
+        value, task = self.join(key, factory, cacheable)
+        if task is None:
+            return value
+        # shield: 某个客户端断开不会取消其他请求共享的计算
+        return await asyncio.shield(task)
+
+    def join(self, key, factory, cacheable=None):
+        """
+        get_or_compute 的同步部分: 返回 (缓存值, None) 或 (None, 在途 / 新建的计算 task)
+        供等待期间还要读取计算进度的调用方使用（如 SSE 推送）
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, None
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+
+            def _done(t, key=key):
+                self._inflight.pop(key, None)
+                if not t.cancelled() and t.exception() is None:
+                    result = t.result()
+                    if cacheable is None or cacheable(result):
+                        self.set(key, result)
+
+            task.add_done_callback(_done)
+        else:
+            self.hits += 1
+        return None, task
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+            "maxsize": self.maxsize,
+        }
+
+
+if __name__ == "__main__":
+    # 测试: 10 个并发相同请求只计算一次
+    async def _main():
+        cache = AsyncTTLCache(ttl=5, maxsize=2)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"value": len(calls)}
+
+        results = await asyncio.gather(*[cache.get_or_compute("BTC/USDT", compute) for _ in range(10)])
+        print(f"并发 10 次, 实际计算 {len(calls)} 次, 结果 {results[0]}")
+        await cache.get_or_compute("BTC/USDT", compute)
+        print(f"再次请求命中缓存, 计算次数仍为 {len(calls)}; 统计: {cache.stats()}")
+
+    asyncio.run(_main())
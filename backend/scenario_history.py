@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+情景概率历史 - 每个宏观快照的数值特征与情景概率追加写入 SQLite，
+replay 用修改后的规则表 / 权重一次性重评全部历史，并与之后的 BTC 实际收益对齐，
+用于检验 ScenarioScorer.weights 和规则是否有预测力
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from scenario_scoring import FEATURES, SCENARIOS, ScenarioScorer, feature_matrix, load_rule_table
+
+SCENARIO_DB_PATH = os.getenv(
+    "SCENARIO_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "scenarios.db")
+)
+
+# 实际收益的观察窗口（天）
+DEFAULT_HORIZONS = (7, 30)
+
+DAY_MS = 24 * 3600 * 1000
+
+
+class ScenarioHistory:
+    """
+    只追加的快照表: (created_at, version, macro_data, features, probabilities)
+    """
+
+    def __init__(self, path=SCENARIO_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scenario_snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    version INTEGER,
+                    macro_data TEXT NOT NULL,
+                    features TEXT NOT NULL,
+                    probabilities TEXT NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def append(self, created_at, version, macro_data, features, probabilities):
+        """
+        features: {特征: float}（NaN 存为 null），probabilities: {scenario_N: 概率 %}
+        """
+        row = (
+            created_at, version,
+            json.dumps(macro_data, ensure_ascii=False),
+            json.dumps({k: (None if np.isnan(v) else v) for k, v in features.items()}),
+            json.dumps(probabilities),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO scenario_snapshots (created_at, version, macro_data, features, probabilities) "
+                "VALUES (?, ?, ?, ?, ?)", row
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scenario_snapshots").fetchone()[0]
+
+    def load(self, since=None):
+        """
+        -> (created_at 数组 (秒), 特征矩阵 (N, len(FEATURES)), 记录时的概率 (N, 4))
+        """
+        sql = "SELECT created_at, features, probabilities FROM scenario_snapshots"
+        params = []
+        if since is not None:
+            sql += " WHERE created_at >= ?"
+            params.append(since)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY created_at, id", params).fetchall()
+        created_at = np.array([r[0] for r in rows], dtype=np.float64)
+        X = feature_matrix([{k: (np.nan if v is None else v) for k, v in json.loads(r[1]).items()} for r in rows])
+        recorded = np.array([[json.loads(r[2]).get(s, np.nan) for s in SCENARIOS] for r in rows],
+                            dtype=np.float64).reshape(-1, len(SCENARIOS))
+        return created_at, X.reshape(-1, len(FEATURES)), recorded
+
+
+def forward_returns(created_at, bars, horizons=DEFAULT_HORIZONS):
+    """
+    快照时刻之后 h 天的 BTC 收益 (%)
+    bars: 日线 [[time_ms, o, h, l, c, v], ...]；基准价为快照时刻最后一根已收盘日线，数据不足为 NaN
+    """
+    bars = np.asarray(bars, dtype=np.float64).reshape(-1, 6)
+    t = np.asarray(created_at, dtype=np.float64) * 1000
+    out = {f"ret_{h}d": np.full(len(t), np.nan) for h in horizons}
+    if not len(bars):
+        return out
+    close_time = bars[:, 0] + DAY_MS
+    close = bars[:, 4]
+    base_idx = np.searchsorted(close_time, t, side="right") - 1
+    for h in horizons:
+        end = t + h * DAY_MS
+        target_idx = np.searchsorted(close_time, end, side="right") - 1
+        valid = (base_idx >= 0) & (end <= close_time[-1])
+        out[f"ret_{h}d"][valid] = (close[target_idx[valid]] / close[base_idx[valid]] - 1) * 100
+    return out
+
+
+def replay(history, bars, scorer=None, horizons=DEFAULT_HORIZONS, since=None):
+    """
+    用 scorer（修改后的规则 / 权重）一次性重评全部历史快照，并对齐实际收益
+    返回 (明细表 DataFrame, 汇总 dict)
+    """
+    scorer = scorer or ScenarioScorer()
+    created_at, X, recorded = history.load(since)
+    probs = scorer.probability_matrix(X) if len(X) else np.empty((0, len(SCENARIOS)))
+    returns = forward_returns(created_at, bars, horizons)
+
+    table = pd.DataFrame({"created_at": pd.to_datetime(created_at, unit="s")})
+    for i, scenario in enumerate(SCENARIOS):
+        table[scenario] = probs[:, i]
+        table[f"{scenario}_recorded"] = recorded[:, i]
+    table["most_likely"] = [SCENARIOS[i] for i in probs.argmax(axis=1)] if len(probs) else []
+    table["changed"] = table["most_likely"] != [SCENARIOS[i] for i in np.nan_to_num(recorded, nan=-1).argmax(axis=1)]
+    for name, ret in returns.items():
+        table[name] = ret
+    return table, summarize(table, horizons)
+
+
+def summarize(table, horizons=DEFAULT_HORIZONS):
+    """
+    - by_scenario: 按最可能情景分组的平均收益 / 上涨比例 / 样本数
+    - correlation: 各情景概率与之后收益的相关系数
+    """
+    summary = {"snapshots": len(table), "changed": int(table["changed"].sum()) if len(table) else 0,
+               "by_scenario": {}, "correlation": {}}
+    for h in horizons:
+        col = f"ret_{h}d"
+        valid = table.dropna(subset=[col])
+        grouped = valid.groupby("most_likely")[col]
+        summary["by_scenario"][col] = {
+            s: {"mean": round(g.mean(), 2), "up_ratio": round((g > 0).mean(), 3), "count": int(g.count())}
+            for s, g in grouped
+        }
+        summary["correlation"][col] = {
+            s: (round(float(np.corrcoef(valid[s], valid[col])[0, 1]), 3)
+                if len(valid) > 2 and valid[s].std() > 0 and valid[col].std() > 0 else None)
+            for s in SCENARIOS
+        }
+    return summary
+
+
+def make_recorder(history, features_fn, scorer=None, executor=None):
+    """
+    生成 MacroRefresher 快照回调: 每个新版本快照计算特征与概率并追加写入
+    features_fn(macro_data) -> {特征: float}
+    executor: MacroRefresher 在事件循环上同步回调，给定时特征读取与 SQLite 写入都提交到该线程池，
+    回调立即返回（单线程池保证按版本顺序写入）
+    """
+    scorer = scorer or ScenarioScorer()
+
+    def record(snapshot):
+        macro_data = snapshot["macro_data"]
+        features = features_fn(macro_data)
+        probabilities = scorer.calculate_scenario_scores(macro_data, features)
+        history.append(snapshot["created_at"], snapshot["version"], macro_data, features,
+                       {k: v["probability"] for k, v in probabilities.items()})
+
+    if executor is None:
+        return record
+
+    def report(future):
+        if future.exception() is not None:
+            print(f"⚠️ 情景历史写入失败: {future.exception()!r}")
+
+    def submit(snapshot):
+        executor.submit(record, snapshot).add_done_callback(report)
+
+    return submit
+
+
+def _parse_weights(text):
+    # "fed_policy=30,etf_flow=10" -> {"fed_policy": 30.0, "etf_flow": 10.0}
+    return {k.strip(): float(v) for k, v in (item.split("=") for item in text.split(",") if item.strip())}
+
+
+def _sample_history(n, seed=0):
+    # 离线样本: 随机游走日线 + 每天一个随机特征快照
+    from indicators import make_sample_ohlcv
+
+    rng = np.random.default_rng(seed)
+    df = make_sample_ohlcv(n + max(DEFAULT_HORIZONS) + 1, freq='1D')
+    bars = np.column_stack([df['time'].astype('int64') // 10 ** 6, df[['open', 'high', 'low', 'close', 'volume']]])
+    history = ScenarioHistory(":memory:")
+    scorer = ScenarioScorer()
+    for i in range(n):
+        features = {
+            "fed_qe": float(rng.random() < 0.1), "fed_crisis": float(rng.random() < 0.05),
+            "rate_delta": float(rng.choice([-25, 0, 25])), "holder_pressure": float(rng.integers(0, 5)),
+            "etf_week": rng.normal(0, 800), "etf_5d": rng.normal(0, 500), "etf_month": rng.normal(0, 3000),
+            "btc_price": float(bars[i, 4]), "sp500_day_pct": rng.normal(0, 1.2),
+            "sp500_month_pct": rng.normal(0, 4), "sp500_at_high": float(rng.random() < 0.2),
+            "mining_cost": 94000.0, "risk_systemic": float(rng.random() < 0.05),
+        }
+        features = {name: features.get(name, np.nan) for name in FEATURES}
+        probabilities = scorer.calculate_scenario_scores({}, features)
+        history.append(bars[i, 0] / 1000 + 3600, i + 1, {}, features,
+                       {k: v["probability"] for k, v in probabilities.items()})
+    return history, bars
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="情景概率历史重放")
+    parser.add_argument("--rules", help="修改后的规则表 (Markdown，格式同 ScenarioRules.md)")
+    parser.add_argument("--weights", help="覆盖维度权重，例如 fed_policy=30,etf_flow=10")
+    parser.add_argument("--horizons", default=",".join(map(str, DEFAULT_HORIZONS)), help="收益观察窗口 (天)")
+    parser.add_argument("--symbol", default="BTC/USDT")
+    parser.add_argument("--sample", type=int, help="使用 N 天随机样本（离线测试）")
+    parser.add_argument("--out", help="保存明细表 (CSV)")
+    args = parser.parse_args()
+
+    horizons = tuple(int(h) for h in args.horizons.split(","))
+    if args.sample:
+        history, bars = _sample_history(args.sample)
+    else:
+        from candle_store import get_store
+        history = ScenarioHistory()
+        bars = get_store().load(args.symbol, '1d')
+
+    scorer = ScenarioScorer(rules=load_rule_table(args.rules) if args.rules else None,
+                            weights=_parse_weights(args.weights) if args.weights else None)
+    start = time.perf_counter()
+    table, summary = replay(history, bars, scorer, horizons)
+    elapsed = time.perf_counter() - start
+
+    print(f"重放 {summary['snapshots']} 个快照，耗时 {elapsed * 1000:.1f} ms，"
+          f"最可能情景改变 {summary['changed']} 个")
+    for col, groups in summary["by_scenario"].items():
+        print(f"\n{col} (按最可能情景分组):")
+        for scenario, stats in groups.items():
+            print(f"  {scenario}: 平均 {stats['mean']:+.2f}%  上涨比例 {stats['up_ratio']:.1%}  样本 {stats['count']}")
+        print(f"  概率与收益相关系数: {summary['correlation'][col]}")
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"\n明细已保存: {args.out}")
@@ -1,15 +1,227 @@
 #!/usr/bin/env python3
 """
 BTC 情景评分系统 - 透明的规则评分机制
-基于 ScenarioRules.md 中的情景触发条件
+基于 ScenarioRules.md 中的情景触发条件:
+- 宏观数据先转换为数值特征 (ETF 净流向 $、MVRV、S&P 涨跌幅、利率变动 bp ...)
+- ScenarioRules.md「数值评分规则表」编译为规则数组，一次调用可对任意多个快照向量化评分
 """
 
+import os
+import re
+
+import numpy as np
+
+SCENARIO_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ScenarioRules.md")
+RULES_SECTION = "## 第四部分：数值评分规则表"
+
+SCENARIOS = ["scenario_1", "scenario_2", "scenario_3", "scenario_4"]
+
+SCENARIO_NAMES = {
+    "scenario_1": "情景 1: V型反转",
+    "scenario_2": "情景 2: 高位横盘",
+    "scenario_3": "情景 3: 缓慢熊市",
+    "scenario_4": "情景 4: 深度熊市"
+}
+
+# 数值特征（列顺序即特征矩阵的列顺序，缺失为 NaN）
+FEATURES = [
+    "fed_qe", "fed_crisis", "rate_delta",
+    "mvrv", "holder_pressure",
+    "etf_daily", "etf_5d", "etf_week", "etf_month", "etf_zscore",
+    "mining_cost", "btc_price",
+    "sp500_day_pct", "sp500_month_pct", "sp500_at_high",
+    "risk_systemic",
+]
+
+# 未给出幅度时的默认利率变动 (bp)
+DEFAULT_RATE_STEP = 25
+
+_OPS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "==": np.equal, "!=": np.not_equal,
+}
+_CONDITION_RE = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(-?[\d.]+)\s*$")
+
+
+# --- 宏观文本 -> 数值特征 ---
+
+def _contains(text, *words):
+    return any(w in text for w in words)
+
+
+def _fed_features(text):
+    qe = 1.0 if _contains(text, "qe", "量化宽松") else 0.0
+    crisis = 1.0 if _contains(text, "衰退", "失败", "紧急") else 0.0
+    match = re.search(r"(降息|加息)\s*(\d+)\s*(?:bp|个基点)", text)
+    if match:
+        delta = float(match.group(2)) * (-1 if match.group(1) == "降息" else 1)
+    elif "降息" in text:
+        delta = -DEFAULT_RATE_STEP
+    elif "加息" in text:
+        delta = DEFAULT_RATE_STEP
+    elif _contains(text, "维持", "不变", "暂停"):
+        delta = 0.0
+    else:
+        delta = np.nan
+    return {"fed_qe": qe, "fed_crisis": crisis, "rate_delta": delta}
+
+
+def _holder_features(text):
+    match = re.search(r"mvrv\s*([\d.]+)", text)
+    mvrv = float(match.group(1)) if match else np.nan
+    if match:
+        # 与 holder_behavior_helper 的 MVRV 分档一致
+        pressure = 0.0 if mvrv <= 1.0 else 1.0 if mvrv <= 1.5 else 2.0 if mvrv <= 3.0 else 3.0
+    elif "恐慌" in text or ("大量" in text and "抛售" in text):
+        pressure = 4.0
+    elif "加速" in text:
+        pressure = 3.0
+    elif _contains(text, "停止", "积累", "抢筹", "强力支撑"):
+        pressure = 0.0
+    elif _contains(text, "放缓", "减缓", "小幅"):
+        pressure = 1.0
+    elif _contains(text, "抛售", "离场", "获利"):
+        pressure = 2.0
+    else:
+        pressure = np.nan
+    return {"mvrv": mvrv, "holder_pressure": pressure}
+
+
+_ETF_PERIODS = {"单日": "etf_daily", "近5日累计": "etf_5d", "单周": "etf_week", "近一周": "etf_week",
+                "单月": "etf_month", "近一月": "etf_month"}
+_ETF_RE = re.compile(r"(单日|近5日累计|单周|近一周|单月|近一月)(流入|流出)\s*\$?\s*([\d.]+)\s*([mb亿]?)")
+
+
+def _etf_features(text):
+    # 文本兜底: "单日流入 $211.4m; 近5日累计流出 $447.7m" / "单周流入 $1.2b"
+    out = {}
+    for period, direction, amount, unit in _ETF_RE.findall(text):
+        value = float(amount) * {"b": 1000, "亿": 100}.get(unit, 1)
+        out[_ETF_PERIODS[period]] = value if direction == "流入" else -value
+    return out
+
+
+def _sp500_features(text):
+    out = {}
+    day = re.search(r"(?:大涨|上涨|微涨|大跌|下跌|微跌)\s*([+-]?[\d.]+)%", text)
+    month = re.search(r"近月(?:大涨|上涨|重挫|下滑)\s*([+-]?[\d.]+)%", text)
+    if day:
+        out["sp500_day_pct"] = float(day.group(1))
+    elif "走平" in text or "震荡" in text:
+        out["sp500_day_pct"] = 0.0
+    elif _contains(text, "爆涨", "大涨"):
+        out["sp500_day_pct"] = 2.0
+    elif _contains(text, "暴跌", "崩盘", "重挫", "大跌"):
+        out["sp500_day_pct"] = -2.0
+    if month:
+        out["sp500_month_pct"] = float(month.group(1))
+    elif "sp500_day_pct" in out:
+        # sp500_helper 只在近月涨跌超过 ±2% 时才写出
+        out["sp500_month_pct"] = 0.0
+    if "泡沫" in text or "崩盘" in text:
+        out["sp500_month_pct"] = min(out.get("sp500_month_pct", 0.0), -10.0)
+    if out:
+        out["sp500_at_high"] = 1.0 if "新高" in text else 0.0
+    return out
+
+
+def extract_features(macro_data, etf=None, btc_price=None):
+    """
+    macro_data (宏观文本快照) -> {特征: float}
+    etf: ETFFlowStore.features() 的数值流向（优先于文本解析）；btc_price: 最新 BTC 价格
+    """
+    features = dict.fromkeys(FEATURES, np.nan)
+    features.update(_fed_features(macro_data.get("Fed 利率政策", "").lower()))
+    features.update(_holder_features(macro_data.get("长期持有者行为", "").lower()))
+    features.update(_etf_features(macro_data.get("BTC ETF 净流入", "").lower()))
+    features.update({k: float(v) for k, v in (etf or {}).items() if k in features})
+    features.update(_sp500_features(macro_data.get("美股表现 (S&P500)", "").lower()))
+
+    mining = re.search(r"\$?\s*([\d,]{4,})", macro_data.get("挖矿生产成本", ""))
+    if mining:
+        features["mining_cost"] = float(mining.group(1).replace(",", ""))
+    if btc_price:
+        features["btc_price"] = float(btc_price)
+    features["risk_systemic"] = 1.0 if _contains(macro_data.get("风险事件", "").lower(),
+                                                 "系统", "危机", "爆雷", "崩盘") else 0.0
+    return features
+
+
+def feature_matrix(feature_dicts):
+    """[{特征: 值}, ...] -> (N, len(FEATURES)) 数组"""
+    return np.array([[d.get(name, np.nan) for name in FEATURES] for d in feature_dicts], dtype=np.float64)
+
+
+# --- 规则表编译 ---
+
+def load_rule_table(path=SCENARIO_RULES_PATH):
+    """读取 ScenarioRules.md「数值评分规则表」-> [{scenario, dimension, condition, fraction, matched, label}]"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    start = text.index(RULES_SECTION)
+    end = text.find("\n## ", start + len(RULES_SECTION))
+    rules = []
+    for line in text[start:end if end != -1 else None].splitlines():
+        cells = [c.strip() for c in line.strip().strip("|").split("|")]
+        if len(cells) != 6 or cells[0] not in SCENARIOS:
+            continue
+        scenario, dimension, condition, fraction, matched, label = cells
+        rules.append({
+            "scenario": scenario, "dimension": dimension, "condition": condition,
+            "fraction": float(fraction), "matched": matched == "✓", "label": label,
+        })
+    return rules
+
+
+def _compile_condition(condition):
+    if condition == "*":
+        return []
+    terms = []
+    for part in condition.split("&"):
+        match = _CONDITION_RE.match(part)
+        if not match or match.group(1) not in FEATURES:
+            raise ValueError(f"无法解析的规则条件: {condition}")
+        terms.append((FEATURES.index(match.group(1)), _OPS[match.group(2)], float(match.group(3))))
+    return terms
+
+
+class CompiledRules:
+    """
+    规则按 (情景, 维度) 分组，组内顺序即匹配优先级；每组末尾补一条 0 分兜底
+    """
+
+    def __init__(self, rules, dimensions):
+        self.rules = list(rules)
+        self.groups = {}
+        for i, rule in enumerate(self.rules):
+            if rule["dimension"] not in dimensions:
+                raise ValueError(f"未知的评分维度: {rule['dimension']}")
+            self.groups.setdefault((rule["scenario"], rule["dimension"]), []).append(i)
+        self.conditions = [_compile_condition(rule["condition"]) for rule in self.rules]
+        self.fractions = np.array([rule["fraction"] for rule in self.rules])
+
+    def evaluate(self, X):
+        """
+        X: (N, len(FEATURES)) -> {(情景, 维度): (N,) 命中的规则下标，-1 表示无规则成立}
+        """
+        n = len(X)
+        with np.errstate(invalid="ignore"):
+            masks = []
+            for terms in self.conditions:
+                mask = np.ones(n, dtype=bool)
+                for col, op, value in terms:
+                    mask &= op(X[:, col], value)
+                masks.append(mask)
+        return {key: np.select([masks[i] for i in idx], idx, default=-1) for key, idx in self.groups.items()}
+
+
 class ScenarioScorer:
     """
     情景评分器 - 根据宏观数据计算每个情景的匹配分数
+    rules: 规则表（默认读取 ScenarioRules.md），weights: 覆盖默认维度权重
     """
-    
-    def __init__(self):
+
+    def __init__(self, rules=None, weights=None):
         # 定义各维度的权重（总和 = 100）
         self.weights = {
             "fed_policy": 20,      # Fed 政策
@@ -19,315 +231,68 @@ class ScenarioScorer:
             "tech_level": 15,      # 关键技术位
             "stock_correlation": 15 # 美股关联
         }
-    
-    def calculate_scenario_scores(self, macro_data):
+        if weights:
+            self.weights.update(weights)
+        self.compiled = CompiledRules(rules if rules is not None else _default_rules(), self.weights)
+
+    def score_matrix(self, X):
+        """
+        向量化评分: X (N, len(FEATURES)) -> (分数 (N, 4), 各组命中规则下标)
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        chosen = self.compiled.evaluate(X)
+        scores = np.zeros((len(X), len(SCENARIOS)))
+        fractions = np.append(self.compiled.fractions, 0.0)  # 下标 -1 -> 0 分
+        for (scenario, dimension), idx in chosen.items():
+            scores[:, SCENARIOS.index(scenario)] += self.weights[dimension] * fractions[idx]
+        return np.round(scores, 1), chosen
+
+    def probability_matrix(self, X):
+        """X (N, len(FEATURES)) -> 概率 (N, 4)，单位 %（全 0 时平均分配）"""
+        scores, _ = self.score_matrix(X)
+        total = scores.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            probs = np.where(total > 0, scores / total * 100, 100 / len(SCENARIOS))
+        return np.round(probs, 1)
+
+    def calculate_scenario_scores(self, macro_data, features=None):
         """
         计算所有情景的分数
-        
+
         Args:
             macro_data: dict, 包含所有宏观数据
-            
+            features: dict, 已提取的数值特征（不传则由 macro_data 文本解析）
+
         Returns:
             dict: 每个情景的分数和详细分析
         """
-        # 提取数据（转小写便于匹配）
-        fed_policy = macro_data.get("Fed 利率政策", "").lower()
-        holder_behavior = macro_data.get("长期持有者行为", "").lower()
-        etf_flow = macro_data.get("BTC ETF 净流入", "").lower()
-        mining_cost = macro_data.get("挖矿生产成本", "")
-        sp500 = macro_data.get("美股表现 (S&P500)", "").lower()
-        risk_events = macro_data.get("风险事件", "").lower()
-        
-        # 计算每个情景的分数
-        scores = {
-            "scenario_1": self._score_scenario_1(fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events),
-            "scenario_2": self._score_scenario_2(fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events),
-            "scenario_3": self._score_scenario_3(fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events),
-            "scenario_4": self._score_scenario_4(fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events)
-        }
-        
+        features = features or extract_features(macro_data)
+        scores, chosen = self.score_matrix(feature_matrix([features]))
+
+        results = {}
+        for s, scenario in enumerate(SCENARIOS):
+            details = {"matched": [], "unmatched": []}
+            for (group_scenario, _), idx in chosen.items():
+                if group_scenario != scenario or idx[0] < 0:
+                    continue
+                rule = self.compiled.rules[idx[0]]
+                details["matched" if rule["matched"] else "unmatched"].append(rule["label"])
+            score = float(scores[0, s])
+            results[scenario] = {"score": int(score) if score.is_integer() else score, "details": details}
+
         # 归一化为概率
-        probabilities = self._normalize_to_probabilities(scores)
-        
-        return probabilities
-    
-    def _score_scenario_1(self, fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events):
-        """
-        情景 1: V型反转
-        触发条件：QE + 停止抛售 + 流入>$1B + 信用对冲 + $100K守住 + 美股爆涨
-        """
-        score = 0
-        details = {"matched": [], "unmatched": []}
-        
-        # 1. Fed 政策 (权重 20)
-        if "qe" in fed_policy or "量化宽松" in fed_policy:
-            score += 20
-            details["matched"].append("Fed开启QE")
-        elif "降息" in fed_policy:
-            score += 8  # 部分符合
-            details["matched"].append("Fed降息（部分符合）")
-        else:
-            details["unmatched"].append("Fed未开启QE")
-        
-        # 2. 持有者行为 (权重 25)
-        if "停止抛售" in holder_behavior or "积累" in holder_behavior:
-            score += 25
-            details["matched"].append("长期持有者停止抛售")
-        elif "减缓" in holder_behavior:
-            score += 15
-            details["matched"].append("抛售减缓（部分符合）")
-        else:
-            details["unmatched"].append("长期持有者未停止抛售")
-        
-        # 3. ETF 资金流 (权重 15)
-        if "流入" in etf_flow and ("1b" in etf_flow or "10亿" in etf_flow):
-            score += 15
-            details["matched"].append("ETF单周流入>$1B")
-        elif "流入" in etf_flow:
-            score += 10
-            details["matched"].append("ETF有流入（部分符合）")
-        else:
-            details["unmatched"].append("ETF未见大额流入")
-        
-        # 4. 逻辑支撑 - 信用对冲 + 机构抢筹 (权重 10)
-        # 通过持有者行为和ETF流入推断
-        if ("积累" in holder_behavior or "抢筹" in holder_behavior) and "流入" in etf_flow:
-            score += 10
-            details["matched"].append("机构抢筹迹象")
-        else:
-            details["unmatched"].append("未见机构大规模抢筹")
-        
-        # 5. 关键技术位 - $100K 守住并 V 反 (权重 15)
-        # 需要实际价格数据，这里简化判断
-        # 如果没有明确跌破信号，给予部分分数
-        score += 5  # 默认给部分分
-        details["unmatched"].append("$100K守住需实际价格确认")
-        
-        # 6. 美股关联 (权重 15)
-        if "爆涨" in sp500 or "新高" in sp500 or "大涨" in sp500:
-            score += 15
-            details["matched"].append("美股爆涨")
-        elif "上涨" in sp500 or "微涨" in sp500:
-            score += 8
-            details["matched"].append("美股上涨（部分符合）")
-        else:
-            details["unmatched"].append("美股未爆涨")
-        
-        return {"score": score, "details": details}
-    
-    def _score_scenario_2(self, fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events):
-        """
-        情景 2: 高位横盘
-        触发条件：仅降息不QE + 抛售放缓 + 小幅波动 + 矿工挺价 + $94K守住 + 美股走平
-        """
-        score = 0
-        details = {"matched": [], "unmatched": []}
-        
-        # 1. Fed 政策 (权重 20)
-        if "降息" in fed_policy and "qe" not in fed_policy and "量化宽松" not in fed_policy:
-            score += 20
-            details["matched"].append("Fed仅降息，不QE")
-        elif "降息" in fed_policy:
-            score += 15
-            details["matched"].append("Fed降息（部分符合）")
-        elif "维持" in fed_policy or "不变" in fed_policy:
-            score += 10
-            details["matched"].append("利率维持（部分符合）")
-        else:
-            details["unmatched"].append("Fed政策不符合")
-        
-        # 2. 持有者行为 (权重 25)
-        if "放缓" in holder_behavior:
-            score += 25
-            details["matched"].append("抛售放缓")
-        elif "停止" in holder_behavior or "积累" in holder_behavior:
-            score += 20  # 更积极，也算部分符合
-            details["matched"].append("停止抛售/积累（更积极）")
-        elif "减缓" in holder_behavior:
-            score += 15
-            details["matched"].append("抛压减缓（部分符合）")
-        else:
-            details["unmatched"].append("持有者行为不符合")
-        
-        # 3. ETF 资金流 (权重 15)
-        if "小幅" in etf_flow or "波动" in etf_flow or "不明确" in etf_flow:
-            score += 15
-            details["matched"].append("ETF小幅波动或数据不明确")
-        elif "流出" not in etf_flow and "流入" not in etf_flow:
-            score += 10
-            details["matched"].append("无明显单边流动（部分符合）")
-        else:
-            details["unmatched"].append("ETF出现单边大量流动")
-        
-        # 4. 逻辑支撑 - 矿工挺价 (权重 10)
-        if "$94" in mining_cost or "94000" in mining_cost:
-            score += 10
-            details["matched"].append("挖矿成本$94K支撑")
-        else:
-            score += 5
-            details["matched"].append("有挖矿成本支撑（部分）")
-        
-        # 5. 关键技术位 - $94K 守住 (权重 15)
-        # 基于挖矿成本和持有者行为推断
-        if "$94" in mining_cost and ("停止" in holder_behavior or "积累" in holder_behavior):
-            score += 15
-            details["matched"].append("$94K关键支撑守住")
-        else:
-            score += 8
-            details["matched"].append("技术位支撑存在（部分）")
-        
-        # 6. 美股关联 (权重 15)
-        if "走平" in sp500 or "震荡" in sp500 or "微涨" in sp500:
-            score += 15
-            details["matched"].append("美股走平或微涨")
-        elif "下跌" in sp500 or "下滑" in sp500:
-            score += 8  # 下跌也可能导致横盘
-            details["matched"].append("美股下跌（可能增加波动）")
-        else:
-            details["unmatched"].append("美股表现不符合")
-        
-        return {"score": score, "details": details}
-    
-    def _score_scenario_3(self, fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events):
-        """
-        情景 3: 缓慢熊市
-        触发条件：利率不变 + 抛售加速 + 流出>$2B + 预期透支 + 跌破$94K/$90K + 美股下跌
-        """
-        score = 0
-        details = {"matched": [], "unmatched": []}
-        
-        # 1. Fed 政策 (权重 20)
-        if "维持" in fed_policy or "不变" in fed_policy:
-            score += 20
-            details["matched"].append("Fed维持利率不变")
-        elif "降息" not in fed_policy and "加息" not in fed_policy:
-            score += 10
-            details["matched"].append("Fed无明显宽松（部分符合）")
-        else:
-            details["unmatched"].append("Fed政策不符合")
-        
-        # 2. 持有者行为 (权重 25)
-        if "加速" in holder_behavior and "抛售" in holder_behavior:
-            score += 25
-            details["matched"].append("抛售加速")
-        elif "抛售" in holder_behavior:
-            score += 15
-            details["matched"].append("有抛售行为（部分符合）")
-        else:
-            details["unmatched"].append("未见抛售加速")
-        
-        # 3. ETF 资金流 (权重 15)
-        if "流出" in etf_flow and ("2b" in etf_flow or "20亿" in etf_flow or "3b" in etf_flow):
-            score += 15
-            details["matched"].append("ETF单月流出>$2B")
-        elif "流出" in etf_flow:
-            score += 10
-            details["matched"].append("ETF有流出（部分符合）")
-        else:
-            details["unmatched"].append("ETF未见大额流出")
-        
-        # 4. 逻辑支撑 - 预期透支 + 老玩家离场 (权重 10)
-        if "离场" in holder_behavior or "抛售" in holder_behavior:
-            score += 10
-            details["matched"].append("老玩家离场迹象")
-        else:
-            details["unmatched"].append("未见老玩家离场")
-        
-        # 5. 关键技术位 - 跌破 $94K/$90K (权重 15)
-        # 需要实际价格数据，这里基于其他信号推断
-        if "流出" in etf_flow and "抛售" in holder_behavior:
-            score += 10  # 有压力但不确定
-            details["matched"].append("技术位面临压力（推断）")
-        else:
-            details["unmatched"].append("技术位跌破需价格确认")
-        
-        # 6. 美股关联 (权重 15)
-        if "下跌" in sp500 or "下滑" in sp500 or "回撤" in sp500:
-            score += 15
-            details["matched"].append("美股下跌")
-        elif "震荡" in sp500:
-            score += 8
-            details["matched"].append("美股震荡（部分符合）")
-        else:
-            details["unmatched"].append("美股未下跌")
-        
-        return {"score": score, "details": details}
-    
-    def _score_scenario_4(self, fed_policy, holder_behavior, etf_flow, mining_cost, sp500, risk_events):
-        """
-        情景 4: 深度熊市
-        触发条件：衰退+政策失败 + 恐慌抛售 + 流出>$5B + 系统性风险 + 跌破$85K + 美股泡沫破灭
-        """
-        score = 0
-        details = {"matched": [], "unmatched": []}
-        
-        # 1. Fed 政策 (权重 20)
-        if "衰退" in fed_policy or "失败" in fed_policy or "紧急" in fed_policy:
-            score += 20
-            details["matched"].append("经济衰退+政策失败")
-        elif "加息" in fed_policy:
-            score += 10
-            details["matched"].append("Fed加息（部分符合）")
-        else:
-            details["unmatched"].append("未见衰退或政策失败")
-        
-        # 2. 持有者行为 (权重 25)
-        if "恐慌" in holder_behavior or ("大量" in holder_behavior and "抛售" in holder_behavior):
-            score += 25
-            details["matched"].append("恐慌性抛售")
-        elif "抛售" in holder_behavior and "加速" in holder_behavior:
-            score += 15
-            details["matched"].append("抛售加速（部分符合）")
-        else:
-            details["unmatched"].append("未见恐慌抛售")
-        
-        # 3. ETF 资金流 (权重 15)
-        if "流出" in etf_flow and ("5b" in etf_flow or "50亿" in etf_flow or "10b" in etf_flow):
-            score += 15
-            details["matched"].append("ETF单月流出>$5B")
-        elif "流出" in etf_flow and ("大量" in etf_flow or "巨额" in etf_flow):
-            score += 10
-            details["matched"].append("ETF大量流出（部分符合）")
-        else:
-            details["unmatched"].append("ETF未见巨额流出")
-        
-        # 4. 逻辑支撑 - 系统性风险 + 泡沫破灭 (权重 10)
-        if "系统" in risk_events or "危机" in risk_events or "爆雷" in risk_events or "崩盘" in risk_events:
-            score += 10
-            details["matched"].append("系统性风险")
-        else:
-            details["unmatched"].append("未见系统性风险")
-        
-        # 5. 关键技术位 - 跌破 $85K (权重 15)
-        # 极端情况才会发生
-        if "崩盘" in holder_behavior or "恐慌" in etf_flow:
-            score += 8
-            details["matched"].append("技术位面临极端压力（推断）")
-        else:
-            details["unmatched"].append("$85K跌破需极端情况")
-        
-        # 6. 美股关联 (权重 15)
-        if "泡沫" in sp500 or "崩盘" in sp500 or "暴跌" in sp500:
-            score += 15
-            details["matched"].append("美股泡沫破灭")
-        elif "大跌" in sp500 or "重挫" in sp500:
-            score += 10
-            details["matched"].append("美股大跌（部分符合）")
-        else:
-            details["unmatched"].append("美股未崩盘")
-        
-        return {"score": score, "details": details}
-    
+        return self._normalize_to_probabilities(results)
+
     def _normalize_to_probabilities(self, scores):
         """
         将分数归一化为概率（总和100%）
         """
         # 提取分数
         total_score = sum(s["score"] for s in scores.values())
-        
+
         if total_score == 0:
             # 如果所有分数都是0，平均分配
-            probabilities = {k: {"probability": 25, "score": v["score"], "details": v["details"]} 
+            probabilities = {k: {"probability": 25, "raw_score": v["score"], "details": v["details"]}
                            for k, v in scores.items()}
         else:
             # 归一化
@@ -339,25 +304,68 @@ class ScenarioScorer:
                 }
                 for k, v in scores.items()
             }
-        
+
         return probabilities
-    
+
     def get_most_likely_scenario(self, probabilities):
         """
         获取最可能的情景
         """
         max_prob = max(probabilities.values(), key=lambda x: x["probability"])
         scenario_name = [k for k, v in probabilities.items() if v["probability"] == max_prob["probability"]][0]
-        
-        scenario_names = {
-            "scenario_1": "情景 1: V型反转",
-            "scenario_2": "情景 2: 高位横盘",
-            "scenario_3": "情景 3: 缓慢熊市",
-            "scenario_4": "情景 4: 深度熊市"
-        }
-        
+
         return {
-            "name": scenario_names[scenario_name],
+            "name": SCENARIO_NAMES[scenario_name],
             "probability": max_prob["probability"],
             "raw_score": max_prob["raw_score"]
         }
+
+
+_rules = None
+
+
+def _default_rules():
+    # ScenarioRules.md 只解析一次
+    global _rules
+    if _rules is None:
+        _rules = load_rule_table()
+    return _rules
+
+
+if __name__ == "__main__":
+    # 测试: 单个快照的评分明细 + 大批量快照向量化评分耗时
+    import time
+
+    macro_data = {
+        "Fed 利率政策": "降息 25bp",
+        "长期持有者行为": "LTH实现价格$45,000，MVRV 1.32倍；持续持有，小幅抛售",
+        "BTC ETF 净流入": "单日流入 $211.4M; 近5日累计流出 $447.7M",
+        "挖矿生产成本": "$94,000",
+        "美股表现 (S&P500)": "微涨 0.4%, 接近历史高点",
+        "风险事件": "无明显风险",
+    }
+    scorer = ScenarioScorer()
+    features = extract_features(macro_data, btc_price=96000)
+    print({k: v for k, v in features.items() if not np.isnan(v)})
+    probabilities = scorer.calculate_scenario_scores(macro_data, features)
+    for k, v in probabilities.items():
+        print(f"{SCENARIO_NAMES[k]}: {v['probability']}% ({v['raw_score']}) ✓{v['details']['matched']}")
+    print(f"最可能: {scorer.get_most_likely_scenario(probabilities)}")
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    X = np.column_stack([
+        rng.integers(0, 2, n), rng.integers(0, 2, n), rng.choice([-50, -25, 0, 25, np.nan], n),
+        rng.uniform(0.8, 3.5, n), rng.integers(0, 5, n),
+        rng.normal(0, 300, n), rng.normal(0, 800, n), rng.normal(0, 1200, n), rng.normal(0, 4000, n),
+        rng.normal(0, 1, n),
+        rng.uniform(70000, 100000, n), rng.uniform(50000, 130000, n),
+        rng.normal(0, 1.5, n), rng.normal(0, 5, n), rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+    ])
+    start = time.perf_counter()
+    probs = scorer.probability_matrix(X)
+    elapsed = time.perf_counter() - start
+    single = scorer.calculate_scenario_scores({}, dict(zip(FEATURES, X[0])))
+    print(f"{n} 个快照评分耗时 {elapsed * 1000:.1f} ms, 与逐个评分一致: "
+          f"{np.allclose(probs[0], [single[s]['probability'] for s in SCENARIOS])}")
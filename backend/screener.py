@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+全市场牛熊筛选器 - Binance 全部 USDT 现货交易对
+后台定时刷新K线缓存并计算 V6++ 牛熊 / 做空 / 多周期红绿灯，结果保存为一张内存表，
+接口只做排序和过滤（不触发任何交易所请求或 AI 调用）
+"""
+
+import asyncio
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from candle_store import get_candles, get_store
+from indicators import recursive_indicators
+from signals import trend_status, v6pp_regime
+
+# 刷新周期（秒）与交易对数量上限（0 = 全部）
+SCREENER_INTERVAL = int(os.getenv("SCREENER_INTERVAL", "900"))
+SCREENER_MAX_SYMBOLS = int(os.getenv("SCREENER_MAX_SYMBOLS", "0"))
+
+# 各周期加载的K线数 (日线需覆盖 SMA200 + 斜率回看)
+TIMEFRAME_LIMITS = {'1d': 250, '4h': 100, '1h': 100, '1w': 52}
+
+# 判定牛熊所需的最少日线数 (SMA200 + 斜率回看 5 根)
+MIN_DAILY_BARS = 205
+
+# 杠杆代币 (BTCUP / ETHBULL ...) 不参与筛选: 基础币 = 另一个现货交易对的基础币 + 后缀
+# （只看后缀会误伤 JUP / SYRUP 这类正常币种）
+LEVERAGED_SUFFIXES = ('UP', 'DOWN', 'BULL', 'BEAR')
+
+# 交易所市场列表重新加载周期（秒），新上线的交易对在下次重新加载后进入筛选
+MARKETS_RELOAD_INTERVAL = int(os.getenv("SCREENER_MARKETS_RELOAD", str(6 * 3600)))
+
+# 允许排序的列
+SORTABLE_COLUMNS = ['symbol', 'price', 'dev', 'slope', 'rsi_1h', 'change_24h', 'regime', 'can_short']
+
+
+def is_leveraged_token(base, bases):
+    """base 是否为 bases 中某个币种的杠杆代币，例如 BTCUP (BTC) / ETHBEAR (ETH)"""
+    return any(base.endswith(suffix) and base[:-len(suffix)] in bases for suffix in LEVERAGED_SUFFIXES)
+
+
+def usdt_symbols(markets):
+    """load_markets 结果 -> 可交易的 USDT 现货交易对（排除杠杆代币）"""
+    spot = [m for m in markets.values() if m.get('spot')]
+    bases = {m.get('base', '') for m in spot}
+    return sorted(
+        m['symbol'] for m in spot
+        if m.get('quote') == 'USDT' and m.get('active', True) and not is_leveraged_token(m.get('base', ''), bases)
+    )
+
+
+async def list_usdt_symbols(reload=False):
+    """交易所当前可交易的 USDT 现货交易对；reload 时重新拉取市场列表（否则用 ccxt 缓存）"""
+    return usdt_symbols(await market_data.get_exchange().load_markets(reload))
+
+
+def _frames_from_store(symbol):
+    # 直接用原始K线数组，不构建 DataFrame: [[time, o, h, l, c, v], ...] -> (n, 3) [high, low, close]
+    store = get_store()
+    frames = {}
+    for tf, limit in TIMEFRAME_LIMITS.items():
+        bars = np.asarray(store.load(symbol, tf, limit), dtype=np.float64).reshape(-1, 6)
+        frames[tf] = np.ascontiguousarray(bars[:, 2:5])
+    return frames
+
+
+async def _fetch_frames(symbol):
+    frames = await asyncio.gather(*[get_candles(symbol, tf, limit) for tf, limit in TIMEFRAME_LIMITS.items()])
+    return {tf: df[['high', 'low', 'close']].to_numpy(dtype=np.float64) if not df.empty else np.empty((0, 3))
+            for tf, df in zip(TIMEFRAME_LIMITS, frames)}
+
+
+def _daily_last(close, window=200, slope_lookback=5):
+    """最后一根日线的 SMA200 / 斜率 / 乖离率（与 calculate_daily_indicators 公式一致）"""
+    if len(close) < window + slope_lookback:
+        return np.nan, np.nan, np.nan
+    sma = close[-window:].mean()
+    base = close[-window - slope_lookback:-slope_lookback].mean()
+    return sma, (sma - base) / base * 100, (close[-1] - sma) / sma * 100
+
+
+def _micro_last(hlc):
+    """最后一根K线的 ADX / EMA20 / MACD_diff / RSI（与 calculate_indicators 一致，NaN 置 0）"""
+    if len(hlc) == 0:
+        return np.nan, np.nan, np.nan, np.nan
+    rec, _ = recursive_indicators(np.ascontiguousarray(hlc[:, 0]), np.ascontiguousarray(hlc[:, 1]),
+                                  np.ascontiguousarray(hlc[:, 2]))
+    values = np.nan_to_num([rec['ADX'][-1], rec['EMA20'][-1], rec['MACD'][-1] - rec['MACD_signal'][-1],
+                            rec['RSI'][-1]], nan=0.0)
+    return tuple(values)
+
+
+def build_table(frames_by_symbol):
+    """
+    {symbol: {timeframe: (n, 3) [high, low, close] 数组}} -> 筛选表 DataFrame（每行一个交易对）
+    日线不足 MIN_DAILY_BARS 根的交易对牛熊字段为空
+    """
+    symbols = [s for s, f in frames_by_symbol.items() if len(f['1d'])]
+    if not symbols:
+        return pd.DataFrame(columns=SORTABLE_COLUMNS)
+
+    n = len(symbols)
+    price = np.array([frames_by_symbol[s]['1d'][-1, 2] for s in symbols])
+    sma200, slope, dev = np.array([_daily_last(frames_by_symbol[s]['1d'][:, 2]) for s in symbols]).T
+    history = np.array([len(frames_by_symbol[s]['1d']) for s in symbols])
+    enough = history >= MIN_DAILY_BARS
+    is_bull, can_short = v6pp_regime(price, sma200, slope, dev)
+
+    table = {
+        'symbol': symbols,
+        'price': price,
+        'sma200': sma200,
+        'dev': dev,
+        'slope': slope,
+        'regime': np.where(enough, np.where(is_bull, 'bull', 'bear'), None),
+        'can_short': can_short,
+        '1d': np.where(enough, np.where(is_bull, 'bullish', 'bearish'), 'neutral'),
+    }
+    for tf in ('1w', '4h', '1h'):
+        adx, ema20, macd_diff, rsi = np.array([_micro_last(frames_by_symbol[s][tf]) for s in symbols]).reshape(n, 4).T
+        close = np.array([frames_by_symbol[s][tf][-1, 2] if len(frames_by_symbol[s][tf]) else np.nan
+                          for s in symbols])
+        table[tf] = trend_status(adx, close, ema20, macd_diff, rsi)
+        if tf == '1h':
+            table['rsi_1h'] = rsi
+
+    change = np.full(n, np.nan)
+    for i, symbol in enumerate(symbols):
+        hourly = frames_by_symbol[symbol]['1h'][:, 2]
+        if len(hourly) > 24:
+            change[i] = (hourly[-1] / hourly[-25] - 1) * 100
+    table['change_24h'] = change
+    table['history_days'] = history
+    return pd.DataFrame(table)
+
+
+class RegimeScreener:
+    """
+    后台刷新: 启动时先用本地缓存建表，之后按周期拉取全部交易对最新K线
+    """
+
+    def __init__(self, interval=SCREENER_INTERVAL, max_symbols=SCREENER_MAX_SYMBOLS):
+        self.interval = interval
+        self.max_symbols = max_symbols
+        self._table = None
+        self._updated_at = None
+        self._failures = {}
+        self._task = None
+        self._markets_loaded_at = None
+
+    def _publish(self, table, failures):
+        self._table = table
+        self._failures = failures
+        self._updated_at = time.time()
+
+    async def load_from_store(self):
+        """只读本地K线缓存建表（冷启动秒级可用）"""
+        def _build():
+            return build_table({s: _frames_from_store(s) for s in get_store().symbols('1d')})
+
+        table = await asyncio.to_thread(_build)
+        if self._table is None and not table.empty:
+            self._publish(table, {})
+
+    async def refresh(self):
+        now = time.time()
+        reload = self._markets_loaded_at is not None and now - self._markets_loaded_at >= MARKETS_RELOAD_INTERVAL
+        symbols = await list_usdt_symbols(reload)
+        if reload or self._markets_loaded_at is None:
+            self._markets_loaded_at = now
+        if self.max_symbols:
+            symbols = symbols[:self.max_symbols]
+        results = await asyncio.gather(*[_fetch_frames(s) for s in symbols], return_exceptions=True)
+        frames, failures = {}, {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                failures[symbol] = str(result) or type(result).__name__
+            else:
+                frames[symbol] = result
+        table = await asyncio.to_thread(build_table, frames)
+        self._publish(table, failures)
+        print(f"✓ 筛选器刷新完成: {len(table)} 个交易对, 失败 {len(failures)} 个")
+
+    async def _run(self):
+        await self.load_from_store()
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️ 筛选器刷新失败，沿用旧数据: {e!r}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def query(self, sort='dev', order='desc', regime=None, can_short=None, limit=None):
+        """
+        排序 / 过滤当前表，返回 {"rows": [...], "total", "updated_at", "age_seconds", "failures"}
+        参数不合法时抛 ValueError（首次刷新之前也一样校验）
+        """
+        if sort not in SORTABLE_COLUMNS:
+            raise ValueError(f"不支持的排序列: {sort}")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"order 只能是 asc 或 desc: {order}")
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit 必须为正整数: {limit}")
+
+        table = self._table
+        if table is None:
+            return {"rows": [], "total": 0, "updated_at": None, "age_seconds": None, "failures": 0}
+        if regime:
+            table = table[table['regime'] == regime]
+        if can_short is not None:
+            table = table[table['can_short'] == can_short]
+        table = table.sort_values(sort, ascending=(order == 'asc'), na_position='last', kind='stable')
+        total = len(table)
+        if limit:
+            table = table.head(limit)
+        return {
+            "rows": table.to_dict('records'),
+            "total": total,
+            "updated_at": self._updated_at,
+            "age_seconds": round(time.time() - self._updated_at, 1),
+            "failures": len(self._failures),
+        }
+
+
+if __name__ == "__main__":
+    # 测试: 杠杆代币过滤不误伤正常币种；刷新前 20 个交易对并打印乖离率最高的 10 个
+    sample = {f"{b}/USDT": {"symbol": f"{b}/USDT", "base": b, "quote": "USDT", "spot": True, "active": True}
+              for b in ("BTC", "BTCUP", "BTCDOWN", "ETH", "ETHBULL", "JUP", "SYRUP", "ARB")}
+    print(f"杠杆代币过滤: {usdt_symbols(sample)}")
+
+    async def _main():
+        screener = RegimeScreener(max_symbols=20)
+        try:
+            await screener.refresh()
+        finally:
+            await market_data.close_exchange()
+        start = time.perf_counter()
+        result = screener.query(sort='dev', limit=10)
+        print(pd.DataFrame(result["rows"]).to_string(index=False))
+        print(f"查询耗时 {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    asyncio.run(_main())
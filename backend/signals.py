@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+V6++ 信号的向量化版本 - 一次计算多个交易对
+与 main.py 中的单交易对逻辑一致:
+- v6pp_regime: is_bull_regime / can_short
+- trend_status: get_trend_status (短线红绿灯)
+缺失数据 (NaN) 的交易对得到 neutral / 非牛市 / 不可做空
+"""
+
+import numpy as np
+
+# 做空阈值 (与 main.py analyze_market 一致)
+SHORT_DEV = -10
+SHORT_SLOPE = -0.5
+
+
+def v6pp_regime(price, sma200, slope, dev, short_dev=SHORT_DEV, short_slope=SHORT_SLOPE):
+    """
+    返回 (is_bull, can_short) 两个布尔数组
+    牛市: 价格 > SMA200 或 斜率 > 0；做空: 非牛市 且 乖离率 < -10% 且 斜率 < -0.5%
+    """
+    price, sma200, slope, dev = (np.asarray(a, dtype=np.float64) for a in (price, sma200, slope, dev))
+    with np.errstate(invalid='ignore'):
+        is_bull = (price > sma200) | (slope > 0)
+        can_short = ~is_bull & (dev < short_dev) & (slope < short_slope)
+    return is_bull, can_short
+
+
+def trend_status(adx, close, ema20, macd_diff, rsi):
+    """
+    get_trend_status 的向量化版本，返回状态字符串数组
+    """
+    adx, close, ema20, macd_diff, rsi = (np.asarray(a, dtype=np.float64)
+                                         for a in (adx, close, ema20, macd_diff, rsi))
+    with np.errstate(invalid='ignore'):
+        momentum_up = macd_diff > 0
+        conditions = [
+            adx < 20,
+            (close > ema20) & momentum_up,
+            (close < ema20) & ~momentum_up,
+            rsi > 55,
+            rsi < 45,
+        ]
+    choices = ["neutral", "bullish", "bearish", "weak_bullish", "weak_bearish"]
+    return np.select(conditions, choices, default="neutral")
+
+
+def last_values(frames, columns):
+    """
+    取每个 DataFrame 最后一行的若干列，拼成 {列名: 数组}（空表或缺列为 NaN）
+    """
+    out = {col: np.full(len(frames), np.nan) for col in columns}
+    for i, df in enumerate(frames):
+        if df is None or df.empty:
+            continue
+        last = df.iloc[-1]
+        for col in columns:
+            if col in last:
+                out[col][i] = last[col]
+    return out
+
+
+if __name__ == "__main__":
+    # 测试: 覆盖每个分支
+    print(trend_status(
+        adx=[15, 30, 30, 30, 30, 30, np.nan],
+        close=[100, 110, 90, 110, 90, 100, np.nan],
+        ema20=[100, 100, 100, 100, 100, 100, np.nan],
+        macd_diff=[1, 1, -1, -1, 1, 0, np.nan],
+        rsi=[50, 50, 50, 60, 40, 50, np.nan],
+    ))
+    print(v6pp_regime(price=[110, 90, 80, 85], sma200=[100, 100, 100, 100],
+                      slope=[-1, 0.1, -1, -0.2], dev=[10, -10, -20, -15]))
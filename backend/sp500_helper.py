@@ -7,10 +7,13 @@ S&P 500 数据获取助手
 import requests
 from datetime import datetime, timedelta
 
+from http_client import get_client
 
-def get_sp500_performance():
+
+def get_sp500_performance(strict=False):
     """
     获取 S&P500 最近表现并生成描述
+    strict: 失败时抛异常而不是返回 "数据不可用" 等占位文案 (后台刷新据此保留上次的值)
     
     Returns:
         str: S&P500 表现描述，例如 "上涨 2.5%, 创历史新高"
@@ -31,11 +34,7 @@ def get_sp500_performance():
             "interval": "1d"
         }
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = get_client().get(url, params=params)
         
         if response.status_code == 200:
             data = response.json()
@@ -55,6 +54,8 @@ def get_sp500_performance():
             valid_closes = [c for c in closes if c is not None]
             
             if len(valid_closes) < 2:
+                if strict:
+                    raise ValueError("S&P500 收盘价数据不足")
                 return "数据不足"
             
             # 计算涨跌幅
@@ -116,13 +117,19 @@ def get_sp500_performance():
             
         else:
             print(f"⚠️ Yahoo Finance API 响应失败: {response.status_code}")
+            if strict:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
             return "数据不可用"
             
     except requests.Timeout:
         print("⚠️ S&P500 数据获取超时")
+        if strict:
+            raise
         return "API超时"
     except Exception as e:
         print(f"⚠️ S&P500 数据获取失败: {e}")
+        if strict:
+            raise
         return "数据不可用"
 
 
@@ -141,11 +148,7 @@ def get_sp500_raw_data():
             "interval": "1d"
         }
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = get_client().get(url, params=params)
         
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+V6++ 参数扫描 - 网格 / 随机搜索，多进程并行
+各交易对的收盘价数组放在一块共享内存中，工作进程只读映射，不再为每个任务序列化 DataFrame；
+SMA / 斜率 / 乖离率按 (交易对, sma_window, slope_lookback) 在工作进程内缓存复用
+"""
+
+import asyncio
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import (DEFAULT_PARAMS, FEE_RATE, SLIPPAGE, compute_features, compute_stats,
+                      generate_positions, simulate)
+
+# 默认网格 (4 * 4 * 4 * 3 * 3 * 3 = 1728 组)
+PARAM_GRID = {
+    "sma_window": [100, 150, 200, 250],
+    "slope_lookback": [3, 5, 10, 20],
+    "short_dev": [-5.0, -10.0, -15.0, -20.0],
+    "short_slope": [-0.25, -0.5, -1.0],
+    "cover_dev": [-2.0, -5.0, -8.0],
+    "take_profit": [0.5, 1.0, 2.0],
+}
+
+# 结果表中保留的统计字段
+STAT_FIELDS = ["total_return", "cagr", "max_drawdown", "sharpe", "trades", "win_rate", "exposure"]
+
+# 每个任务包含的参数组数（摊薄进程间通信开销）
+CHUNK_SIZE = 64
+
+
+def grid_search_space(grid=None):
+    """网格全部组合 (按 sma_window / slope_lookback 排序，便于工作进程复用指标缓存)"""
+    grid = grid or PARAM_GRID
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    return sorted(combos, key=lambda p: (p.get("sma_window", 0), p.get("slope_lookback", 0)))
+
+
+def random_search_space(n, grid=None, seed=42):
+    """从网格中不重复随机抽取 n 组"""
+    combos = grid_search_space(grid)
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(combos), size=min(n, len(combos)), replace=False)
+    return [combos[i] for i in sorted(picked)]
+
+
+class SharedCandles:
+    """
+    把多个交易对的收盘价拼成一块共享内存
+    layout: [(symbol, offset, length), ...]，工作进程据此切出只读视图
+    """
+
+    def __init__(self, closes):
+        total = sum(len(c) for c in closes.values())
+        self._shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+        buffer = np.ndarray((total,), dtype=np.float64, buffer=self._shm.buf)
+        self.layout = []
+        offset = 0
+        for symbol, close in closes.items():
+            buffer[offset:offset + len(close)] = close
+            self.layout.append((symbol, offset, len(close)))
+            offset += len(close)
+        self.name = self._shm.name
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+# --- 工作进程状态 (run_sweep / walkforward 的进程池共用) ---
+_worker = {}
+
+
+def init_worker(shm_name, layout, fee, slippage):
+    """进程池 initializer: 挂载 SharedCandles 共享内存"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    total = sum(length for _, _, length in layout)
+    buffer = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+    buffer.flags.writeable = False
+    _worker.clear()
+    _worker.update({
+        "shm": shm,
+        "closes": {symbol: buffer[offset:offset + length] for symbol, offset, length in layout},
+        "features": {},
+        "fee": fee,
+        "slippage": slippage,
+    })
+
+
+def worker_features(symbol, sma_window, slope_lookback):
+    """工作进程: 按 (交易对, SMA 窗口, 斜率回看) 缓存的指标数组"""
+    key = (symbol, sma_window, slope_lookback)
+    cache = _worker["features"]
+    if key not in cache:
+        cache[key] = compute_features(_worker["closes"][symbol], sma_window, slope_lookback)
+    return cache[key]
+
+
+def evaluate(close, features, params, start=0, end=None, fee=FEE_RATE, slippage=SLIPPAGE):
+    """
+    在 [start, end) 区间回测一组参数（指标用全量历史预先算好，区间开头空仓）
+    """
+    end = len(close) if end is None else end
+    window = slice(start, end)
+    sliced = {name: values[window] for name, values in features.items()}
+    positions = generate_positions(close[window], sliced, params)
+    equity, trades = simulate(close[window], positions, fee, slippage)
+    return compute_stats(equity, trades, positions, close[window])
+
+
+def evaluate_in_worker(symbol, params, start=None, end=None):
+    """工作进程: 用共享内存中的收盘价回测一组完整参数"""
+    close = _worker["closes"][symbol]
+    features = worker_features(symbol, params["sma_window"], params["slope_lookback"])
+    return evaluate(close, features, params, start or 0, end, _worker["fee"], _worker["slippage"])
+
+
+def evaluate_chunk(combos, symbols, start=None, end=None):
+    """工作进程: 一批参数 x 若干交易对，返回扁平的结果行"""
+    rows = []
+    for params in combos:
+        p = {**DEFAULT_PARAMS, **params}
+        for symbol in symbols:
+            stats = evaluate_in_worker(symbol, p, start, end)
+            rows.append({"symbol": symbol, **params, **{k: stats[k] for k in STAT_FIELDS}})
+    return rows
+
+
+def run_sweep(closes, combos, workers=None, fee=FEE_RATE, slippage=SLIPPAGE, start=None, end=None,
+              chunk_size=CHUNK_SIZE):
+    """
+    并行评估 combos 中的每组参数在每个交易对上的表现
+    - closes: {symbol: 收盘价数组}
+    - start / end: 只在该下标区间内评估（滚动验证用）
+    返回结果 DataFrame（每行一个 交易对 x 参数组）
+    """
+    workers = workers or os.cpu_count() or 1
+    shared = SharedCandles(closes)
+    symbols = list(closes)
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(shared.name, shared.layout, fee, slippage)) as pool:
+            futures = [pool.submit(evaluate_chunk, chunk, symbols, start, end) for chunk in chunks]
+            rows = [row for future in futures for row in future.result()]
+    finally:
+        shared.close()
+    return compact(pd.DataFrame(rows))
+
+
+def compact(results):
+    """压缩结果表: 交易对转 category，统计值转 float32"""
+    if results.empty:
+        return results
+    results["symbol"] = results["symbol"].astype("category")
+    for field in STAT_FIELDS:
+        results[field] = results[field].astype(np.int32 if field == "trades" else np.float32)
+    return results
+
+
+def rank_results(results, top=None):
+    """
+    按参数组汇总各交易对: 平均夏普、最差回撤、平均收益
+    排序: 夏普降序，其次回撤（越小越好）
+    """
+    param_cols = [c for c in results.columns if c in DEFAULT_PARAMS]
+    ranked = (results.groupby(param_cols, observed=True)
+              .agg(sharpe=("sharpe", "mean"), max_drawdown=("max_drawdown", "min"),
+                   total_return=("total_return", "mean"), trades=("trades", "sum"))
+              .reset_index()
+              .sort_values(["sharpe", "max_drawdown"], ascending=[False, False], ignore_index=True))
+    return ranked.head(top) if top else ranked
+
+
+async def load_closes(symbols, years=5):
+    """从本地K线仓库加载各交易对日线收盘价"""
+    from backtest import load_daily_history
+
+    closes = {}
+    for symbol in symbols:
+        df = await load_daily_history(symbol, years)
+        if not df.empty:
+            closes[symbol] = df['close'].to_numpy(dtype=np.float64)
+    return closes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="V6++ 参数扫描")
+    parser.add_argument("symbols", nargs="*", default=["BTC/USDT", "ETH/USDT", "SOL/USDT"])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--random", type=int, default=0, help="随机抽取 N 组参数（默认全网格）")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="保存完整结果表 (CSV)")
+    parser.add_argument("--sample", action="store_true", help="使用随机游走样本数据（离线测试）")
+    args = parser.parse_args()
+
+    if args.sample:
+        from indicators import make_sample_ohlcv
+        closes = {symbol: make_sample_ohlcv(365 * args.years + 250, freq='1D', seed=i)['close'].to_numpy()
+                  for i, symbol in enumerate(args.symbols)}
+    else:
+        closes = asyncio.run(load_closes(args.symbols, args.years))
+
+    combos = random_search_space(args.random) if args.random else grid_search_space()
+    start = time.perf_counter()
+    results = run_sweep(closes, combos, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"{len(combos)} 组参数 x {len(closes)} 个交易对 = {len(results)} 次回测, 耗时 {elapsed:.2f}s")
+
+    if args.out:
+        results.to_csv(args.out, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(rank_results(results, args.top).to_string(float_format=lambda v: f"{v:.3f}"))
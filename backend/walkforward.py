@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+V6++ 滚动前推验证 (walk-forward)
+每个 fold 在样本内窗口上扫描参数、选出最优组合，再在紧随其后的样本外窗口上评分；
+fold 之间并行执行，工作进程共享同一块收盘价内存，SMA / 斜率 / 乖离率按全量历史只算一次、跨 fold 复用
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import BARS_PER_YEAR, DEFAULT_PARAMS, FEE_RATE, SLIPPAGE
+from sweep import (SharedCandles, evaluate_chunk, evaluate_in_worker, grid_search_space, init_worker,
+                   random_search_space, rank_results)
+
+# 默认窗口: 样本内 2 年，样本外 6 个月，按样本外长度滚动
+IN_SAMPLE_BARS = 2 * BARS_PER_YEAR
+OUT_OF_SAMPLE_BARS = BARS_PER_YEAR // 2
+
+
+def make_folds(n, in_sample=IN_SAMPLE_BARS, out_of_sample=OUT_OF_SAMPLE_BARS, warmup=0):
+    """
+    生成 [(is_start, is_end, oos_start, oos_end), ...]，warmup 之前的K线只用于指标预热
+    """
+    folds = []
+    start = warmup
+    while start + in_sample + out_of_sample <= n:
+        folds.append((start, start + in_sample, start + in_sample, start + in_sample + out_of_sample))
+        start += out_of_sample
+    return folds
+
+
+def _run_fold(fold, combos, symbols):
+    """工作进程: 样本内选参 -> 样本外评分"""
+    is_start, is_end, oos_start, oos_end = fold
+    in_sample = rank_results(pd.DataFrame(evaluate_chunk(combos, symbols, is_start, is_end)))
+    best = in_sample.head(1).to_dict("records")[0]
+    params = {**DEFAULT_PARAMS, **{k: best[k] for k in DEFAULT_PARAMS if k in best}}
+
+    oos = {symbol: evaluate_in_worker(symbol, params, oos_start, oos_end) for symbol in symbols}
+    return {
+        "fold": fold,
+        "params": params,
+        "is_sharpe": float(best["sharpe"]),
+        "is_return": float(best["total_return"]),
+        "oos": oos,
+    }
+
+
+def walk_forward(closes, combos, in_sample=IN_SAMPLE_BARS, out_of_sample=OUT_OF_SAMPLE_BARS,
+                 workers=None, fee=FEE_RATE, slippage=SLIPPAGE):
+    """
+    - closes: {symbol: 收盘价数组}，按最新K线对齐截取为相同长度
+    返回 (每个 fold 的结果表, 汇总 dict)
+    """
+    length = min(len(c) for c in closes.values())
+    closes = {symbol: np.asarray(c[-length:], dtype=np.float64) for symbol, c in closes.items()}
+    full = [{**DEFAULT_PARAMS, **p} for p in combos]
+    warmup = max(p["sma_window"] + p["slope_lookback"] for p in full)
+    folds = make_folds(length, in_sample, out_of_sample, warmup)
+    if not folds:
+        raise ValueError(f"K线不足: {length} 根, 至少需要 {warmup + in_sample + out_of_sample} 根")
+
+    symbols = list(closes)
+    shared = SharedCandles(closes)
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=init_worker,
+                                 initargs=(shared.name, shared.layout, fee, slippage)) as pool:
+            results = list(pool.map(_run_fold, folds, [combos] * len(folds), [symbols] * len(folds)))
+    finally:
+        shared.close()
+
+    rows = []
+    for i, result in enumerate(results):
+        is_start, is_end, oos_start, oos_end = result["fold"]
+        oos = result["oos"]
+        rows.append({
+            "fold": i,
+            "is_start": is_start, "is_end": is_end, "oos_start": oos_start, "oos_end": oos_end,
+            **{k: result["params"][k] for k in DEFAULT_PARAMS},
+            "is_sharpe": result["is_sharpe"],
+            "is_return": result["is_return"],
+            "oos_return": float(np.mean([s["total_return"] for s in oos.values()])),
+            "oos_sharpe": float(np.mean([s["sharpe"] for s in oos.values()])),
+            "oos_max_drawdown": float(min(s["max_drawdown"] for s in oos.values())),
+            **{f"oos_return[{symbol}]": oos[symbol]["total_return"] for symbol in symbols},
+        })
+    table = pd.DataFrame(rows)
+
+    # 样本外收益按 fold 顺序复利拼接
+    per_symbol = {symbol: float(np.prod([1 + r["oos"][symbol]["total_return"] for r in results]) - 1)
+                  for symbol in symbols}
+    summary = {
+        "folds": len(results),
+        "oos_bars": len(results) * out_of_sample,
+        "oos_return": float(np.mean(list(per_symbol.values()))),
+        "oos_return_by_symbol": per_symbol,
+        "mean_fold_return": float(table["oos_return"].mean()),
+        "mean_fold_sharpe": float(table["oos_sharpe"].mean()),
+        "positive_folds": float((table["oos_return"] > 0).mean()),
+    }
+    return table, summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from sweep import load_closes
+
+    parser = argparse.ArgumentParser(description="V6++ 滚动前推验证")
+    parser.add_argument("symbols", nargs="*", default=["BTC/USDT", "ETH/USDT", "SOL/USDT"])
+    parser.add_argument("--years", type=int, default=6)
+    parser.add_argument("--in-sample", type=int, default=IN_SAMPLE_BARS, help="样本内K线数")
+    parser.add_argument("--out-of-sample", type=int, default=OUT_OF_SAMPLE_BARS, help="样本外K线数")
+    parser.add_argument("--random", type=int, default=0, help="每个 fold 随机抽取 N 组参数（默认全网格）")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sample", action="store_true", help="使用随机游走样本数据（离线测试）")
+    args = parser.parse_args()
+
+    if args.sample:
+        from indicators import make_sample_ohlcv
+        closes = {symbol: make_sample_ohlcv(365 * args.years + 300, freq='1D', seed=i)['close'].to_numpy()
+                  for i, symbol in enumerate(args.symbols)}
+    else:
+        closes = asyncio.run(load_closes(args.symbols, args.years))
+
+    combos = random_search_space(args.random) if args.random else grid_search_space()
+    start = time.perf_counter()
+    table, summary = walk_forward(closes, combos, args.in_sample, args.out_of_sample, args.workers)
+    elapsed = time.perf_counter() - start
+
+    with pd.option_context("display.width", 250, "display.max_columns", 30):
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\n{summary['folds']} 个 fold x {len(combos)} 组参数, 耗时 {elapsed:.2f}s")
+    print(f"样本外累计收益 {summary['oos_return']:+.1%} ({summary['oos_bars']} 根K线), "
+          f"平均每 fold {summary['mean_fold_return']:+.1%}, 夏普 {summary['mean_fold_sharpe']:.2f}, "
+          f"盈利 fold 占比 {summary['positive_folds']:.0%}")
+    for symbol, value in summary["oos_return_by_symbol"].items():
+        print(f"  {symbol}: {value:+.1%}")
@@ -11,6 +11,7 @@ export default function Home() {
   const [news, setNews] = useState([]);
   const [fng, setFng] = useState(null);
   const [uiSignals, setUiSignals] = useState(null);
+  const [streamText, setStreamText] = useState(''); // 流式输出中的模型原文
 
   // Tab 切换和情景分析
   const [activeTab, setActiveTab] = useState('ai-analysis'); // 'ai-analysis' | 'scenario-analysis'
@@ -37,35 +38,85 @@ export default function Home() {
     return '震荡整理';
   };
 
-  // 1. 獲取市場數據
-  const fetchMarketData = async () => {
-    try {
-      const safeSymbol = symbol.replace('/', '-'); // 簡單處理 URL
-      const res = await fetch(`http://127.0.0.1:8000/api/market-data/${safeSymbol}`);
-      const json = await res.json();
-      setMarketData(json.data);
-    } catch (error) {
-      console.error("Failed to fetch data", error);
-    }
+  // 1. 獲取市場數據 (SSE: 先收完整快照，之后只收最后一根K线的增量)
+  const [lastBar, setLastBar] = useState(null);
+  const [chartSymbol, setChartSymbol] = useState(symbol); // 只在点击刷新图表时更新，切换交易对不会立即重连
+  const [streamKey, setStreamKey] = useState(0); // 递增即重新订阅 (刷新图表)
+
+  useEffect(() => {
+    const safeSymbol = chartSymbol.replace('/', '-'); // 簡單處理 URL
+    const source = new EventSource(`http://127.0.0.1:8000/api/market-data/${safeSymbol}/stream`);
+    source.addEventListener('snapshot', (e) => {
+      const payload = JSON.parse(e.data);
+      setLastBar(null);
+      setMarketData(payload.data);
+      if (!payload.live) source.close(); // 未订阅实时K线的交易对只有快照
+    });
+    source.addEventListener('bar', (e) => setLastBar(JSON.parse(e.data)));
+    source.onerror = (error) => {
+      // 不让 EventSource 无限自动重连，点击刷新图表重新订阅
+      console.error("Market data stream error", error);
+      source.close();
+    };
+    return () => source.close();
+  }, [chartSymbol, streamKey]);
+
+  const fetchMarketData = () => {
+    setChartSymbol(symbol);
+    setStreamKey((k) => k + 1);
   };
 
-  // 2. 獲取 AI 分析
+  // 2. 獲取 AI 分析 (SSE 流式: 先显示信号/情绪/新闻，再逐段显示模型输出)
   const askAI = async () => {
     setLoading(true);
+    setAiAnalysis(null);
+    setStreamText('');
     try {
-      const res = await fetch('http://127.0.0.1:8000/api/analyze', {
+      const res = await fetch('http://127.0.0.1:8000/api/analyze/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ symbol: symbol })
       });
-      const json = await res.json();
-      setAiAnalysis(json.analysis);
-      setNews(json.news || []);
-      setFng(json.fng);
-      setUiSignals(json.ui_signals || null);
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE 事件以空行分隔
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (!event || !data) continue;
+          const payload = JSON.parse(data);
+
+          if (event === 'signals') {
+            setUiSignals(payload.ui_signals || null);
+            setFng(payload.fng);
+            setNews(payload.news || []);
+          } else if (event === 'delta') {
+            setStreamText((text) => text + payload.text);
+          } else if (event === 'result') {
+            setAiAnalysis(payload.analysis);
+            setNews(payload.news || []);
+            setFng(payload.fng);
+            setUiSignals(payload.ui_signals || null);
+          } else if (event === 'error') {
+            setAiAnalysis(`分析失败: ${payload.detail}`);
+          }
+        }
+      }
     } catch (error) {
       setAiAnalysis("分析失败，请检查后端连接。");
     }
+    setStreamText('');
     setLoading(false);
   };
 
@@ -87,10 +138,6 @@ export default function Home() {
     setScenarioLoading(false);
   };
 
-  useEffect(() => {
-    fetchMarketData();
-  }, []);
-
   return (
     <main className="flex min-h-screen flex-col items-center p-8 bg-gray-100">
       <h1 className="text-4xl font-bold mb-8 text-blue-800">加密货币 AI 交易助手</h1>
@@ -161,7 +208,7 @@ export default function Home() {
           {/* 图表区 */}
           <div className="w-full max-w-4xl bg-white p-4 rounded-xl shadow-lg mb-6">
             {marketData.length > 0 ? (
-              <Chart data={marketData} />
+              <Chart data={marketData} lastBar={lastBar} />
             ) : (
               <p className="text-center p-10 text-gray-500">加载数据中...</p>
             )}
@@ -279,6 +326,17 @@ export default function Home() {
             </div>
           )}
 
+          {/* AI 流式输出 (生成中) */}
+          {loading && streamText && (
+            <div className="w-full max-w-4xl mb-6 bg-white p-6 rounded-xl shadow-lg border-l-4 border-purple-300">
+              <h2 className="text-xl font-bold mb-4 text-gray-800 flex items-center gap-2">
+                <span className="text-2xl">🤖</span>
+                AI 正在生成...
+              </h2>
+              <pre className="text-gray-700 text-sm whitespace-pre-wrap leading-relaxed">{streamText}</pre>
+            </div>
+          )}
+
           {/* AI 分析结果区 (JSON格式) */}
           {aiAnalysis && typeof aiAnalysis === 'object' && (
             <div className="w-full max-w-4xl bg-white p-6 rounded-xl shadow-lg border-l-4 border-purple-500">
@@ -1,10 +1,17 @@
 'use client';
-import { createChart, CandlestickSeries, HistogramSeries } from 'lightweight-charts';
+import { createChart, CandlestickSeries, HistogramSeries, LineSeries } from 'lightweight-charts';
 import React, { useEffect, useRef } from 'react';
 
+// 成交量颜色（涨绿跌红）
+const volumeColor = (d) => parseFloat(d.close) >= parseFloat(d.open)
+    ? 'rgba(38, 166, 154, 0.5)'
+    : 'rgba(239, 83, 80, 0.5)';
+
 export const Chart = (props) => {
-    const { data } = props;
+    // data: 快照 (完整K线)，lastBar: 推送的增量 (最后一根更新或新K线)
+    const { data, lastBar } = props;
     const chartContainerRef = useRef();
+    const seriesRef = useRef(null);
 
     useEffect(() => {
         if (!chartContainerRef.current || !data || data.length === 0) return;
@@ -25,9 +32,9 @@ export const Chart = (props) => {
         // 1. 创建 K 线图
         const candlestickSeries = chart.addSeries(CandlestickSeries, {
             upColor: '#26a69a',
-            downColor: '#ef5350', 
-            borderVisible: false, 
-            wickUpColor: '#26a69a', 
+            downColor: '#ef5350',
+            borderVisible: false,
+            wickUpColor: '#26a69a',
             wickDownColor: '#ef5350'
         });
 
@@ -48,6 +55,10 @@ export const Chart = (props) => {
             },
         });
 
+        // 3. SMA50 / SMA200 均线
+        const sma50Series = chart.addSeries(LineSeries, { color: '#f59e0b', lineWidth: 1, priceLineVisible: false });
+        const sma200Series = chart.addSeries(LineSeries, { color: '#6366f1', lineWidth: 2, priceLineVisible: false });
+
         // 格式化 K 线数据
         const chartData = data.map(d => ({
             time: d.time,
@@ -61,15 +72,18 @@ export const Chart = (props) => {
         const volumeData = data.map(d => ({
             time: d.time,
             value: parseFloat(d.volume),
-            color: parseFloat(d.close) >= parseFloat(d.open) 
-                ? 'rgba(38, 166, 154, 0.5)' 
-                : 'rgba(239, 83, 80, 0.5)'
+            color: volumeColor(d)
         }));
 
         candlestickSeries.setData(chartData);
         volumeSeries.setData(volumeData);
+        // 均线预热期为 0，不绘制
+        sma50Series.setData(data.filter(d => d.sma50 > 0).map(d => ({ time: d.time, value: d.sma50 })));
+        sma200Series.setData(data.filter(d => d.sma200 > 0).map(d => ({ time: d.time, value: d.sma200 })));
         chart.timeScale().fitContent();
 
+        seriesRef.current = { candlestickSeries, volumeSeries, sma50Series, sma200Series };
+
         const handleResize = () => {
             chart.applyOptions({ width: chartContainerRef.current.clientWidth });
         };
@@ -78,10 +92,28 @@ export const Chart = (props) => {
 
         return () => {
             window.removeEventListener('resize', handleResize);
+            seriesRef.current = null;
             chart.remove();
         };
     }, [data]);
 
+    // 增量更新: 同一时间覆盖最后一根，新时间追加，不重绘整张图
+    useEffect(() => {
+        const series = seriesRef.current;
+        if (!series || !lastBar) return;
+
+        series.candlestickSeries.update({
+            time: lastBar.time,
+            open: lastBar.open,
+            high: lastBar.high,
+            low: lastBar.low,
+            close: lastBar.close
+        });
+        series.volumeSeries.update({ time: lastBar.time, value: lastBar.volume, color: volumeColor(lastBar) });
+        if (lastBar.sma50 > 0) series.sma50Series.update({ time: lastBar.time, value: lastBar.sma50 });
+        if (lastBar.sma200 > 0) series.sma200Series.update({ time: lastBar.time, value: lastBar.sma200 });
+    }, [lastBar]);
+
     return (
         <div ref={chartContainerRef} className="w-full relative" />
     );
@@ -0,0 +1,60 @@
+'use client';
+import { createChart, LineSeries } from 'lightweight-charts';
+import React, { useEffect, useRef } from 'react';
+
+const DAY = 24 * 3600;
+
+// 分位数线: 外层 90% 区间、内层 50% 区间、中位数
+const BAND_STYLES = [
+    { key: 'p95', color: '#fca5a5', lineWidth: 1, lineStyle: 2 },
+    { key: 'p75', color: '#93c5fd', lineWidth: 1 },
+    { key: 'p50', color: '#1d4ed8', lineWidth: 2 },
+    { key: 'p25', color: '#93c5fd', lineWidth: 1 },
+    { key: 'p5', color: '#fca5a5', lineWidth: 1, lineStyle: 2 },
+];
+
+// 蒙特卡洛价格带 (simulation: /api/scenario-simulation 或 scenario-analysis 的 price_simulation)
+export const PriceBandsChart = ({ simulation }) => {
+    const chartContainerRef = useRef();
+
+    useEffect(() => {
+        if (!chartContainerRef.current || !simulation) return;
+
+        const chart = createChart(chartContainerRef.current, {
+            layout: {
+                background: { color: '#ffffff' },
+                textColor: '#333',
+            },
+            width: chartContainerRef.current.clientWidth,
+            height: 300,
+            grid: {
+                vertLines: { color: '#f1f1f1' },
+                horzLines: { color: '#e1e1e1' },
+            },
+        });
+
+        // 第 0 天为今天 (UTC 日期)
+        const today = Math.floor(Date.now() / 1000 / DAY) * DAY;
+        const bands = simulation.mixture.bands;
+        BAND_STYLES.forEach(({ key, ...style }) => {
+            const series = chart.addSeries(LineSeries, { ...style, priceLineVisible: false, title: key });
+            series.setData(simulation.days.map((d, i) => ({ time: today + d * DAY, value: bands[key][i] })));
+        });
+        chart.timeScale().fitContent();
+
+        const handleResize = () => {
+            chart.applyOptions({ width: chartContainerRef.current.clientWidth });
+        };
+
+        window.addEventListener('resize', handleResize);
+
+        return () => {
+            window.removeEventListener('resize', handleResize);
+            chart.remove();
+        };
+    }, [simulation]);
+
+    return (
+        <div ref={chartContainerRef} className="w-full relative" />
+    );
+};
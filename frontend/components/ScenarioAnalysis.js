@@ -1,3 +1,5 @@
+import { PriceBandsChart } from './PriceBandsChart';
+
 // 情景分析组件
 export default function ScenarioAnalysis({ data, loading }) {
     if (loading) {
@@ -36,6 +38,7 @@ export default function ScenarioAnalysis({ data, loading }) {
     const mostLikely = data.most_likely_scenario || {};
     const macroData = data.macro_data || {};
     const aiAnalysis = data.ai_analysis || {};
+    const simulation = data.price_simulation;
 
     // 情景颜色映射
     const scenarioColors = {
@@ -160,6 +163,23 @@ export default function ScenarioAnalysis({ data, loading }) {
                 </div>
             </div>
 
+            {/* 蒙特卡洛价格带 */}
+            {simulation && (
+                <div className="bg-white p-6 rounded-xl shadow-lg">
+                    <h3 className="text-xl font-bold text-gray-800 mb-2 flex items-center gap-2">
+                        <span className="text-2xl">🎲</span>
+                        未来 {simulation.days.length - 1} 天价格模拟
+                    </h3>
+                    <div className="text-sm text-gray-500 mb-4">
+                        按情景概率混合的 {simulation.paths_per_scenario.toLocaleString()} 条路径 ·
+                        50% 区间 ${Math.round(simulation.mixture.bands.p25.at(-1)).toLocaleString()} - ${Math.round(simulation.mixture.bands.p75.at(-1)).toLocaleString()} ·
+                        90% 区间 ${Math.round(simulation.mixture.bands.p5.at(-1)).toLocaleString()} - ${Math.round(simulation.mixture.bands.p95.at(-1)).toLocaleString()} ·
+                        上涨概率 {(simulation.mixture.prob_up * 100).toFixed(1)}%
+                    </div>
+                    <PriceBandsChart simulation={simulation} />
+                </div>
+            )}
+
             {/* AI 详细分析 */}
             <div className="bg-white p-6 rounded-xl shadow-lg border-l-4 border-purple-500">
                 <h3 className="text-xl font-bold text-gray-800 mb-4 flex items-center gap-2">